@@ -1,9 +1,28 @@
 """Classes for interacting with the exchange API."""
 
-from exchange.tool import Tool  # noqa
-from exchange.content import Text, ToolResult, ToolUse  # noqa
-from exchange.message import Message  # noqa
-from exchange.exchange import Exchange  # noqa
-from exchange.checkpoint import CheckpointData, Checkpoint  # noqa
+from importlib import import_module
+
+# the classes are imported when they are first used, so that importing a light module such as
+# exchange.message does not bring in the exchange, its providers and their dependencies
+_LAZY_ATTRIBUTES = {
+    "Tool": "exchange.tool",
+    "Text": "exchange.content",
+    "ToolResult": "exchange.content",
+    "ToolUse": "exchange.content",
+    "Message": "exchange.message",
+    "Exchange": "exchange.exchange",
+    "CheckpointData": "exchange.checkpoint",
+    "Checkpoint": "exchange.checkpoint",
+}
 
 module_name = "ai-exchange"
+
+
+def __getattr__(name: str) -> object:
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(import_module(_LAZY_ATTRIBUTES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
@@ -1,8 +1,13 @@
-from copy import deepcopy
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator, MutableSequence
+from typing import Union
+
 from attrs import define, field
 
+from exchange.copy_on_write import CopyOnWriteList
 
-@define
+
+@define(frozen=True)
 class Checkpoint:
     """Checkpoint that counts the tokens in messages between the start and end index"""
 
@@ -21,6 +26,128 @@ class Checkpoint:
         )
 
 
+class CheckpointIndex(MutableSequence[Checkpoint]):
+    """The in order list of checkpoints, with a running total of their token counts
+
+    The running totals are kept alongside the checkpoints, offset by a base which is the total
+    before the first checkpoint. That way adding or removing checkpoints at either end is O(1),
+    and the number of tokens in any leading run of checkpoints can be found with a binary search.
+    Any other change recomputes the totals.
+
+    Both lists are copy on write, so forking the index is O(1) as well.
+    """
+
+    __slots__ = ("_checkpoints", "_totals", "_base")
+
+    def __init__(self, iterable: Iterable[Checkpoint] = ()) -> None:
+        if isinstance(iterable, CheckpointIndex):
+            self._checkpoints = iterable._checkpoints.fork()
+            self._totals = iterable._totals.fork()
+            self._base = iterable._base
+        else:
+            self._checkpoints = CopyOnWriteList(iterable)
+            self._rebuild()
+
+    def fork(self) -> "CheckpointIndex":
+        """Make a copy of this index in O(1), later changes to either one are not seen by the other"""
+        return CheckpointIndex(self)
+
+    def _rebuild(self) -> None:
+        self._base = 0
+        self._totals = CopyOnWriteList()
+        total = 0
+        for checkpoint in self._checkpoints:
+            total += checkpoint.token_count
+            self._totals.append(total)
+
+    @property
+    def token_count(self) -> int:
+        """The number of tokens in all the checkpoints"""
+        return self._totals[-1] - self._base if self._totals else 0
+
+    def leading_token_count(self, count: int) -> int:
+        """The number of tokens in the first count checkpoints"""
+        return self._totals[count - 1] - self._base if count > 0 else 0
+
+    def count_covering(self, token_count: int) -> int:
+        """The smallest number of leading checkpoints which hold at least token_count tokens
+
+        This is the length of the index if all of the checkpoints together hold fewer tokens.
+        """
+        if token_count <= 0:
+            return 0
+        return min(bisect_left(self._totals, self._base + token_count) + 1, len(self._totals))
+
+    def __len__(self) -> int:
+        return len(self._checkpoints)
+
+    def __iter__(self) -> Iterator[Checkpoint]:
+        return iter(self._checkpoints)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Checkpoint, list[Checkpoint]]:
+        return self._checkpoints[index]
+
+    def __setitem__(self, index: Union[int, slice], value: Union[Checkpoint, Iterable[Checkpoint]]) -> None:
+        self._checkpoints[index] = value
+        self._rebuild()
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        del self._checkpoints[index]
+        self._rebuild()
+
+    def insert(self, index: int, value: Checkpoint) -> None:
+        if index == 0:
+            # the totals after the new checkpoint stay the same if we lower the base instead
+            self._checkpoints.insert(0, value)
+            self._totals.insert(0, self._base)
+            self._base -= value.token_count
+        elif index >= len(self):
+            self.append(value)
+        else:
+            self._checkpoints.insert(index, value)
+            self._rebuild()
+
+    def append(self, value: Checkpoint) -> None:
+        total = self._totals[-1] if self._totals else self._base
+        self._checkpoints.append(value)
+        self._totals.append(total + value.token_count)
+
+    def pop(self, index: int = -1) -> Checkpoint:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("pop index out of range")
+        if index == length - 1:
+            self._totals.pop()
+            return self._checkpoints.pop()
+        if index == 0:
+            self._base = self._totals.pop(0)
+            return self._checkpoints.pop(0)
+        checkpoint = self._checkpoints.pop(index)
+        self._rebuild()
+        return checkpoint
+
+    def clear(self) -> None:
+        self._checkpoints.clear()
+        self._rebuild()
+
+    def __copy__(self) -> "CheckpointIndex":
+        return self.fork()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CheckpointIndex):
+            return self._checkpoints == other._checkpoints
+        if isinstance(other, (list, CopyOnWriteList)):
+            return self._checkpoints == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+
 @define
 class CheckpointData:
     """Aggregates all information about checkpoints"""
@@ -30,7 +157,7 @@ class CheckpointData:
     total_token_count: int = field(default=0)
 
     # in order list of individual checkpoints in the exchange
-    checkpoints: list[Checkpoint] = field(factory=list)
+    checkpoints: CheckpointIndex = field(factory=CheckpointIndex, converter=CheckpointIndex)
 
     # the offset to apply to the message index when calculating the last message index
     # this is useful because messages on the exchange behave like a queue, where you can only
@@ -40,10 +167,13 @@ class CheckpointData:
     message_index_offset: int = field(default=0)
 
     def __deepcopy__(self, memo: dict) -> "CheckpointData":
-        """Returns a deep copy of the CheckpointData object."""
+        """Returns a deep copy of the CheckpointData object.
+
+        Checkpoints are immutable, so the copy shares them until either list changes.
+        """
         return CheckpointData(
             total_token_count=self.total_token_count,
-            checkpoints=deepcopy(self.checkpoints, memo),
+            checkpoints=self.checkpoints.fork(),
             message_index_offset=self.message_index_offset,
         )
 
@@ -53,6 +183,13 @@ class CheckpointData:
             return -1  # we don't have enough information to know
         return self.checkpoints[-1].end_index - self.message_index_offset
 
+    def checkpoints_to_remove(self, max_tokens: int) -> int:
+        """The number of leading checkpoints to remove to bring the total token count down to max_tokens
+
+        This is all of the checkpoints if removing them is not enough.
+        """
+        return self.checkpoints.count_covering(self.total_token_count - max_tokens)
+
     def reset(self) -> None:
         """Resets the checkpoint data to its initial state."""
         self.checkpoints = []
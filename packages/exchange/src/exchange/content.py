@@ -18,7 +18,7 @@ class Content:
         return data
 
 
-@define
+@define(frozen=True)
 class Text(Content):
     text: str
 
@@ -27,7 +27,7 @@ class Text(Content):
         return "content:text\n" + self.text
 
 
-@define
+@define(frozen=True)
 class ToolUse(Content):
     id: str
     name: str
@@ -40,7 +40,7 @@ class ToolUse(Content):
         return f"content:tool_use:{self.name}\nparameters:{json.dumps(self.parameters)}"
 
 
-@define
+@define(frozen=True)
 class ToolResult(Content):
     tool_use_id: str
     output: str
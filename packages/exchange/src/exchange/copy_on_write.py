@@ -0,0 +1,143 @@
+from collections.abc import Iterable, Iterator, MutableSequence
+from typing import TypeVar, Union, overload
+
+T = TypeVar("T")
+
+# once this many items have been popped from the front of a list we own, we release them
+_COMPACT_THRESHOLD = 64
+
+
+class CopyOnWriteList(MutableSequence[T]):
+    """A list which can be forked in O(1), sharing its items until one of the forks changes
+
+    Each instance is a window [start, stop) onto a backing list, which is shared between forks.
+    The operations an exchange performs on its history stay O(1) while shared: appending claims
+    the end of the backing list if no other fork has already, and popping from either end only
+    moves the window. Any other change first copies the window into a list of its own.
+
+    The items themselves are never copied, so they are expected to be immutable.
+    """
+
+    __slots__ = ("_items", "_start", "_stop", "_shared")
+
+    def __init__(self, iterable: Iterable[T] = ()) -> None:
+        if isinstance(iterable, CopyOnWriteList):
+            iterable._shared = True
+            self._items = iterable._items
+            self._start = iterable._start
+            self._stop = iterable._stop
+            self._shared = True
+        else:
+            self._items = list(iterable)
+            self._start = 0
+            self._stop = len(self._items)
+            self._shared = False
+
+    def fork(self) -> "CopyOnWriteList[T]":
+        """Make a copy of this list in O(1), later changes to either one are not seen by the other"""
+        return CopyOnWriteList(self)
+
+    def _own(self) -> None:
+        """Copy the window into a backing list that only this instance refers to"""
+        if self._shared or self._start != 0 or self._stop != len(self._items):
+            self._items = self._items[self._start : self._stop]
+            self._start = 0
+            self._stop = len(self._items)
+            self._shared = False
+
+    def _index(self, index: int) -> int:
+        length = self._stop - self._start
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("list index out of range")
+        return self._start + index
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __iter__(self) -> Iterator[T]:
+        items = self._items
+        for index in range(self._start, self._stop):
+            yield items[index]
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[T]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, list[T]]:
+        if isinstance(index, slice):
+            return [self._items[i] for i in range(self._start, self._stop)[index]]
+        return self._items[self._index(index)]
+
+    def __setitem__(self, index: Union[int, slice], value: Union[T, Iterable[T]]) -> None:
+        self._own()
+        self._items[index] = value
+        self._stop = len(self._items)
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        self._own()
+        del self._items[index]
+        self._stop = len(self._items)
+
+    def insert(self, index: int, value: T) -> None:
+        if index == 0 and self._start > 0 and not self._shared:
+            # reuse the slot of an item we popped from the front
+            self._start -= 1
+            self._items[self._start] = value
+            return
+        self._own()
+        self._items.insert(index, value)
+        self._stop = len(self._items)
+
+    def append(self, value: T) -> None:
+        if self._stop != len(self._items):
+            if self._shared:
+                # another fork has already claimed the end of the backing list
+                self._own()
+            else:
+                del self._items[self._stop :]
+        self._items.append(value)
+        self._stop += 1
+
+    def extend(self, values: Iterable[T]) -> None:
+        for value in values:
+            self.append(value)
+
+    def pop(self, index: int = -1) -> T:
+        position = self._index(index)
+        value = self._items[position]
+        if position == self._stop - 1:
+            self._stop -= 1
+            if not self._shared and self._stop == len(self._items) - 1:
+                self._items.pop()
+        elif position == self._start:
+            self._start += 1
+            if not self._shared and self._start >= _COMPACT_THRESHOLD and self._start * 2 >= len(self._items):
+                self._own()
+        else:
+            self._own()
+            self._items.pop(index)
+            self._stop = len(self._items)
+        return value
+
+    def clear(self) -> None:
+        self._items = []
+        self._start = 0
+        self._stop = 0
+        self._shared = False
+
+    def __copy__(self) -> "CopyOnWriteList[T]":
+        return self.fork()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, CopyOnWriteList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)!r})"
@@ -1,18 +1,22 @@
+import asyncio
 import json
 import traceback
 from copy import deepcopy
-from typing import Mapping
+from typing import Callable, Mapping, Optional
 from attrs import define, evolve, field, Factory
 from exchange.langfuse_wrapper import observe_wrapper
-from tiktoken import get_encoding
 
 from exchange.checkpoint import Checkpoint, CheckpointData
 from exchange.content import Text, ToolResult, ToolUse
+from exchange.copy_on_write import CopyOnWriteList
 from exchange.message import Message
 from exchange.moderators import Moderator
 from exchange.moderators.truncate import ContextTruncate
 from exchange.providers import Provider, Usage
+from exchange.providers.streaming import MessageBuilder, StreamDelta
 from exchange.tool import Tool
+from exchange.tool_scheduler import MAX_TOOL_WORKERS, ToolScheduler
+from exchange.token_counter import get_tokenizer_service
 from exchange.token_usage_collector import _token_usage_collector
 
 
@@ -20,8 +24,7 @@ def validate_tool_output(output: str) -> None:
     """Validate tool output for the given model"""
     max_output_chars = 2**20
     max_output_tokens = 16000
-    encoder = get_encoding("cl100k_base")
-    if len(output) > max_output_chars or len(encoder.encode(output)) > max_output_tokens:
+    if len(output) > max_output_chars or get_tokenizer_service().exceeds(output, max_output_tokens):
         raise ValueError("This tool call created an output that was too long to handle!")
 
 
@@ -42,26 +45,29 @@ class Exchange:
     system: str
     moderator: Moderator = field(default=ContextTruncate())
     tools: tuple[Tool, ...] = field(factory=tuple, converter=tuple)
-    messages: list[Message] = field(factory=list)
+    messages: list[Message] = field(factory=CopyOnWriteList, converter=CopyOnWriteList)
     checkpoint_data: CheckpointData = field(factory=CheckpointData)
     generation_args: dict = field(default=Factory(dict))
+    max_tool_workers: int = field(default=MAX_TOOL_WORKERS)
 
     @property
     def _toolmap(self) -> Mapping[str, Tool]:
         return {tool.name: tool for tool in self.tools}
 
     def replace(self, **kwargs: dict[str, any]) -> "Exchange":
-        """Make a copy of the exchange, replacing any passed arguments"""
+        """Make a copy of the exchange, replacing any passed arguments
+
+        The copy shares the message history with this exchange until either of them changes it,
+        so this is cheap regardless of the length of the history.
+        """
         # TODO: ensure that the checkpoint data is updated correctly. aka,
         # if we replace the messages, we need to update the checkpoint data
         # if we change the model, we need to update the checkpoint data (?)
 
         if kwargs.get("messages") is None:
-            kwargs["messages"] = deepcopy(self.messages)
+            kwargs["messages"] = self.messages.fork()
         if kwargs.get("checkpoint_data") is None:
-            kwargs["checkpoint_data"] = deepcopy(
-                self.checkpoint_data,
-            )
+            kwargs["checkpoint_data"] = deepcopy(self.checkpoint_data)
         return evolve(self, **kwargs)
 
     def add(self, message: Message) -> None:
@@ -70,18 +76,72 @@ class Exchange:
             raise ValueError("Messages in the exchange must alternate between user and assistant")
         self.messages.append(message)
 
-    def generate(self) -> Message:
-        """Generate the next message."""
+    def generate(self, on_delta: Optional[Callable[[StreamDelta], None]] = None) -> Message:
+        """Generate the next message.
+
+        Args:
+            on_delta: If set, the message is streamed from the provider and this is called with
+                each delta as it arrives. The message is only added once it is complete.
+        """
         self.moderator.rewrite(self)
-        message, usage = self.provider.complete(
+        if on_delta is None:
+            message, usage = self.provider.complete(
+                self.model,
+                self.system,
+                messages=self.messages,
+                tools=self.tools,
+                **self.generation_args,
+            )
+        else:
+            message, usage = self._stream(
+                self.model,
+                self.system,
+                messages=self.messages,
+                tools=self.tools,
+                on_delta=on_delta,
+                **self.generation_args,
+            )
+        return self._record_generation(message, usage)
+
+    @observe_wrapper(as_type="generation")
+    def _stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        on_delta: Callable[[StreamDelta], None],
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        """Stream the next message from the provider, traced as one generation like provider.complete"""
+        builder = MessageBuilder()
+        for delta in self.provider.stream(model, system, messages=messages, tools=tools, **kwargs):
+            builder.add(delta)
+            on_delta(delta)
+        return builder.build()
+
+    async def agenerate(self) -> Message:
+        """Generate the next message, without blocking the event loop.
+
+        Moderators are synchronous and may call the provider themselves, so they run in a worker thread.
+        """
+        await asyncio.to_thread(self.moderator.rewrite, self)
+        message, usage = await self.provider.acomplete(
             self.model,
             self.system,
             messages=self.messages,
             tools=self.tools,
             **self.generation_args,
         )
+        return self._record_generation(message, usage)
+
+    def _record_generation(self, message: Message, usage: Usage) -> Message:
         self.add(message)
-        self.add_checkpoints_from_usage(usage)  # this has to come after adding the response
+        # this has to come after adding the response
+        if usage.input_tokens is None or usage.output_tokens is None:
+            self.add_checkpoints_from_usage(self._estimate_usage(usage))
+        else:
+            self.add_checkpoints_from_usage(usage)
 
         # TODO: also call `rewrite` here, as this will make our
         # messages *consistently* below the token limit. this currently
@@ -92,7 +152,7 @@ class Exchange:
         _token_usage_collector.collect(self.model, usage)
         return message
 
-    def reply(self, max_tool_use: int = 128) -> Message:
+    def reply(self, max_tool_use: int = 128, on_delta: Optional[Callable[[StreamDelta], None]] = None) -> Message:
         """Get the reply from the underlying model.
 
         This will process any requests for tool calls, calling them immediately, and
@@ -101,32 +161,60 @@ class Exchange:
 
         Args:
             max_tool_use: The maximum number of tool calls to make before returning. Defaults to 128.
+            on_delta: If set, each message is streamed and this is called with the deltas, see generate.
         """
         if max_tool_use <= 0:
             raise ValueError("max_tool_use must be greater than 0")
-        response = self.generate()
+        response = self.generate(on_delta=on_delta)
         curr_iter = 1  # generate() already called once
         while response.tool_use:
-            content = []
-            for tool_use in response.tool_use:
-                tool_result = self.call_function(tool_use)
-                content.append(tool_result)
+            content = self.call_functions(response.tool_use)
             self.add(Message(role="user", content=content))
 
             # We've reached the limit of tool calls - break out of the loop
             if curr_iter >= max_tool_use:
-                # At this point, the most recent message is `Message(role='user', content=ToolResult(...))`
-                response = Message.assistant(
-                    f"We've stopped executing additional tool cause because we reached the limit of {max_tool_use}",
-                )
-                self.add(response)
+                response = self._stop_tool_use(max_tool_use)
                 break
             else:
-                response = self.generate()
+                response = self.generate(on_delta=on_delta)
                 curr_iter += 1
 
         return response
 
+    async def areply(self, max_tool_use: int = 128) -> Message:
+        """Get the reply from the underlying model, without blocking the event loop.
+
+        This behaves like reply, with tools run in a worker thread.
+
+        Args:
+            max_tool_use: The maximum number of tool calls to make before returning. Defaults to 128.
+        """
+        if max_tool_use <= 0:
+            raise ValueError("max_tool_use must be greater than 0")
+        response = await self.agenerate()
+        curr_iter = 1  # agenerate() already called once
+        while response.tool_use:
+            content = await asyncio.to_thread(self.call_functions, response.tool_use)
+            self.add(Message(role="user", content=content))
+
+            # We've reached the limit of tool calls - break out of the loop
+            if curr_iter >= max_tool_use:
+                response = self._stop_tool_use(max_tool_use)
+                break
+            else:
+                response = await self.agenerate()
+                curr_iter += 1
+
+        return response
+
+    def _stop_tool_use(self, max_tool_use: int) -> Message:
+        # At this point, the most recent message is `Message(role='user', content=ToolResult(...))`
+        response = Message.assistant(
+            f"We've stopped executing additional tool cause because we reached the limit of {max_tool_use}",
+        )
+        self.add(response)
+        return response
+
     @observe_wrapper()
     def call_function(self, tool_use: ToolUse) -> ToolResult:
         """Call the function indicated by the tool use"""
@@ -163,6 +251,21 @@ class Exchange:
 
         return ToolResult(tool_use_id=tool_use.id, output=output, is_error=is_error)
 
+    def call_functions(self, tool_uses: list[ToolUse]) -> list[ToolResult]:
+        """Call the functions indicated by the tool uses, returning results in the same order
+
+        Tools which are parallel safe run concurrently with each other, any other tool
+        runs on its own once the tools requested before it have completed.
+        """
+        toolmap = self._toolmap
+
+        def is_parallel_safe(tool_use: ToolUse) -> bool:
+            tool = toolmap.get(tool_use.name)
+            return tool is None or tool.parallel_safe
+
+        scheduler = ToolScheduler(max_workers=self.max_tool_workers)
+        return scheduler.run(tool_uses, call=self.call_function, is_parallel_safe=is_parallel_safe)
+
     def add_tool_use(self, tool_use: ToolUse) -> None:
         """Manually add a tool use and corresponding result
 
@@ -173,6 +276,28 @@ class Exchange:
         self.add(Message(role="assistant", content=[tool_use]))
         self.add(Message(role="user", content=[tool_result]))
 
+    def _estimate_usage(self, usage: Usage) -> Usage:
+        """Fill in the token counts the provider didn't report, by counting the new messages
+
+        Some streams end without reporting usage, for example when the server doesn't support
+        requesting it. The estimate keeps the checkpoints, and so truncation, going regardless.
+        """
+        tokenizer = get_tokenizer_service()
+
+        def count(messages: list[Message]) -> int:
+            return sum(tokenizer.count(json.dumps(message.to_dict())) for message in messages)
+
+        start = 0
+        if len(self.checkpoint_data.checkpoints) > 0:
+            start = self.checkpoint_data.last_message_index - self.checkpoint_data.message_index_offset + 1
+        input_tokens = usage.input_tokens
+        if input_tokens is None:
+            input_tokens = self.checkpoint_data.total_token_count + count(self.messages[start:-1])
+        output_tokens = usage.output_tokens if usage.output_tokens is not None else count(self.messages[-1:])
+        return evolve(
+            usage, input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=input_tokens + output_tokens
+        )
+
     def add_checkpoints_from_usage(self, usage: Usage) -> None:
         """
         Add checkpoints to the exchange based on the token counts of the last two
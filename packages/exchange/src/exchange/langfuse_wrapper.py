@@ -4,22 +4,26 @@ Langfuse Integration Module
 This module provides integration with Langfuse, a tool for monitoring and tracing LLM applications.
 
 Usage:
-    Import this module to enable Langfuse integration.
-    It automatically checks for Langfuse credentials in the .env.langfuse file and for a running Langfuse server.
-    If these are found, it will set up the necessary client and context for tracing.
+    Decorate functions with observe_wrapper, and call enable_tracing to start tracing them.
+    Tracing is off until then, and Langfuse is not even imported, so the decorated functions cost next to nothing.
+    enable_tracing checks for Langfuse credentials in the .env.langfuse.local file and for a running Langfuse server.
 
 Note:
     Run setup_langfuse.sh which automates the steps for running local Langfuse.
 """
 
+import contextlib
 import os
-from typing import Callable
-from dotenv import load_dotenv
-from langfuse.decorators import langfuse_context
-import sys
+import threading
+from functools import wraps
 from io import StringIO
 from pathlib import Path
-from functools import wraps  # Add this import
+from typing import Any, Callable, Optional
+
+# spans are sent from a background thread in batches of this size, or after this many seconds
+TRACE_FLUSH_AT = 50
+TRACE_FLUSH_INTERVAL = 5
+TRACE_THREADS = 1
 
 
 def find_package_root(start_path: Path, marker_file: str = "pyproject.toml") -> Path:
@@ -30,55 +34,83 @@ def find_package_root(start_path: Path, marker_file: str = "pyproject.toml") ->
     return None
 
 
-def auth_check() -> bool:
-    # Temporarily redirect stdout and stderr to suppress print statements from Langfuse
-    temp_stderr = StringIO()
-    sys.stderr = temp_stderr
+CURRENT_DIR = Path(__file__).parent
+PACKAGE_ROOT = find_package_root(CURRENT_DIR)
 
-    # Load environment variables
-    load_dotenv(LANGFUSE_ENV_FILE, override=True)
+LANGFUSE_ENV_FILE = os.path.join(PACKAGE_ROOT, ".env.langfuse.local") if PACKAGE_ROOT else None
 
-    auth_val = langfuse_context.auth_check()
+# set by enable_tracing, the decorated functions are traced while this is true
+HAS_LANGFUSE_CREDENTIALS = False
+langfuse_context: Optional[Any] = None
+_lock = threading.Lock()
 
-    # Restore stderr
-    sys.stderr = sys.__stderr__
-    return auth_val
 
+def _load_langfuse() -> Any:  # noqa: ANN401
+    global langfuse_context
+    if langfuse_context is None:
+        from dotenv import load_dotenv
+        from langfuse.decorators import langfuse_context as context
 
-CURRENT_DIR = Path(__file__).parent
-PACKAGE_ROOT = find_package_root(CURRENT_DIR)
+        load_dotenv(LANGFUSE_ENV_FILE, override=True)
+        langfuse_context = context
+    return langfuse_context
+
+
+def auth_check() -> bool:
+    """Check for Langfuse credentials and a server which accepts them, which may call the server"""
+    with _lock:
+        context = _load_langfuse()
+    # suppress the print statements from Langfuse
+    with contextlib.redirect_stderr(StringIO()):
+        return context.auth_check()
 
-LANGFUSE_ENV_FILE = os.path.join(PACKAGE_ROOT, ".env.langfuse.local") if PACKAGE_ROOT else None
-HAS_LANGFUSE_CREDENTIALS = False
-load_dotenv(LANGFUSE_ENV_FILE, override=True)
 
-HAS_LANGFUSE_CREDENTIALS = auth_check()
+def enable_tracing() -> bool:
+    """Start tracing the decorated functions, returning whether Langfuse is available
+
+    Spans are queued and sent to the server in batches from a background thread, so a traced
+    call only pays for recording its span.
+    """
+    global HAS_LANGFUSE_CREDENTIALS
+    if not auth_check():
+        return False
+    langfuse_context.configure(
+        enabled=True,
+        flush_at=TRACE_FLUSH_AT,
+        flush_interval=TRACE_FLUSH_INTERVAL,
+        threads=TRACE_THREADS,
+    )
+    HAS_LANGFUSE_CREDENTIALS = True
+    return True
 
 
 def observe_wrapper(*args, **kwargs) -> Callable:  # noqa
     """
-    A decorator that wraps a function with Langfuse context observation if credentials are available.
+    A decorator that traces a function with Langfuse context observation once tracing is enabled.
 
-    If Langfuse credentials were found, the function will be wrapped with Langfuse's observe method.
-    Otherwise, the function will be returned as-is.
+    The Langfuse wrapper is created the first time the function is called with tracing enabled and then reused.
+    Until tracing is enabled, the function is called directly.
 
     Args:
         *args: Positional arguments to pass to langfuse_context.observe.
         **kwargs: Keyword arguments to pass to langfuse_context.observe.
 
     Returns:
-        Callable: The wrapped function if credentials are available, otherwise the original function.
+        Callable: The wrapped function.
     """
 
     def _wrapper(fn: Callable) -> Callable:
-        if HAS_LANGFUSE_CREDENTIALS:
-
-            @wraps(fn)
-            def wrapped_fn(*fargs, **fkwargs):  # noqa
-                return langfuse_context.observe(*args, **kwargs)(fn)(*fargs, **fkwargs)
-
-            return wrapped_fn
-        else:
-            return fn
+        observed = None
+
+        @wraps(fn)
+        def wrapped_fn(*fargs, **fkwargs):  # noqa
+            nonlocal observed
+            if not HAS_LANGFUSE_CREDENTIALS:
+                return fn(*fargs, **fkwargs)
+            if observed is None:
+                observed = langfuse_context.observe(*args, **kwargs)(fn)
+            return observed(*fargs, **fkwargs)
+
+        return wrapped_fn
 
     return _wrapper
@@ -29,11 +29,12 @@ def content_converter(contents: list[dict[str, any]]) -> list[Content]:
     return [(CONTENT_TYPES[c.pop("type")](**c) if c.__class__ not in CONTENT_TYPES.values() else c) for c in contents]
 
 
-@define
+@define(frozen=True)
 class Message:
     """A message to or from a language model.
 
     This supports several content types to extend to tool usage and (tbi) images.
+    Messages and their content are immutable, so that they can be shared between exchanges.
 
     We also provide shortcuts for simplified text usage; these two are identical:
     ```
@@ -1,16 +1,27 @@
 from functools import cache
+from importlib import import_module
 
 from exchange.invalid_choice_error import InvalidChoiceError
 from exchange.moderators.base import Moderator
-from exchange.utils import load_plugins
-from exchange.moderators.passive import PassiveModerator  # noqa
-from exchange.moderators.truncate import ContextTruncate  # noqa
-from exchange.moderators.summarizer import ContextSummarizer  # noqa
+from exchange.plugins import plugin_registry
+
+# the moderators are imported when they are first used
+_LAZY_MODERATORS = {
+    "PassiveModerator": "exchange.moderators.passive",
+    "ContextTruncate": "exchange.moderators.truncate",
+    "ContextSummarizer": "exchange.moderators.summarizer",
+}
+
+
+def __getattr__(name: str) -> type[Moderator]:
+    if name in _LAZY_MODERATORS:
+        return getattr(import_module(_LAZY_MODERATORS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @cache
 def get_moderator(name: str) -> type[Moderator]:
-    moderators = load_plugins(group="exchange.moderator")
+    moderators = plugin_registry("exchange.moderator")
     if name not in moderators:
         raise InvalidChoiceError("moderator", name, moderators.keys())
     return moderators[name]
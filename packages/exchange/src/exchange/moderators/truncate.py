@@ -6,6 +6,7 @@ from exchange.checkpoint import CheckpointData
 from exchange.message import Message
 from exchange.moderators import PassiveModerator
 from exchange.moderators.base import Moderator
+from exchange.token_counter import get_token_counter
 
 if TYPE_CHECKING:
     from exchange.exchange import Exchange
@@ -47,36 +48,46 @@ class ContextTruncate(Moderator):
 
         if not self.system_prompt_token_count or is_different_system_prompt:
             # calculate the system prompt tokens (includes functions etc...)
-            # we use a placeholder message with one token, which we subtract later
-            # this ensures compatibility with providers that require a user message
-            _system_token_exchange = exchange.replace(
-                messages=[Message.user("a")],
-                checkpoint_data=CheckpointData(),
-                moderator=PassiveModerator(),
-                model=self.model if self.model else exchange.model,
-            )
-            _system_token_exchange.generate()
             last_system_prompt_token_count = self.system_prompt_token_count
-            self.system_prompt_token_count = _system_token_exchange.checkpoint_data.total_token_count - 1
+            self.system_prompt_token_count = self._count_system_prompt_tokens(exchange)
 
             exchange.checkpoint_data.total_token_count -= last_system_prompt_token_count
             exchange.checkpoint_data.total_token_count += self.system_prompt_token_count
 
-    def _get_messages_to_remove(self, exchange: Exchange) -> list[Message]:
-        # this keeps all the messages/checkpoints
-        throwaway_exchange = exchange.replace(
+    def _count_system_prompt_tokens(self, exchange: Exchange) -> int:
+        model = self.model if self.model else exchange.model
+        token_counter = get_token_counter(model)
+        if token_counter is not None:
+            return token_counter.count_system(exchange.system, exchange.tools)
+
+        # without a local counter we ask the provider, with a placeholder message with one token
+        # which we subtract later. this ensures compatibility with providers that require a user message
+        _system_token_exchange = exchange.replace(
+            messages=[Message.user("a")],
+            checkpoint_data=CheckpointData(),
             moderator=PassiveModerator(),
+            model=model,
         )
+        _system_token_exchange.generate()
+        return _system_token_exchange.checkpoint_data.total_token_count - 1
+
+    def _get_messages_to_remove(self, exchange: Exchange) -> list[Message]:
+        checkpoint_data = exchange.checkpoint_data
+        checkpoints = checkpoint_data.checkpoints
+
+        # find how many checkpoints must go from the front, without changing the exchange
+        count = checkpoint_data.checkpoints_to_remove(self.max_tokens)
 
-        # get the messages that we want to remove
-        messages_to_remove = []
-        while throwaway_exchange.checkpoint_data.total_token_count > self.max_tokens:
-            _, messages = throwaway_exchange.pop_first_checkpoint()
-            messages_to_remove.extend(messages)
+        def messages_covered(count: int) -> int:
+            # removing a checkpoint also removes any messages before it
+            if count == 0:
+                return 0
+            return checkpoints[count - 1].end_index - checkpoint_data.message_index_offset + 1
 
-        while len(throwaway_exchange.messages) > 0 and throwaway_exchange.messages[0].tool_result:
-            # we would need a corresponding tool use once we resume, so we pop this one off too
+        end = messages_covered(count)
+        while end < len(exchange.messages) and exchange.messages[end].tool_result and count < len(checkpoints):
+            # we would need a corresponding tool use once we resume, so we remove this one too
             # and summarize it as well
-            _, messages = throwaway_exchange.pop_first_checkpoint()
-            messages_to_remove.extend(messages)
-        return messages_to_remove
+            count += 1
+            end = messages_covered(count)
+        return exchange.messages[:end]
@@ -0,0 +1,51 @@
+import threading
+from collections.abc import Iterator, Mapping
+from functools import cache
+from importlib.metadata import EntryPoint, entry_points
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class PluginRegistry(Mapping[str, T], Generic[T]):
+    """The plugins registered under an entry point group, imported only when they are looked up
+
+    The names come from the installed package metadata, so listing or checking for a plugin
+    does not import anything. Looking a plugin up loads it once, iterating over the items loads
+    all of them.
+    """
+
+    def __init__(self, group: str) -> None:
+        self.group = group
+        self._entry_points: Optional[dict[str, EntryPoint]] = None
+        self._loaded: dict[str, T] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def entry_points(self) -> dict[str, EntryPoint]:
+        if self._entry_points is None:
+            self._entry_points = {entry_point.name: entry_point for entry_point in entry_points(group=self.group)}
+        return self._entry_points
+
+    def __getitem__(self, name: str) -> T:
+        if name not in self._loaded:
+            entry_point = self.entry_points[name]
+            with self._lock:
+                if name not in self._loaded:
+                    self._loaded[name] = entry_point.load()
+        return self._loaded[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.entry_points
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entry_points)
+
+    def __len__(self) -> int:
+        return len(self.entry_points)
+
+
+@cache
+def plugin_registry(group: str) -> PluginRegistry:
+    """The registry for an entry point group, shared by everything which looks plugins up in it"""
+    return PluginRegistry(group)
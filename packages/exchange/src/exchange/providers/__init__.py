@@ -1,21 +1,31 @@
 from functools import cache
+from importlib import import_module
 
 from exchange.invalid_choice_error import InvalidChoiceError
-from exchange.providers.anthropic import AnthropicProvider  # noqa
+from exchange.plugins import plugin_registry
 from exchange.providers.base import Provider, Usage  # noqa
-from exchange.providers.databricks import DatabricksProvider  # noqa
-from exchange.providers.openai import OpenAiProvider  # noqa
-from exchange.providers.ollama import OllamaProvider  # noqa
-from exchange.providers.groq import GroqProvider  # noqa
-from exchange.providers.azure import AzureProvider  # noqa
-from exchange.providers.google import GoogleProvider  # noqa
 
-from exchange.utils import load_plugins
+# the providers are imported when they are first used, since each brings in its own dependencies
+_LAZY_PROVIDERS = {
+    "AnthropicProvider": "exchange.providers.anthropic",
+    "DatabricksProvider": "exchange.providers.databricks",
+    "OpenAiProvider": "exchange.providers.openai",
+    "OllamaProvider": "exchange.providers.ollama",
+    "GroqProvider": "exchange.providers.groq",
+    "AzureProvider": "exchange.providers.azure",
+    "GoogleProvider": "exchange.providers.google",
+}
+
+
+def __getattr__(name: str) -> type[Provider]:
+    if name in _LAZY_PROVIDERS:
+        return getattr(import_module(_LAZY_PROVIDERS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @cache
 def get_provider(name: str) -> type[Provider]:
-    providers = load_plugins(group="exchange.provider")
+    providers = plugin_registry("exchange.provider")
     if name not in providers:
         raise InvalidChoiceError("provider", name, providers.keys())
     return providers[name]
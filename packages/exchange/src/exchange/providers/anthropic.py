@@ -1,16 +1,23 @@
+import json
 import os
+from typing import Iterator, Optional
 
 import httpx
 
 from exchange import Message, Tool
 from exchange.content import Text, ToolResult, ToolUse
 from exchange.providers.base import Provider, Usage
+from exchange.providers.spec_cache import SpecCache
+from exchange.providers.streaming import StreamDelta, TextDelta, ToolUseDelta, UsageDelta
 from tenacity import retry, wait_fixed, stop_after_attempt
-from exchange.providers.utils import retry_if_status, raise_for_status
+from exchange.providers.utils import iter_sse, open_stream, retry_if_status, raise_for_status
 from exchange.langfuse_wrapper import observe_wrapper
 
 ANTHROPIC_HOST = "https://api.anthropic.com/v1/messages"
 
+# the prefix of the prompt up to each block marked with this is cached for a few minutes
+CACHE_CONTROL = {"type": "ephemeral"}
+
 retry_procedure = retry(
     wait=wait_fixed(2),
     stop=stop_after_attempt(2),
@@ -20,34 +27,43 @@ retry_procedure = retry(
 
 
 class AnthropicProvider(Provider):
-    """Provides chat completions for models hosted directly by Anthropic."""
+    """Provides chat completions for models hosted directly by Anthropic.
+
+    Set ANTHROPIC_PROMPT_CACHING=true to cache the system prompt, tools and conversation
+    between requests, which makes long sessions faster and cheaper.
+    """
 
     PROVIDER_NAME = "anthropic"
     REQUIRED_ENV_VARS = ["ANTHROPIC_API_KEY"]
 
-    def __init__(self, client: httpx.Client) -> None:
+    def __init__(self, client: httpx.Client, prompt_caching: bool = False) -> None:
         self.client = client
+        self.prompt_caching = prompt_caching
 
     @classmethod
     def from_env(cls: type["AnthropicProvider"]) -> "AnthropicProvider":
         cls.check_env_vars()
         url = os.environ.get("ANTHROPIC_HOST", ANTHROPIC_HOST)
         key = os.environ.get("ANTHROPIC_API_KEY")
+        prompt_caching = os.environ.get("ANTHROPIC_PROMPT_CACHING", "").lower() in ("1", "true", "yes")
+        headers = {
+            "x-api-key": key,
+            "content-type": "application/json",
+            "anthropic-version": "2023-06-01",
+        }
+        if prompt_caching:
+            headers["anthropic-beta"] = "prompt-caching-2024-07-31"
         client = httpx.Client(
             base_url=url,
-            headers={
-                "x-api-key": key,
-                "content-type": "application/json",
-                "anthropic-version": "2023-06-01",
-            },
+            headers=headers,
             timeout=httpx.Timeout(60 * 10),
         )
-        return cls(client)
+        return cls(client, prompt_caching=prompt_caching)
 
     @staticmethod
     def get_usage(data: dict) -> Usage:  # noqa: ANN401
         usage = data.get("usage")
-        input_tokens = usage.get("input_tokens")
+        input_tokens = AnthropicProvider.get_input_tokens(usage)
         output_tokens = usage.get("output_tokens")
         total_tokens = usage.get("total_tokens")
 
@@ -58,8 +74,20 @@ class AnthropicProvider(Provider):
             input_tokens=input_tokens,
             output_tokens=output_tokens,
             total_tokens=total_tokens,
+            cache_read_tokens=usage.get("cache_read_input_tokens"),
+            cache_write_tokens=usage.get("cache_creation_input_tokens"),
         )
 
+    @staticmethod
+    def get_input_tokens(usage: dict) -> Optional[int]:
+        """The size of the whole prompt, anthropic reports the tokens read from and written to the cache separately"""
+        input_tokens = usage.get("input_tokens")
+        if input_tokens is None:
+            return None
+        cache_read_tokens = usage.get("cache_read_input_tokens") or 0
+        cache_write_tokens = usage.get("cache_creation_input_tokens") or 0
+        return input_tokens + cache_read_tokens + cache_write_tokens
+
     @staticmethod
     def anthropic_response_to_message(response: dict) -> Message:
         content_blocks = response.get("content", [])
@@ -77,6 +105,39 @@ class AnthropicProvider(Provider):
                 )
         return Message(role="assistant", content=content)
 
+    @staticmethod
+    def anthropic_stream_to_deltas(events: Iterator[tuple[Optional[str], str]]) -> Iterator[StreamDelta]:
+        """Convert the server-sent events of a streamed message into deltas"""
+        for event, data in events:
+            if event == "ping":
+                continue
+            body = json.loads(data)
+            if event == "error":
+                raise ValueError(f"Error while streaming the message: {body.get('error')}")
+            if event == "message_start":
+                usage = body["message"].get("usage", {})
+                yield UsageDelta(
+                    input_tokens=AnthropicProvider.get_input_tokens(usage),
+                    output_tokens=usage.get("output_tokens"),
+                    cache_read_tokens=usage.get("cache_read_input_tokens"),
+                    cache_write_tokens=usage.get("cache_creation_input_tokens"),
+                )
+            elif event == "content_block_start":
+                block = body["content_block"]
+                if block["type"] == "text" and block.get("text"):
+                    yield TextDelta(block["text"])
+                elif block["type"] == "tool_use":
+                    yield ToolUseDelta(index=body["index"], id=block["id"], name=block["name"])
+            elif event == "content_block_delta":
+                delta = body["delta"]
+                if delta["type"] == "text_delta":
+                    yield TextDelta(delta["text"])
+                elif delta["type"] == "input_json_delta":
+                    yield ToolUseDelta(index=body["index"], arguments=delta["partial_json"])
+            elif event == "message_delta":
+                usage = body.get("usage", {})
+                yield UsageDelta(output_tokens=usage.get("output_tokens"))
+
     @staticmethod
     def tools_to_anthropic_spec(tools: tuple[Tool, ...]) -> list[dict[str, any]]:
         return [
@@ -88,33 +149,35 @@ class AnthropicProvider(Provider):
             for tool in tools
         ]
 
+    @staticmethod
+    def message_to_anthropic_spec(message: Message) -> dict[str, any]:
+        converted = {"role": message.role}
+        for content in message.content:
+            if isinstance(content, Text):
+                converted["content"] = [{"type": "text", "text": content.text}]
+            elif isinstance(content, ToolUse):
+                converted.setdefault("content", []).append(
+                    {
+                        "type": "tool_use",
+                        "id": content.id,
+                        "name": content.name,
+                        "input": content.parameters,
+                    }
+                )
+            elif isinstance(content, ToolResult):
+                converted.setdefault("content", []).append(
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": content.tool_use_id,
+                        "content": content.output,
+                    }
+                )
+        return converted
+
     @staticmethod
     def messages_to_anthropic_spec(messages: list[Message]) -> list[dict[str, any]]:
-        messages_spec = []
+        messages_spec = [_message_spec_cache(message) for message in messages]
         # if messages is empty - just make a default
-        for message in messages:
-            converted = {"role": message.role}
-            for content in message.content:
-                if isinstance(content, Text):
-                    converted["content"] = [{"type": "text", "text": content.text}]
-                elif isinstance(content, ToolUse):
-                    converted.setdefault("content", []).append(
-                        {
-                            "type": "tool_use",
-                            "id": content.id,
-                            "name": content.name,
-                            "input": content.parameters,
-                        }
-                    )
-                elif isinstance(content, ToolResult):
-                    converted.setdefault("content", []).append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content.tool_use_id,
-                            "content": content.output,
-                        }
-                    )
-            messages_spec.append(converted)
         if len(messages_spec) == 0:
             converted = {
                 "role": "user",
@@ -132,32 +195,118 @@ class AnthropicProvider(Provider):
         tools: list[Tool] = None,
         **kwargs: dict[str, any],
     ) -> tuple[Message, Usage]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        response = self._post(payload)
+        message = self.anthropic_response_to_message(response)
+        usage = self.get_usage(response)
+
+        return message, usage
+
+    @observe_wrapper(as_type="generation")
+    async def acomplete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: list[Tool] = None,
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        response = await self._apost(payload)
+        message = self.anthropic_response_to_message(response)
+        usage = self.get_usage(response)
+
+        return message, usage
+
+    def stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: list[Tool] = None,
+        **kwargs: dict[str, any],
+    ) -> Iterator[StreamDelta]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        payload.update(stream=True)
+        response = self._open_stream(payload)
+        try:
+            yield from self.anthropic_stream_to_deltas(iter_sse(response))
+        finally:
+            response.close()
+
+    def get_payload(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: list[Tool] = None,
+        **kwargs: dict[str, any],
+    ) -> dict[str, any]:
         if tools is None:
             tools = []
-        tools_set = set()
-        unique_tools = []
-        for tool in tools:
-            if tool.name not in tools_set:
-                unique_tools.append(tool)
-                tools_set.add(tool.name)
 
         payload = dict(
             system=system,
             model=model,
             max_tokens=4096,
             messages=self.messages_to_anthropic_spec(messages),
-            tools=self.tools_to_anthropic_spec(tuple(unique_tools)),
+            tools=_tools_spec_cache(*tools),
             **kwargs,
         )
         payload = {k: v for k, v in payload.items() if v}
+        if self.prompt_caching:
+            self.add_cache_breakpoints(payload)
+        return payload
 
-        response = self._post(payload)
-        message = self.anthropic_response_to_message(response)
-        usage = self.get_usage(response)
+    @staticmethod
+    def add_cache_breakpoints(payload: dict[str, any]) -> None:
+        """Mark the system prompt, the tools and the latest user messages to be cached
 
-        return message, usage
+        The system prompt and tools rarely change, so they are read from the cache on every turn.
+        Marking the last user message writes the whole conversation to the cache, and marking the
+        one before reads what the previous turn wrote. Anthropic allows four breakpoints at most.
+
+        The converted messages and tools are shared with the spec caches, so they are copied here.
+        """
+        if payload.get("system"):
+            payload["system"] = [{"type": "text", "text": payload["system"], "cache_control": CACHE_CONTROL}]
+        if payload.get("tools"):
+            payload["tools"] = [*payload["tools"][:-1], {**payload["tools"][-1], "cache_control": CACHE_CONTROL}]
+
+        messages = list(payload["messages"])
+        user_indices = [index for index, message in enumerate(messages) if message["role"] == "user"]
+        for index in user_indices[-2:]:
+            content = messages[index].get("content")
+            if not content:
+                continue
+            content = [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}]
+            messages[index] = {**messages[index], "content": content}
+        payload["messages"] = messages
 
     @retry_procedure
     def _post(self, payload: dict) -> httpx.Response:
         response = self.client.post(ANTHROPIC_HOST, json=payload)
         return raise_for_status(response).json()
+
+    @retry_procedure
+    def _open_stream(self, payload: dict) -> httpx.Response:
+        return open_stream(self.client, ANTHROPIC_HOST, payload)
+
+    @retry_procedure
+    async def _apost(self, payload: dict) -> dict:
+        response = await self.async_client.post(ANTHROPIC_HOST, json=payload)
+        return raise_for_status(response).json()
+
+
+def _unique_tools_to_anthropic_spec(*tools: Tool) -> list[dict[str, any]]:
+    tools_set = set()
+    unique_tools = []
+    for tool in tools:
+        if tool.name not in tools_set:
+            unique_tools.append(tool)
+            tools_set.add(tool.name)
+    return AnthropicProvider.tools_to_anthropic_spec(tuple(unique_tools))
+
+
+_message_spec_cache = SpecCache(AnthropicProvider.message_to_anthropic_spec)
+_tools_spec_cache = SpecCache(_unique_tools_to_anthropic_spec, maxsize=16)
@@ -14,6 +14,8 @@ class AzureProvider(OpenAiProvider):
         "AZURE_CHAT_COMPLETIONS_DEPLOYMENT_API_VERSION",
         "AZURE_CHAT_COMPLETIONS_KEY",
     ]
+    # api versions before 2024-09-01-preview reject stream_options
+    STREAM_OPTIONS = None
 
     def __init__(self, client: httpx.Client) -> None:
         super().__init__(client)
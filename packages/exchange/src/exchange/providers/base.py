@@ -1,27 +1,59 @@
+import asyncio
 import os
 from abc import ABC, abstractmethod
 from attrs import define, field
-from typing import Optional
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import httpx
 
 from exchange.message import Message
 from exchange.tool import Tool
 
+if TYPE_CHECKING:
+    from exchange.providers.streaming import StreamDelta
+
 
-@define(hash=True)
+@define(hash=True, repr=False)
 class Usage:
+    """Token usage of a generation
+
+    When the provider caches the prompt, input_tokens still counts the whole prompt and the
+    cache fields break down how much of it was read from or written to the cache.
+    """
+
     input_tokens: int = field(factory=None)
     output_tokens: int = field(default=None)
     total_tokens: int = field(default=None)
+    cache_read_tokens: Optional[int] = field(default=None)
+    cache_write_tokens: Optional[int] = field(default=None)
+
+    def __repr__(self) -> str:
+        fields = ["input_tokens", "output_tokens", "total_tokens"]
+        # the cache fields are only shown for providers which report them
+        fields += [name for name in ("cache_read_tokens", "cache_write_tokens") if getattr(self, name) is not None]
+        return f"Usage({', '.join(f'{name}={getattr(self, name)!r}' for name in fields)})"
 
 
 class Provider(ABC):
     PROVIDER_NAME: str
     REQUIRED_ENV_VARS: list[str] = []
 
+    # lazily created by the async_client property, shared by every async call on this provider
+    _async_client: Optional[httpx.AsyncClient] = None
+
     @classmethod
     def from_env(cls: type["Provider"]) -> "Provider":
         return cls()
 
+    @classmethod
+    def is_available(cls: type["Provider"], timeout: float) -> bool:
+        """Whether the provider looks usable here, without building a client for it
+
+        This only checks the environment, providers which need no credentials override it with a
+        health check that gives up after the timeout.
+        """
+        return all(env_var in os.environ for env_var in cls.REQUIRED_ENV_VARS)
+
     @classmethod
     def check_env_vars(cls: type["Provider"], instructions_url: Optional[str] = None) -> None:
         for env_var in cls.REQUIRED_ENV_VARS:
@@ -40,6 +72,72 @@ class Provider(ABC):
         """Generate the next message using the specified model"""
         pass
 
+    def stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> Iterator["StreamDelta"]:
+        """Generate the next message using the specified model, as a stream of deltas
+
+        The deltas can be assembled into the message and its usage with a MessageBuilder.
+        Providers which support streaming override this, so that text is available as
+        soon as it is generated. The default completes the message and then replays it.
+        """
+        from exchange.providers.streaming import message_to_deltas
+
+        message, usage = self.complete(model, system, messages, tools, **kwargs)
+        yield from message_to_deltas(message, usage)
+
+    async def acomplete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        """Generate the next message using the specified model, without blocking the event loop
+
+        Providers backed by httpx override this with a native implementation on top of
+        async_client. The default runs complete in a worker thread, so that any provider
+        can be used from async code.
+        """
+        return await asyncio.to_thread(self.complete, model, system, messages, tools, **kwargs)
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """A pooled async client configured like this provider's client
+
+        The client is created on first use and then shared, so that concurrent requests
+        reuse connections. Like any httpx.AsyncClient, it should be driven from a single event loop.
+        """
+        if self._async_client is None:
+            self._async_client = self.create_async_client()
+        return self._async_client
+
+    def create_async_client(self) -> httpx.AsyncClient:
+        """Create the async counterpart of this provider's httpx client"""
+        client: httpx.Client = self.client
+        return httpx.AsyncClient(
+            base_url=client.base_url,
+            headers=client.headers,
+            params=client.params,
+            auth=client.auth,
+            timeout=client.timeout,
+            transport=self.async_transport(),
+        )
+
+    def async_transport(self) -> Optional[httpx.AsyncBaseTransport]:
+        """The transport for the async client, paced by the governor of the sync client if it has one"""
+        from exchange.providers.rate_limit import AsyncRateLimitedTransport
+
+        if (governor := getattr(self.client, "rate_limit_governor", None)) is not None:
+            return AsyncRateLimitedTransport(httpx.AsyncHTTPTransport(), governor)
+        return None
+
 
 class MissingProviderEnvVariableError(Exception):
     def __init__(self, env_variable: str, provider: str, instructions_url: Optional[str] = None) -> None:
@@ -3,8 +3,10 @@ import hmac
 import json
 import logging
 import os
+import struct
+import zlib
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterator, Optional
 from urllib.parse import quote, urlparse
 
 import httpx
@@ -12,8 +14,10 @@ import httpx
 from exchange.content import Text, ToolResult, ToolUse
 from exchange.message import Message
 from exchange.providers import Provider, Usage
+from exchange.providers.spec_cache import SpecCache
+from exchange.providers.streaming import StreamDelta, TextDelta, ToolUseDelta, UsageDelta
 from tenacity import retry, wait_fixed, stop_after_attempt
-from exchange.providers.utils import raise_for_status, retry_if_status
+from exchange.providers.utils import open_stream, raise_for_status, retry_if_status
 from exchange.tool import Tool
 from exchange.langfuse_wrapper import observe_wrapper
 
@@ -30,30 +34,69 @@ retry_procedure = retry(
 )
 
 
-class AwsClient(httpx.Client):
-    def __init__(
+# the size of the value of each fixed size header type in the event stream encoding
+_EVENT_STREAM_HEADER_SIZES = {2: 1, 3: 2, 4: 4, 5: 8, 8: 8, 9: 16}
+
+
+def iter_event_stream(chunks: Iterator[bytes]) -> Iterator[tuple[dict[str, any], bytes]]:
+    """Decode a body in the application/vnd.amazon.eventstream encoding into (headers, payload) pairs
+
+    Each message is framed as a prelude of its total and header lengths with a checksum,
+    the headers, the payload and a checksum of the whole message.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer.extend(chunk)
+        while len(buffer) >= 12:
+            total_length, headers_length, prelude_crc = struct.unpack(">III", buffer[:12])
+            if zlib.crc32(buffer[:8]) != prelude_crc:
+                raise ValueError("Corrupted event stream: the prelude checksum does not match")
+            if len(buffer) < total_length:
+                break
+            message = bytes(buffer[:total_length])
+            del buffer[:total_length]
+            if zlib.crc32(message[:-4]) != struct.unpack(">I", message[-4:])[0]:
+                raise ValueError("Corrupted event stream: the message checksum does not match")
+
+            headers = {}
+            raw = message[12 : 12 + headers_length]
+            position = 0
+            while position < len(raw):
+                name_length = raw[position]
+                name = raw[position + 1 : position + 1 + name_length].decode("utf-8")
+                position += 1 + name_length
+                value_type = raw[position]
+                position += 1
+                if value_type in (0, 1):
+                    value = value_type == 0
+                elif value_type in (6, 7):
+                    (value_length,) = struct.unpack(">H", raw[position : position + 2])
+                    value = raw[position + 2 : position + 2 + value_length]
+                    value = value.decode("utf-8") if value_type == 7 else value
+                    position += 2 + value_length
+                else:
+                    size = _EVENT_STREAM_HEADER_SIZES[value_type]
+                    value = raw[position : position + size]
+                    position += size
+                headers[name] = value
+            yield headers, message[12 + headers_length : -4]
+
+
+class AwsSigningMixin:
+    """Signs requests to AWS services, shared by the sync and async clients"""
+
+    def setup_aws(
         self,
         aws_region: str,
         aws_access_key: str,
         aws_secret_key: str,
         aws_session_token: Optional[str] = None,
-        **kwargs: dict[str, any],
     ) -> None:
         self.region = aws_region
         self.host = f"https://{SERVICE}.{aws_region}.amazonaws.com/"
         self.access_key = aws_access_key
         self.secret_key = aws_secret_key
         self.session_token = aws_session_token
-        super().__init__(base_url=self.host, timeout=600, **kwargs)
-
-    def post(self, path: str, json: dict, **kwargs: dict[str, any]) -> httpx.Response:
-        signed_headers = self.sign_and_get_headers(
-            method="POST",
-            url=path,
-            payload=json,
-            service="bedrock",
-        )
-        return super().post(url=path, json=json, headers=signed_headers, **kwargs)
 
     def sign_and_get_headers(
         self,
@@ -147,6 +190,50 @@ class AwsClient(httpx.Client):
         return headers
 
 
+class AwsClient(AwsSigningMixin, httpx.Client):
+    def __init__(
+        self,
+        aws_region: str,
+        aws_access_key: str,
+        aws_secret_key: str,
+        aws_session_token: Optional[str] = None,
+        **kwargs: dict[str, any],
+    ) -> None:
+        self.setup_aws(aws_region, aws_access_key, aws_secret_key, aws_session_token)
+        super().__init__(base_url=self.host, timeout=600, **kwargs)
+
+    def post(self, path: str, json: dict, **kwargs: dict[str, any]) -> httpx.Response:
+        signed_headers = self.sign_and_get_headers(
+            method="POST",
+            url=path,
+            payload=json,
+            service="bedrock",
+        )
+        return super().post(url=path, json=json, headers=signed_headers, **kwargs)
+
+
+class AsyncAwsClient(AwsSigningMixin, httpx.AsyncClient):
+    def __init__(
+        self,
+        aws_region: str,
+        aws_access_key: str,
+        aws_secret_key: str,
+        aws_session_token: Optional[str] = None,
+        **kwargs: dict[str, any],
+    ) -> None:
+        self.setup_aws(aws_region, aws_access_key, aws_secret_key, aws_session_token)
+        super().__init__(base_url=self.host, timeout=600, **kwargs)
+
+    async def post(self, path: str, json: dict, **kwargs: dict[str, any]) -> httpx.Response:
+        signed_headers = self.sign_and_get_headers(
+            method="POST",
+            url=path,
+            payload=json,
+            service="bedrock",
+        )
+        return await super().post(url=path, json=json, headers=signed_headers, **kwargs)
+
+
 class BedrockProvider(Provider):
     """Provides chat completions for models hosted by the Amazon Bedrock Service"""
 
@@ -176,6 +263,15 @@ class BedrockProvider(Provider):
         )
         return cls(client=client)
 
+    def create_async_client(self) -> AsyncAwsClient:
+        return AsyncAwsClient(
+            aws_region=self.client.region,
+            aws_access_key=self.client.access_key,
+            aws_secret_key=self.client.secret_key,
+            aws_session_token=self.client.session_token,
+            transport=self.async_transport(),
+        )
+
     @observe_wrapper(as_type="generation")
     def complete(
         self,
@@ -198,7 +294,74 @@ class BedrockProvider(Provider):
         Returns:
             tuple[Message, Usage]: A tuple containing the response message and usage data.
         """
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        path = f"{self.client.host}model/{model}/converse"
+        response = self._post(payload, path)
+        return self.response_to_message_and_usage(response)
 
+    @observe_wrapper(as_type="generation")
+    async def acomplete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        path = f"{self.client.host}model/{model}/converse"
+        response = await self._apost(payload, path)
+        return self.response_to_message_and_usage(response)
+
+    def stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> Iterator[StreamDelta]:
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        path = f"{self.client.host}model/{model}/converse-stream"
+        response = self._open_stream(payload, path)
+        try:
+            yield from self.converse_stream_to_deltas(iter_event_stream(response.iter_bytes()))
+        finally:
+            response.close()
+
+    @staticmethod
+    def converse_stream_to_deltas(events: Iterator[tuple[dict[str, any], bytes]]) -> Iterator[StreamDelta]:
+        """Convert the events of a ConverseStream response into deltas"""
+        for headers, payload in events:
+            if headers.get(":message-type") == "exception":
+                raise ValueError(f"Error while streaming the message: {headers.get(':exception-type')} {payload}")
+            event_type = headers.get(":event-type")
+            body = json.loads(payload) if payload else {}
+            if event_type == "contentBlockStart":
+                tool_use = body.get("start", {}).get("toolUse")
+                if tool_use:
+                    yield ToolUseDelta(index=body["contentBlockIndex"], id=tool_use["toolUseId"], name=tool_use["name"])
+            elif event_type == "contentBlockDelta":
+                delta = body["delta"]
+                if "text" in delta:
+                    yield TextDelta(delta["text"])
+                elif "toolUse" in delta:
+                    yield ToolUseDelta(index=body["contentBlockIndex"], arguments=delta["toolUse"].get("input", ""))
+            elif event_type == "metadata":
+                usage = body.get("usage", {})
+                yield UsageDelta(
+                    input_tokens=usage.get("inputTokens"),
+                    output_tokens=usage.get("outputTokens"),
+                    total_tokens=usage.get("totalTokens"),
+                )
+
+    def get_payload(
+        self,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> dict[str, any]:
         inference_config = dict(
             temperature=kwargs.pop("temperature", None),
             maxTokens=kwargs.pop("max_tokens", None),
@@ -207,9 +370,9 @@ class BedrockProvider(Provider):
         )
         inference_config = {k: v for k, v in inference_config.items() if v is not None} or None
 
-        converted_messages = [self.message_to_bedrock_spec(message) for message in messages]
+        converted_messages = [_message_spec_cache(message) for message in messages]
         converted_system = [dict(text=system)]
-        tool_config = self.tools_to_bedrock_spec(tools)
+        tool_config = _tools_spec_cache(*tools)
         payload = dict(
             system=converted_system,
             inferenceConfig=inference_config,
@@ -217,10 +380,9 @@ class BedrockProvider(Provider):
             toolConfig=tool_config,
             **kwargs,
         )
-        payload = {k: v for k, v in payload.items() if v}
+        return {k: v for k, v in payload.items() if v}
 
-        path = f"{self.client.host}model/{model}/converse"
-        response = self._post(payload, path)
+    def response_to_message_and_usage(self, response: dict) -> tuple[Message, Usage]:
         response_message = response["output"]["message"]
 
         usage_data = response["usage"]
@@ -237,6 +399,21 @@ class BedrockProvider(Provider):
         response = self.client.post(path, json=payload)
         return raise_for_status(response).json()
 
+    @retry_procedure
+    def _open_stream(self, payload: any, path: str) -> httpx.Response:  # noqa: ANN401
+        signed_headers = self.client.sign_and_get_headers(
+            method="POST",
+            url=path,
+            payload=payload,
+            service="bedrock",
+        )
+        return open_stream(self.client, path, payload, headers=signed_headers)
+
+    @retry_procedure
+    async def _apost(self, payload: any, path: str) -> dict:  # noqa: ANN401
+        response = await self.async_client.post(path, json=payload)
+        return raise_for_status(response).json()
+
     @staticmethod
     def message_to_bedrock_spec(message: Message) -> dict:
         bedrock_content = []
@@ -334,3 +511,7 @@ class BedrockProvider(Provider):
             tools_added.add(tool.name)
         tool_config = {"tools": tool_config_list}
         return tool_config
+
+
+_message_spec_cache = SpecCache(BedrockProvider.message_to_bedrock_spec)
+_tools_spec_cache = SpecCache(lambda *tools: BedrockProvider.tools_to_bedrock_spec(tools), maxsize=16)
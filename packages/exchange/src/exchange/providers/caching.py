@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Literal, Optional
+
+from attrs import asdict
+
+from exchange.message import Message
+from exchange.providers.base import Provider, Usage
+from exchange.providers.streaming import MessageBuilder, StreamDelta, message_to_deltas
+from exchange.tool import Tool
+
+CacheMode = Literal["read_write", "record", "replay", "off"]
+CACHE_MODES = ("read_write", "record", "replay", "off")
+
+# bump this when the format of the key or the entries changes, so that old entries are ignored
+CACHE_FORMAT_VERSION = 1
+
+
+class CacheMissError(Exception):
+    """Raised in replay mode when a request has not been recorded"""
+
+    def __init__(self, key: str, model: str) -> None:
+        self.key = key
+        self.model = model
+        self.message = f"No cached response for model {model} (key {key}), record it first to replay offline."
+        super().__init__(self.message)
+
+
+def request_key(
+    model: str,
+    system: str,
+    messages: list[Message],
+    tools: tuple[Tool, ...],
+    **kwargs: dict[str, any],
+) -> str:
+    """Hash a request into the key of its cached response
+
+    Only what is sent to the provider contributes: message ids and creation times are
+    generated locally on every run, so they are dropped.
+    """
+    payload = {
+        "version": CACHE_FORMAT_VERSION,
+        "model": model,
+        "system": system,
+        "messages": [
+            {"role": message.role, "content": [content.to_dict() for content in message.content]}
+            for message in messages
+        ],
+        "tools": [
+            {"name": tool.name, "description": tool.description, "parameters": tool.parameters} for tool in tools
+        ],
+        "generation_args": kwargs,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """A content addressed store of responses on disk
+
+    Each response is a json file named by its key. Reading an entry refreshes its modification
+    time, so that once the store grows past max_size bytes the least recently used entries are
+    evicted first. Entries older than ttl seconds are treated as missing.
+    """
+
+    def __init__(self, path: Path, max_size: int = 512 * 1024 * 1024, ttl: Optional[float] = None) -> None:
+        self.path = Path(path).expanduser()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def get(self, key: str, ignore_ttl: bool = False) -> Optional[tuple[Message, Usage]]:
+        entry_path = self._entry_path(key)
+        try:
+            with entry_path.open() as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not ignore_ttl and self.ttl is not None and time.time() - entry["created"] > self.ttl:
+            self._remove(entry_path)
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return Message(**entry["message"]), Usage(**entry["usage"])
+
+    def put(self, key: str, message: Message, usage: Usage) -> None:
+        entry = {"created": time.time(), "message": message.to_dict(), "usage": asdict(usage)}
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file and rename it, so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        previous = entry_path.stat().st_size if entry_path.exists() else 0
+        os.replace(temp_path, entry_path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += entry_path.stat().st_size - previous
+            if self._size > self.max_size:
+                self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry_path in self.path.glob("*/*.json"):
+                self._remove(entry_path)
+            self._size = 0
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for entry_path in self.path.glob("*/*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        # evict down to 90% of the limit, so that we don't need to scan again on the next put
+        target = self.max_size * 0.9
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry_path in entries:
+            if size <= target:
+                break
+            self._remove(entry_path)
+            size -= entry_size
+        self._size = size
+
+    @staticmethod
+    def _remove(entry_path: Path) -> None:
+        try:
+            entry_path.unlink()
+        except OSError:
+            pass
+
+
+class CachingProvider(Provider):
+    """Wraps a provider to serve repeated requests from a ResponseCache
+
+    The modes are:
+        read_write: serve cached responses and store new ones
+        record: always ask the provider, storing the responses to replay later
+        replay: only serve cached responses, raising CacheMissError otherwise, so that
+            recorded runs work fully offline without the provider
+        off: always ask the provider, without touching the cache
+
+    A cached response reports the usage of the original generation, so that moderators
+    keep seeing the real size of the context.
+    """
+
+    PROVIDER_NAME = "caching"
+
+    def __init__(self, provider: Optional[Provider], cache: ResponseCache, mode: CacheMode = "read_write") -> None:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode}, expected one of {', '.join(CACHE_MODES)}")
+        if provider is None and mode != "replay":
+            raise ValueError("A provider is required unless the cache mode is replay")
+        self.provider = provider
+        self.cache = cache
+        self.mode = mode
+
+    def _lookup(self, key: str, model: str) -> Optional[tuple[Message, Usage]]:
+        if self.mode in ("read_write", "replay"):
+            cached = self.cache.get(key, ignore_ttl=self.mode == "replay")
+            if cached is not None:
+                return cached
+        if self.mode == "replay":
+            raise CacheMissError(key, model)
+        return None
+
+    def _store(self, key: str, message: Message, usage: Usage) -> None:
+        if self.mode in ("read_write", "record"):
+            self.cache.put(key, message, usage)
+
+    def complete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        key = request_key(model, system, messages, tools, **kwargs)
+        cached = self._lookup(key, model)
+        if cached is not None:
+            return cached
+        message, usage = self.provider.complete(model, system, messages, tools, **kwargs)
+        self._store(key, message, usage)
+        return message, usage
+
+    def stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> Iterator[StreamDelta]:
+        key = request_key(model, system, messages, tools, **kwargs)
+        cached = self._lookup(key, model)
+        if cached is not None:
+            yield from message_to_deltas(*cached)
+            return
+        builder = MessageBuilder()
+        for delta in self.provider.stream(model, system, messages, tools, **kwargs):
+            builder.add(delta)
+            yield delta
+        self._store(key, *builder.build())
+
+    async def acomplete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        key = request_key(model, system, messages, tools, **kwargs)
+        cached = self._lookup(key, model)
+        if cached is not None:
+            return cached
+        message, usage = await self.provider.acomplete(model, system, messages, tools, **kwargs)
+        self._store(key, message, usage)
+        return message, usage
@@ -1,13 +1,18 @@
 import httpx
 import os
+from typing import Iterator, Optional
 
 from exchange.message import Message
 from exchange.providers.base import Provider, Usage
 from tenacity import retry, wait_fixed, stop_after_attempt
+from exchange.providers.streaming import StreamDelta
 from exchange.providers.utils import raise_for_status, retry_if_status
 from exchange.providers.utils import (
+    iter_sse,
     messages_to_openai_spec,
+    open_stream,
     openai_response_to_message,
+    openai_stream_to_deltas,
     tools_to_openai_spec,
 )
 from exchange.tool import Tool
@@ -36,6 +41,8 @@ class DatabricksProvider(Provider):
         "DATABRICKS_TOKEN",
     ]
     instructions_url = "https://docs.databricks.com/en/dev-tools/auth/index.html#general-host-token-and-account-id-environment-variables-and-fields"
+    # sent with streamed requests, so that the last chunk reports the usage
+    STREAM_OPTIONS: Optional[dict] = {"include_usage": True}
 
     def __init__(self, client: httpx.Client) -> None:
         self.client = client
@@ -76,6 +83,52 @@ class DatabricksProvider(Provider):
         tools: tuple[Tool, ...],
         **kwargs: dict[str, any],
     ) -> tuple[Message, Usage]:
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        response = self._post(model, payload)
+        message = openai_response_to_message(response)
+        usage = self.get_usage(response)
+        return message, usage
+
+    @observe_wrapper(as_type="generation")
+    async def acomplete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        response = await self._apost(model, payload)
+        message = openai_response_to_message(response)
+        usage = self.get_usage(response)
+        return message, usage
+
+    def stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> Iterator[StreamDelta]:
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        payload.update(stream=True)
+        if self.STREAM_OPTIONS:
+            payload.update(stream_options=self.STREAM_OPTIONS)
+        response = self._open_stream(model, payload)
+        try:
+            yield from openai_stream_to_deltas(iter_sse(response))
+        finally:
+            response.close()
+
+    def get_payload(
+        self,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> dict[str, any]:
         payload = dict(
             messages=[
                 {"role": "system", "content": system},
@@ -84,11 +137,7 @@ class DatabricksProvider(Provider):
             tools=tools_to_openai_spec(tools) if tools else [],
             **kwargs,
         )
-        payload = {k: v for k, v in payload.items() if v}
-        response = self._post(model, payload)
-        message = openai_response_to_message(response)
-        usage = self.get_usage(response)
-        return message, usage
+        return {k: v for k, v in payload.items() if v}
 
     @retry_procedure
     def _post(self, model: str, payload: dict) -> httpx.Response:
@@ -97,3 +146,15 @@ class DatabricksProvider(Provider):
             json=payload,
         )
         return raise_for_status(response).json()
+
+    @retry_procedure
+    def _open_stream(self, model: str, payload: dict) -> httpx.Response:
+        return open_stream(self.client, f"serving-endpoints/{model}/invocations", payload)
+
+    @retry_procedure
+    async def _apost(self, model: str, payload: dict) -> dict:
+        response = await self.async_client.post(
+            f"serving-endpoints/{model}/invocations",
+            json=payload,
+        )
+        return raise_for_status(response).json()
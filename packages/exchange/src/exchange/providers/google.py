@@ -1,12 +1,16 @@
+import json
 import os
+from typing import Iterator, Optional
 
 import httpx
 
 from exchange import Message, Tool
 from exchange.content import Text, ToolResult, ToolUse
 from exchange.providers.base import Provider, Usage
+from exchange.providers.spec_cache import SpecCache
+from exchange.providers.streaming import StreamDelta, TextDelta, ToolUseDelta, UsageDelta
 from tenacity import retry, wait_fixed, stop_after_attempt
-from exchange.providers.utils import raise_for_status, retry_if_status, encode_image
+from exchange.providers.utils import iter_sse, open_stream, raise_for_status, retry_if_status, encode_image
 from exchange.langfuse_wrapper import observe_wrapper
 
 
@@ -85,6 +89,39 @@ class GoogleProvider(Provider):
         # If no valid candidates were found, return an empty message
         return Message(role="assistant", content=[])
 
+    @staticmethod
+    def google_stream_to_deltas(events: Iterator[tuple[Optional[str], str]]) -> Iterator[StreamDelta]:
+        """Convert the server-sent events of streamGenerateContent into deltas
+
+        Each event is a partial response, text arrives in fragments while function calls arrive whole.
+        """
+        function_calls = 0
+        for _, data in events:
+            response = json.loads(data)
+            candidates = response.get("candidates", [])
+            if candidates:
+                # Only use first candidate for now
+                for part in candidates[0].get("content", {}).get("parts", []):
+                    if "text" in part:
+                        yield TextDelta(part["text"])
+                    elif "functionCall" in part:
+                        name = part["functionCall"].get("name", "")
+                        yield ToolUseDelta(
+                            index=function_calls,
+                            id=name,
+                            name=name,
+                            arguments=json.dumps(part["functionCall"].get("args", {})),
+                        )
+                        function_calls += 1
+
+            usage = response.get("usageMetadata")
+            if usage:
+                yield UsageDelta(
+                    input_tokens=usage.get("promptTokenCount"),
+                    output_tokens=usage.get("candidatesTokenCount"),
+                    total_tokens=usage.get("totalTokenCount"),
+                )
+
     @staticmethod
     def tools_to_google_spec(tools: tuple[Tool, ...]) -> dict[str, list[dict[str, any]]]:
         if not tools:
@@ -101,32 +138,34 @@ class GoogleProvider(Provider):
         return {"functionDeclarations": converted_tools}
 
     @staticmethod
-    def messages_to_google_spec(messages: list[Message]) -> list[dict[str, any]]:
-        messages_spec = []
-        for message in messages:
-            role = "user" if message.role == "user" else "model"
-            converted = {"role": role, "parts": []}
-            for content in message.content:
-                if isinstance(content, Text):
-                    converted["parts"].append({"text": content.text})
-                elif isinstance(content, ToolUse):
-                    converted["parts"].append({"functionCall": {"name": content.name, "args": content.parameters}})
-                elif isinstance(content, ToolResult):
-                    if content.output.startswith('"image:'):
-                        image_path = content.output.replace('"image:', "").replace('"', "")
-                        converted["parts"].append(
-                            {
-                                "inline_data": {
-                                    "mime_type": "image/png",
-                                    "data": f"{encode_image(image_path)}",
-                                }
+    def message_to_google_spec(message: Message) -> dict[str, any]:
+        role = "user" if message.role == "user" else "model"
+        converted = {"role": role, "parts": []}
+        for content in message.content:
+            if isinstance(content, Text):
+                converted["parts"].append({"text": content.text})
+            elif isinstance(content, ToolUse):
+                converted["parts"].append({"functionCall": {"name": content.name, "args": content.parameters}})
+            elif isinstance(content, ToolResult):
+                if content.output.startswith('"image:'):
+                    image_path = content.output.replace('"image:', "").replace('"', "")
+                    converted["parts"].append(
+                        {
+                            "inline_data": {
+                                "mime_type": "image/png",
+                                "data": f"{encode_image(image_path)}",
                             }
-                        )
-                    else:
-                        converted["parts"].append(
-                            {"functionResponse": {"name": content.tool_use_id, "response": {"content": content.output}}}
-                        )
-            messages_spec.append(converted)
+                        }
+                    )
+                else:
+                    converted["parts"].append(
+                        {"functionResponse": {"name": content.tool_use_id, "response": {"content": content.output}}}
+                    )
+        return converted
+
+    @staticmethod
+    def messages_to_google_spec(messages: list[Message]) -> list[dict[str, any]]:
+        messages_spec = [_message_spec_cache(message) for message in messages]
 
         if not messages_spec:
             messages_spec.append({"role": "user", "parts": [{"text": "Ignore"}]})
@@ -142,26 +181,81 @@ class GoogleProvider(Provider):
         tools: list[Tool] = None,
         **kwargs: dict[str, any],
     ) -> tuple[Message, Usage]:
-        tools_set = set()
-        unique_tools = []
-        for tool in tools:
-            if tool.name not in tools_set:
-                unique_tools.append(tool)
-                tools_set.add(tool.name)
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        response = self._post(payload, model)
+        message = self.google_response_to_message(response)
+        usage = self.get_usage(response)
+        return message, usage
 
+    @observe_wrapper(as_type="generation")
+    async def acomplete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: list[Tool] = None,
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        response = await self._apost(payload, model)
+        message = self.google_response_to_message(response)
+        usage = self.get_usage(response)
+        return message, usage
+
+    def stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: list[Tool] = None,
+        **kwargs: dict[str, any],
+    ) -> Iterator[StreamDelta]:
+        payload = self.get_payload(system, messages, tools, **kwargs)
+        response = self._open_stream(payload, model)
+        try:
+            yield from self.google_stream_to_deltas(iter_sse(response))
+        finally:
+            response.close()
+
+    def get_payload(
+        self,
+        system: str,
+        messages: list[Message],
+        tools: list[Tool] = None,
+        **kwargs: dict[str, any],
+    ) -> dict[str, any]:
         payload = dict(
             system_instruction={"parts": [{"text": system}]},
             contents=self.messages_to_google_spec(messages),
-            tools=self.tools_to_google_spec(tuple(unique_tools)),
+            tools=_tools_spec_cache(*tools),
             **kwargs,
         )
-        payload = {k: v for k, v in payload.items() if v}
-        response = self._post(payload, model)
-        message = self.google_response_to_message(response)
-        usage = self.get_usage(response)
-        return message, usage
+        return {k: v for k, v in payload.items() if v}
 
     @retry_procedure
     def _post(self, payload: dict, model: str) -> httpx.Response:
         response = self.client.post("models/" + model + ":generateContent", json=payload)
         return raise_for_status(response).json()
+
+    @retry_procedure
+    def _open_stream(self, payload: dict, model: str) -> httpx.Response:
+        return open_stream(self.client, "models/" + model + ":streamGenerateContent", payload, params={"alt": "sse"})
+
+    @retry_procedure
+    async def _apost(self, payload: dict, model: str) -> dict:
+        response = await self.async_client.post("models/" + model + ":generateContent", json=payload)
+        return raise_for_status(response).json()
+
+
+def _unique_tools_to_google_spec(*tools: Tool) -> dict[str, list[dict[str, any]]]:
+    tools_set = set()
+    unique_tools = []
+    for tool in tools:
+        if tool.name not in tools_set:
+            unique_tools.append(tool)
+            tools_set.add(tool.name)
+    return GoogleProvider.tools_to_google_spec(tuple(unique_tools))
+
+
+_message_spec_cache = SpecCache(GoogleProvider.message_to_google_spec)
+_tools_spec_cache = SpecCache(_unique_tools_to_google_spec, maxsize=16)
@@ -1,14 +1,19 @@
 import os
+from typing import Iterator
 
 from exchange.langfuse_wrapper import observe_wrapper
 import httpx
 
 from exchange.message import Message
 from exchange.providers.base import Provider, Usage
+from exchange.providers.streaming import StreamDelta
 from exchange.providers.utils import (
+    iter_sse,
     messages_to_openai_spec,
+    open_stream,
     openai_response_to_message,
     openai_single_message_context_length_exceeded,
+    openai_stream_to_deltas,
     raise_for_status,
     tools_to_openai_spec,
 )
@@ -74,6 +79,47 @@ class GroqProvider(Provider):
         tools: tuple[Tool, ...],
         **kwargs: dict[str, any],
     ) -> tuple[Message, Usage]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        response = self._post(payload)
+        return self.response_to_message(response, messages)
+
+    @observe_wrapper(as_type="generation")
+    async def acomplete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        response = await self._apost(payload)
+        return self.response_to_message(response, messages)
+
+    def stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> Iterator[StreamDelta]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        payload.update(stream=True)
+        response = self._open_stream(payload)
+        try:
+            yield from openai_stream_to_deltas(iter_sse(response))
+        finally:
+            response.close()
+
+    def get_payload(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> dict[str, any]:
         system_message = [{"role": "system", "content": system}]
         payload = dict(
             messages=system_message + messages_to_openai_spec(messages),
@@ -81,9 +127,9 @@ class GroqProvider(Provider):
             tools=tools_to_openai_spec(tools) if tools else [],
             **kwargs,
         )
-        payload = {k: v for k, v in payload.items() if v}
-        response = self._post(payload)
+        return {k: v for k, v in payload.items() if v}
 
+    def response_to_message(self, response: dict, messages: list[Message]) -> tuple[Message, Usage]:
         # Check for context_length_exceeded error for single, long input message
         if "error" in response and len(messages) == 1:
             openai_single_message_context_length_exceeded(response["error"])
@@ -96,3 +142,12 @@ class GroqProvider(Provider):
     def _post(self, payload: dict) -> dict:
         response = self.client.post("chat/completions", json=payload)
         return raise_for_status(response).json()
+
+    @retry_procedure
+    def _open_stream(self, payload: dict) -> httpx.Response:
+        return open_stream(self.client, "chat/completions", payload)
+
+    @retry_procedure
+    async def _apost(self, payload: dict) -> dict:
+        response = await self.async_client.post("chat/completions", json=payload)
+        return raise_for_status(response).json()
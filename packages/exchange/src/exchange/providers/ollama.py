@@ -6,11 +6,15 @@ from exchange.providers.openai import OpenAiProvider
 
 OLLAMA_HOST = "http://localhost:11434/"
 OLLAMA_MODEL = "qwen2.5"
+HEALTH_CHECK_TIMEOUT = 5
 
 
 class OllamaProvider(OpenAiProvider):
     """Provides chat completions for models hosted by Ollama."""
 
+    # older versions of ollama don't accept stream_options
+    STREAM_OPTIONS = None
+
     __doc__ += f"""Here's an example profile configuration to try:
 
 First run: ollama pull qwen2.5, then use this profile:
@@ -29,6 +33,14 @@ ollama:
         print("PLEASE NOTE: the ollama provider is experimental, use with care")
         super().__init__(client)
 
+    @classmethod
+    def is_available(cls: type["OllamaProvider"], timeout: float) -> bool:
+        try:
+            httpx.get(os.environ.get("OLLAMA_HOST", OLLAMA_HOST), timeout=timeout)
+        except httpx.HTTPError:
+            return False
+        return True
+
     @classmethod
     def from_env(cls: type["OllamaProvider"]) -> "OllamaProvider":
         ollama_url = os.environ.get("OLLAMA_HOST", OLLAMA_HOST)
@@ -37,7 +49,8 @@ ollama:
         # from_env is expected to fail if required ENV variables are not
         # available. Since this provider can run with defaults, we substitute
         # an Ollama health check (GET /) to determine if the service is ok.
-        httpx.get(ollama_url, timeout=timeout)
+        # The check only waits briefly, a running server answers it right away.
+        httpx.get(ollama_url, timeout=HEALTH_CHECK_TIMEOUT)
 
         # When served by Ollama, the OpenAI API is available at the path "v1/".
         client = httpx.Client(base_url=ollama_url + "v1/", timeout=timeout)
@@ -1,13 +1,18 @@
 import os
+from typing import Iterator, Optional
 
 import httpx
 
 from exchange.message import Message
 from exchange.providers.base import Provider, Usage
+from exchange.providers.streaming import StreamDelta
 from exchange.providers.utils import (
+    iter_sse,
     messages_to_openai_spec,
+    open_stream,
     openai_response_to_message,
     openai_single_message_context_length_exceeded,
+    openai_stream_to_deltas,
     raise_for_status,
     tools_to_openai_spec,
 )
@@ -32,6 +37,9 @@ class OpenAiProvider(Provider):
     PROVIDER_NAME = "openai"
     REQUIRED_ENV_VARS = ["OPENAI_API_KEY"]
     instructions_url = "https://platform.openai.com/docs/api-reference/api-keys"
+    # sent with streamed requests, so that the last chunk reports the usage. servers which
+    # reject these options set this to None, and the usage of their streams is estimated
+    STREAM_OPTIONS: Optional[dict] = {"include_usage": True}
 
     def __init__(self, client: httpx.Client) -> None:
         self.client = client
@@ -74,6 +82,51 @@ class OpenAiProvider(Provider):
         tools: tuple[Tool, ...],
         **kwargs: dict[str, any],
     ) -> tuple[Message, Usage]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        response = self._post(payload)
+        return self.response_to_message(response, messages)
+
+    @observe_wrapper(as_type="generation")
+    async def acomplete(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> tuple[Message, Usage]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        response = await self._apost(payload)
+        return self.response_to_message(response, messages)
+
+    def stream(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> Iterator[StreamDelta]:
+        payload = self.get_payload(model, system, messages, tools, **kwargs)
+        payload.update(stream=True)
+        if self.STREAM_OPTIONS:
+            payload.update(stream_options=self.STREAM_OPTIONS)
+        response = self._open_stream(payload)
+        # like response_to_message, a single message which is too long gets its own error
+        on_error = openai_single_message_context_length_exceeded if len(messages) == 1 else None
+        try:
+            yield from openai_stream_to_deltas(iter_sse(response), on_error=on_error)
+        finally:
+            response.close()
+
+    def get_payload(
+        self,
+        model: str,
+        system: str,
+        messages: list[Message],
+        tools: tuple[Tool, ...],
+        **kwargs: dict[str, any],
+    ) -> dict[str, any]:
         system_message = [] if model.startswith("o1") else [{"role": "system", "content": system}]
         payload = dict(
             messages=system_message + messages_to_openai_spec(messages),
@@ -81,9 +134,9 @@ class OpenAiProvider(Provider):
             tools=tools_to_openai_spec(tools) if tools else [],
             **kwargs,
         )
-        payload = {k: v for k, v in payload.items() if v}
-        response = self._post(payload)
+        return {k: v for k, v in payload.items() if v}
 
+    def response_to_message(self, response: dict, messages: list[Message]) -> tuple[Message, Usage]:
         # Check for context_length_exceeded error for single, long input message
         if "error" in response and len(messages) == 1:
             openai_single_message_context_length_exceeded(response["error"])
@@ -100,3 +153,12 @@ class OpenAiProvider(Provider):
         # See https://github.com/openai/openai-openapi/blob/master/openapi.yaml
         response = self.client.post("chat/completions", json=payload)
         return raise_for_status(response).json()
+
+    @retry_procedure
+    def _open_stream(self, payload: dict) -> httpx.Response:
+        return open_stream(self.client, "chat/completions", payload)
+
+    @retry_procedure
+    async def _apost(self, payload: dict) -> dict:
+        response = await self.async_client.post("chat/completions", json=payload)
+        return raise_for_status(response).json()
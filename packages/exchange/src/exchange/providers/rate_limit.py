@@ -0,0 +1,274 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Mapping, Optional
+
+import httpx
+
+RATE_LIMITED_STATUS = 429
+
+# a request is estimated at one token for every four bytes of its body
+BYTES_PER_TOKEN = 4
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+# the headers providers send about the limits, openai style first and then anthropic
+REMAINING_REQUESTS_HEADERS = ("x-ratelimit-remaining-requests", "anthropic-ratelimit-requests-remaining")
+RESET_REQUESTS_HEADERS = ("x-ratelimit-reset-requests", "anthropic-ratelimit-requests-reset")
+REMAINING_TOKENS_HEADERS = ("x-ratelimit-remaining-tokens", "anthropic-ratelimit-tokens-remaining")
+RESET_TOKENS_HEADERS = ("x-ratelimit-reset-tokens", "anthropic-ratelimit-tokens-reset")
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION = re.compile(r"(?:\d+(?:\.\d+)?(?:ms|s|m|h))+")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class TokenBucket:
+    """Allows an amount per minute, in bursts of up to a minute's worth
+
+    Amounts are reserved up front and the bucket can go into debt, so a caller learns how long
+    to wait without holding a lock while it waits.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.level + (now - self.updated) * self.rate, self.capacity)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take an amount, returning how many seconds to wait before using it"""
+        self._refill()
+        self.level -= min(amount, self.capacity)
+        return max(-self.level / self.rate, 0.0)
+
+    def limit_to(self, available: float) -> None:
+        """Bring the bucket down to what the provider reports as available"""
+        self._refill()
+        self.level = min(self.level, available)
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse the seconds until a reset, given as seconds, a duration like 6m0s or a timestamp"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if DURATION.fullmatch(value):
+        return sum(float(number) * DURATION_UNITS[unit] for number, unit in DURATION_PART.findall(value))
+    try:
+        if value[:4].isdigit():
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        else:
+            moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        # http dates are in utc, and so are timestamps without an offset
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - datetime.now(timezone.utc)).total_seconds()
+
+
+def _header(headers: Mapping[str, str], names: tuple[str, ...]) -> Optional[str]:
+    return next((headers[name] for name in names if name in headers), None)
+
+
+class RateLimiter:
+    """Paces the requests to one model, shared by every thread using it
+
+    Requests are held back to stay within the requests and tokens per minute, when they are
+    configured, and to at most a number running at once. That number halves when the provider
+    rate limits a request and grows back by one for every window of successful ones. The
+    retry-after and x-ratelimit headers pause or slow everyone down, as the provider asks.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.requests = TokenBucket(requests_per_minute, clock) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.active = 0
+        self.paused_until = 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._condition = threading.Condition()
+
+    def _admit(self, tokens: int) -> float:
+        with self._condition:
+            while self.active >= int(self.concurrency):
+                self._condition.wait()
+            self.active += 1
+            delays = [self.paused_until - self.clock()]
+            if self.requests is not None:
+                delays.append(self.requests.reserve(1))
+            if self.tokens is not None:
+                delays.append(self.tokens.reserve(tokens))
+            return max(delays)
+
+    def _wait_for_pause(self) -> float:
+        with self._condition:
+            return self.paused_until - self.clock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Wait for a turn to send a request of about this many tokens, which must then be released"""
+        delay = self._admit(tokens)
+        try:
+            while delay > 0:
+                self.sleep(delay)
+                # another request may have been told to back off in the meantime
+                delay = self._wait_for_pause()
+        except BaseException:
+            self.release()
+            raise
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        delay = await asyncio.to_thread(self._admit, tokens)
+        try:
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = self._wait_for_pause()
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self, status_code: Optional[int] = None, headers: Optional[Mapping[str, str]] = None) -> None:
+        """Finish a request, learning from its status and headers"""
+        headers = headers or {}
+        with self._condition:
+            self.active -= 1
+            if status_code == RATE_LIMITED_STATUS:
+                self.concurrency = max(self.concurrency / 2, 1.0)
+            elif status_code is not None and status_code < 400:
+                self.concurrency = min(self.concurrency + 1 / self.concurrency, float(self.max_concurrency))
+
+            pause = None
+            if (retry_after := headers.get("retry-after")) is not None:
+                pause = parse_duration(retry_after)
+            elif _header(headers, REMAINING_REQUESTS_HEADERS) == "0":
+                pause = parse_duration(_header(headers, RESET_REQUESTS_HEADERS) or "")
+            elif _header(headers, REMAINING_TOKENS_HEADERS) == "0":
+                pause = parse_duration(_header(headers, RESET_TOKENS_HEADERS) or "")
+            if pause and pause > 0:
+                self.paused_until = max(self.paused_until, self.clock() + pause)
+
+            remaining_tokens = _header(headers, REMAINING_TOKENS_HEADERS)
+            if self.tokens is not None and remaining_tokens is not None and remaining_tokens.isdigit():
+                self.tokens.limit_to(int(remaining_tokens))
+            self._condition.notify_all()
+
+
+class RateLimitGovernor:
+    """The rate limiters for the models of one provider, which all of its requests go through
+
+    Each model gets its own limiter, since providers limit models separately. The limits can be
+    set per model, falling back to the limits for the provider.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        models: Optional[Mapping[str, Mapping[str, float]]] = None,
+    ) -> None:
+        self.defaults = dict(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_concurrency=max_concurrency,
+        )
+        self.models = dict(models or {})
+        self._limiters: dict[Optional[str], RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, model: Optional[str]) -> RateLimiter:
+        with self._lock:
+            if model not in self._limiters:
+                self._limiters[model] = RateLimiter(**{**self.defaults, **self.models.get(model, {})})
+            return self._limiters[model]
+
+    def limiter_for(self, request: httpx.Request) -> tuple[RateLimiter, int]:
+        """The limiter for the model a request is for, and an estimate of its tokens"""
+        model = None
+        try:
+            body = request.content
+        except httpx.RequestNotRead:
+            body = b""
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict) and isinstance(payload.get("model"), str):
+                model = payload["model"]
+        return self.limiter(model), len(body) // BYTES_PER_TOKEN
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Sends each request once the governor allows it"""
+
+    def __init__(self, transport: httpx.BaseTransport, governor: RateLimitGovernor) -> None:
+        self.transport = transport
+        self.governor = governor
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        limiter, tokens = self.governor.limiter_for(request)
+        limiter.acquire(tokens)
+        response = None
+        try:
+            response = self.transport.handle_request(request)
+            return response
+        finally:
+            # a streamed response is released once its headers arrive
+            limiter.release(*((response.status_code, response.headers) if response is not None else ()))
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Sends each request once the governor allows it, without blocking the event loop"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, governor: RateLimitGovernor) -> None:
+        self.transport = transport
+        self.governor = governor
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        limiter, tokens = self.governor.limiter_for(request)
+        await limiter.acquire_async(tokens)
+        response = None
+        try:
+            response = await self.transport.handle_async_request(request)
+            return response
+        finally:
+            limiter.release(*((response.status_code, response.headers) if response is not None else ()))
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def install_governor(client: httpx.Client, governor: RateLimitGovernor) -> None:
+    """Route every request a client sends through the governor
+
+    Copies of an exchange share its provider and so its client, which makes them all share the
+    governor. The async client of the provider picks the governor up from the client.
+    """
+    client._transport = RateLimitedTransport(client._transport, governor)
+    client.rate_limit_governor = governor
@@ -0,0 +1,46 @@
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+S = TypeVar("S")
+
+
+class SpecCache(Generic[T, S]):
+    """Memoizes converting objects, such as messages or tools, into a provider's request format
+
+    Entries are keyed by the identity of the objects, so they must not be changed once
+    converted. Messages are immutable and tools are never changed once created. Weak references
+    confirm that a key still refers to the same objects, since ids are reused once an object is
+    garbage collected, and keep the cache from holding on to messages no exchange refers to.
+
+    The converted specs are shared between calls, so callers must copy them before any change.
+    """
+
+    def __init__(self, convert: Callable[..., S], maxsize: int = 4096) -> None:
+        self.convert = convert
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[int, ...], tuple[tuple[weakref.ref, ...], S]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, *objects: T) -> S:
+        key = tuple(id(obj) for obj in objects)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and all(ref() is obj for ref, obj in zip(entry[0], objects)):
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        spec = self.convert(*objects)
+        refs = tuple(weakref.ref(obj) for obj in objects)
+        with self._lock:
+            self._entries[key] = (refs, spec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return spec
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,202 @@
+import json
+from typing import Iterator, Optional, Union
+
+from attrs import define, field
+
+from exchange.content import Content, Text, ToolUse
+from exchange.message import Message
+from exchange.providers.base import Usage
+
+
+@define(frozen=True)
+class TextDelta:
+    """A fragment of text appended to the message being generated"""
+
+    text: str
+
+
+@define(frozen=True)
+class ToolUseDelta:
+    """A fragment of a tool use in the message being generated
+
+    The index identifies the tool use within the message, the first delta for an index
+    carries the id and name and every delta may carry a fragment of the json encoded parameters.
+    """
+
+    index: int
+    id: Optional[str] = field(default=None)
+    name: Optional[str] = field(default=None)
+    arguments: str = field(default="")
+
+
+@define(frozen=True)
+class UsageDelta:
+    """Token usage reported while streaming, any value which is set replaces the previous one"""
+
+    input_tokens: Optional[int] = field(default=None)
+    output_tokens: Optional[int] = field(default=None)
+    total_tokens: Optional[int] = field(default=None)
+    cache_read_tokens: Optional[int] = field(default=None)
+    cache_write_tokens: Optional[int] = field(default=None)
+
+
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "total_tokens", "cache_read_tokens", "cache_write_tokens")
+
+
+StreamDelta = Union[TextDelta, ToolUseDelta, UsageDelta]
+
+
+def parse_partial_json(text: str) -> Optional[any]:  # noqa: ANN401
+    """Parse a json document which may have been cut off, returning None if it can't be completed
+
+    This closes any open string, array and object, so that the parameters of a tool use
+    can be shown while they are still being generated.
+    """
+    if not text.strip():
+        return {}
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    closers = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            closers.append("]" if char == "[" else "}")
+        elif char in "]}" and closers:
+            closers.pop()
+
+    completed = text
+    if in_string:
+        # drop a dangling escape character before closing the string
+        completed = (completed[:-1] if escaped else completed) + '"'
+    completed = completed.rstrip().rstrip(",")
+    if completed.endswith(":"):
+        completed += "null"
+    try:
+        return json.loads(completed + "".join(reversed(closers)))
+    except json.JSONDecodeError:
+        return None
+
+
+@define
+class _PendingToolUse:
+    id: Optional[str] = None
+    name: Optional[str] = None
+    arguments: list[str] = field(factory=list)
+
+
+class MessageBuilder:
+    """Assembles an assistant message and its usage from a stream of deltas
+
+    Text deltas extend the most recent text block, so text that follows a tool use
+    starts a new block and the order of the content is preserved.
+    """
+
+    def __init__(self) -> None:
+        self._blocks: list[Union[list[str], _PendingToolUse]] = []
+        self._tool_uses: dict[int, _PendingToolUse] = {}
+        self.input_tokens: Optional[int] = None
+        self.output_tokens: Optional[int] = None
+        self.total_tokens: Optional[int] = None
+        self.cache_read_tokens: Optional[int] = None
+        self.cache_write_tokens: Optional[int] = None
+
+    def add(self, delta: StreamDelta) -> None:
+        if isinstance(delta, TextDelta):
+            if not delta.text:
+                return
+            if not self._blocks or not isinstance(self._blocks[-1], list):
+                self._blocks.append([])
+            self._blocks[-1].append(delta.text)
+        elif isinstance(delta, ToolUseDelta):
+            pending = self._tool_uses.get(delta.index)
+            if pending is None:
+                pending = self._tool_uses[delta.index] = _PendingToolUse()
+                self._blocks.append(pending)
+            pending.id = delta.id or pending.id
+            pending.name = delta.name or pending.name
+            if delta.arguments:
+                pending.arguments.append(delta.arguments)
+        elif isinstance(delta, UsageDelta):
+            for name in _USAGE_FIELDS:
+                value = getattr(delta, name)
+                if value is not None:
+                    setattr(self, name, value)
+        else:
+            raise ValueError(f"Unknown stream delta: {delta}")
+
+    @property
+    def text(self) -> str:
+        """The text generated so far, joined like Message.text"""
+        return "\n".join("".join(block) for block in self._blocks if isinstance(block, list))
+
+    @property
+    def content(self) -> list[Content]:
+        """The content generated so far, including tool uses whose parameters are still incomplete"""
+        content = []
+        for block in self._blocks:
+            if isinstance(block, list):
+                content.append(Text(text="".join(block)))
+            else:
+                parameters = parse_partial_json("".join(block.arguments))
+                content.append(ToolUse(id=block.id or "", name=block.name or "", parameters=parameters or {}))
+        return content
+
+    @property
+    def usage(self) -> Usage:
+        total_tokens = self.total_tokens
+        if total_tokens is None and self.input_tokens is not None and self.output_tokens is not None:
+            total_tokens = self.input_tokens + self.output_tokens
+        return Usage(
+            input_tokens=self.input_tokens,
+            output_tokens=self.output_tokens,
+            total_tokens=total_tokens,
+            cache_read_tokens=self.cache_read_tokens,
+            cache_write_tokens=self.cache_write_tokens,
+        )
+
+    def build(self) -> tuple[Message, Usage]:
+        """Build the final message and usage once the stream has completed"""
+        content = []
+        for block in self._blocks:
+            if isinstance(block, list):
+                content.append(Text(text="".join(block)))
+                continue
+            arguments = "".join(block.arguments)
+            try:
+                parameters = json.loads(arguments) if arguments.strip() else {}
+                content.append(ToolUse(id=block.id, name=block.name, parameters=parameters))
+            except json.JSONDecodeError:
+                content.append(
+                    ToolUse(
+                        id=block.id,
+                        name=block.name,
+                        parameters=arguments,
+                        is_error=True,
+                        error_message=f"Could not interpret tool use parameters for id {block.id}: {arguments}",
+                    )
+                )
+        return Message(role="assistant", content=content), self.usage
+
+
+def message_to_deltas(message: Message, usage: Usage) -> Iterator[StreamDelta]:
+    """Replay a complete message and its usage as deltas"""
+    for index, content in enumerate(message.content):
+        if isinstance(content, Text):
+            yield TextDelta(content.text)
+        elif isinstance(content, ToolUse):
+            arguments = content.parameters if isinstance(content.parameters, str) else json.dumps(content.parameters)
+            yield ToolUseDelta(index=index, id=content.id, name=content.name, arguments=arguments)
+    yield UsageDelta(**{name: getattr(usage, name) for name in _USAGE_FIELDS})
@@ -1,11 +1,13 @@
 import base64
 import json
 import re
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 import httpx
 from exchange.content import Text, ToolResult, ToolUse
 from exchange.message import Message
+from exchange.providers.spec_cache import SpecCache
+from exchange.providers.streaming import StreamDelta, TextDelta, ToolUseDelta, UsageDelta
 from exchange.tool import Tool
 from tenacity import retry_if_exception
 
@@ -37,6 +39,44 @@ def raise_for_status(response: httpx.Response) -> httpx.Response:
             raise e
 
 
+def open_stream(client: httpx.Client, path: str, payload: dict, **kwargs: dict[str, any]) -> httpx.Response:
+    """Post the payload and return the response once its headers arrive, leaving the body to be streamed
+
+    The caller is responsible for closing the response.
+    """
+    request = client.build_request("POST", path, json=payload, **kwargs)
+    response = client.send(request, stream=True)
+    try:
+        return raise_for_status(response)
+    except httpx.HTTPStatusError:
+        response.close()
+        raise
+
+
+def iter_sse(response: httpx.Response) -> Iterator[tuple[Optional[str], str]]:
+    """Parse a server-sent events body into (event, data) pairs as the lines arrive"""
+    event = None
+    data = []
+    for line in response.iter_lines():
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event = None
+            data = []
+            continue
+        if line.startswith(":"):
+            # a comment, usually sent to keep the connection alive
+            continue
+        name, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if name == "event":
+            event = value
+        elif name == "data":
+            data.append(value)
+    if data:
+        yield event, "\n".join(data)
+
+
 def encode_image(image_path: str) -> str:
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
@@ -45,68 +85,77 @@ def encode_image(image_path: str) -> str:
 def messages_to_openai_spec(messages: list[Message]) -> list[dict[str, any]]:
     messages_spec = []
     for message in messages:
-        converted = {"role": message.role}
-        output = []
-        for content in message.content:
-            if isinstance(content, Text):
-                converted["content"] = content.text
-            elif isinstance(content, ToolUse):
-                sanitized_name = re.sub(r"[^a-zA-Z0-9_-]", "_", content.name)
-                converted.setdefault("tool_calls", []).append(
+        messages_spec.extend(_openai_message_spec_cache(message))
+    return messages_spec
+
+
+def message_to_openai_spec(message: Message) -> list[dict[str, any]]:
+    """Convert a single message, which can become several openai messages when it holds tool results"""
+    converted = {"role": message.role}
+    output = []
+    for content in message.content:
+        if isinstance(content, Text):
+            converted["content"] = content.text
+        elif isinstance(content, ToolUse):
+            sanitized_name = re.sub(r"[^a-zA-Z0-9_-]", "_", content.name)
+            converted.setdefault("tool_calls", []).append(
+                {
+                    "id": content.id,
+                    "type": "function",
+                    "function": {
+                        "name": sanitized_name,
+                        "arguments": json.dumps(content.parameters),
+                    },
+                }
+            )
+        elif isinstance(content, ToolResult):
+            if content.output.startswith('"image:'):
+                image_path = content.output.replace('"image:', "").replace('"', "")
+                output.append(
                     {
-                        "id": content.id,
-                        "type": "function",
-                        "function": {
-                            "name": sanitized_name,
-                            "arguments": json.dumps(content.parameters),
-                        },
+                        "role": "tool",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": "This tool result included an image that is uploaded in the next message.",
+                            },
+                        ],
+                        "tool_call_id": content.tool_use_id,
+                    }
+                )
+                # Note: it is possible to only do this when message == messages[-1]
+                # but it doesn't seem to hurt too much with tokens to keep this.
+                output.append(
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "image_url",
+                                "image_url": {"url": f"data:image/jpeg;base64,{encode_image(image_path)}"},
+                            }
+                        ],
                     }
                 )
-            elif isinstance(content, ToolResult):
-                if content.output.startswith('"image:'):
-                    image_path = content.output.replace('"image:', "").replace('"', "")
-                    output.append(
-                        {
-                            "role": "tool",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "This tool result included an image that is uploaded in the next message.",
-                                },
-                            ],
-                            "tool_call_id": content.tool_use_id,
-                        }
-                    )
-                    # Note: it is possible to only do this when message == messages[-1]
-                    # but it doesn't seem to hurt too much with tokens to keep this.
-                    output.append(
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "image_url",
-                                    "image_url": {"url": f"data:image/jpeg;base64,{encode_image(image_path)}"},
-                                }
-                            ],
-                        }
-                    )
 
-                else:
-                    output.append(
-                        {
-                            "role": "tool",
-                            "content": content.output,
-                            "tool_call_id": content.tool_use_id,
-                        }
-                    )
+            else:
+                output.append(
+                    {
+                        "role": "tool",
+                        "content": content.output,
+                        "tool_call_id": content.tool_use_id,
+                    }
+                )
 
-        if "content" in converted or "tool_calls" in converted:
-            output = [converted] + output
-        messages_spec.extend(output)
-    return messages_spec
+    if "content" in converted or "tool_calls" in converted:
+        output = [converted] + output
+    return output
 
 
 def tools_to_openai_spec(tools: tuple[Tool, ...]) -> dict[str, any]:
+    return _openai_tools_spec_cache(*tools)
+
+
+def _tools_to_openai_spec(*tools: Tool) -> dict[str, any]:
     tools_names = set()
     result = []
     for tool in tools:
@@ -127,6 +176,10 @@ def tools_to_openai_spec(tools: tuple[Tool, ...]) -> dict[str, any]:
     return result
 
 
+_openai_message_spec_cache = SpecCache(message_to_openai_spec)
+_openai_tools_spec_cache = SpecCache(_tools_to_openai_spec, maxsize=16)
+
+
 def openai_response_to_message(response: dict) -> Message:
     original = response["choices"][0]["message"]
     content = []
@@ -173,6 +226,48 @@ def openai_response_to_message(response: dict) -> Message:
     return Message(role="assistant", content=content)
 
 
+def openai_stream_to_deltas(
+    events: Iterator[tuple[Optional[str], str]],
+    on_error: Optional[Callable[[dict], None]] = None,
+) -> Iterator[StreamDelta]:
+    """Convert the server-sent events of a streamed chat completion into deltas
+
+    An error in the stream is passed to on_error first, which may raise a more specific exception.
+    """
+    for _, data in events:
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        if "error" in chunk:
+            if on_error is not None:
+                on_error(chunk["error"])
+            raise ValueError(f"Error while streaming the completion: {chunk['error']}")
+
+        for choice in chunk.get("choices", []):
+            if choice.get("index", 0) != 0:
+                continue
+            delta = choice.get("delta") or {}
+            if delta.get("content"):
+                yield TextDelta(delta["content"])
+            for tool_call in delta.get("tool_calls") or []:
+                function = tool_call.get("function") or {}
+                yield ToolUseDelta(
+                    index=tool_call.get("index", 0),
+                    id=tool_call.get("id"),
+                    name=function.get("name"),
+                    arguments=function.get("arguments") or "",
+                )
+
+        # groq reports the usage of a stream under its own key
+        usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage")
+        if usage:
+            yield UsageDelta(
+                input_tokens=usage.get("prompt_tokens"),
+                output_tokens=usage.get("completion_tokens"),
+                total_tokens=usage.get("total_tokens"),
+            )
+
+
 def openai_single_message_context_length_exceeded(error_dict: dict) -> None:
     code = error_dict.get("code")
     if code == "context_length_exceeded" or code == "string_above_max_length":
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from fnmatch import fnmatch
+from functools import cache
+from typing import Callable, Optional
+
+from tiktoken import Encoding, get_encoding
+
+from exchange.tool import Tool
+
+# tokens added by the provider to wrap the system prompt and each tool definition,
+# measured against the token counts reported by the providers
+SYSTEM_OVERHEAD_TOKENS = 4
+TOOL_OVERHEAD_TOKENS = 8
+
+# tokens are rarely longer than this, so a prefix of this many characters per token is enough to
+# tell that a long text is over a limit without encoding all of it
+PREFIX_CHARS_PER_TOKEN = 8
+
+
+class TokenCounter(ABC):
+    """Counts tokens locally, so that we don't need to ask the provider"""
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Count the tokens in the text"""
+        pass
+
+    @property
+    def available(self) -> bool:
+        """Whether the counter can be used, for example if its tokenizer could be loaded"""
+        return True
+
+    def count_system(self, system: str, tools: tuple[Tool, ...]) -> int:
+        """Count the tokens used by the system prompt and the tool definitions"""
+        total = self.count(system) + SYSTEM_OVERHEAD_TOKENS
+        for tool in tools:
+            definition = json.dumps({"name": tool.name, "description": tool.description, "parameters": tool.parameters})
+            total += self.count(definition) + TOOL_OVERHEAD_TOKENS
+        return total
+
+
+class TiktokenCounter(TokenCounter):
+    """Counts tokens exactly, with the tiktoken encoding used by the model"""
+
+    def __init__(self, encoding_name: str) -> None:
+        self.encoding_name = encoding_name
+
+    @property
+    def encoding(self) -> Optional[Encoding]:
+        return _load_encoding(self.encoding_name)
+
+    @property
+    def available(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+class CharacterRatioCounter(TokenCounter):
+    """Estimates tokens from the number of characters, for models without a public tokenizer
+
+    The ratio is calibrated against the token counts reported by the provider for a mix of
+    prose, code and json, and rounded down so that we tend to overestimate.
+    """
+
+    def __init__(self, chars_per_token: float) -> None:
+        if chars_per_token <= 0:
+            raise ValueError("chars_per_token must be greater than 0")
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+@cache
+def _load_encoding(encoding_name: str) -> Optional[Encoding]:
+    try:
+        return get_encoding(encoding_name)
+    except Exception:
+        # tiktoken downloads the encoding on first use, which fails when offline
+        return None
+
+
+# patterns are matched in order, so more specific patterns need to come first
+_token_counters: list[tuple[str, Callable[[], TokenCounter]]] = [
+    ("gpt-4o*", lambda: TiktokenCounter("o200k_base")),
+    ("chatgpt-4o*", lambda: TiktokenCounter("o200k_base")),
+    ("o1*", lambda: TiktokenCounter("o200k_base")),
+    ("gpt-4*", lambda: TiktokenCounter("cl100k_base")),
+    ("gpt-3.5*", lambda: TiktokenCounter("cl100k_base")),
+    ("claude*", lambda: CharacterRatioCounter(3.5)),
+    # bedrock model ids, such as anthropic.claude-3-5-sonnet-20240620-v1:0
+    ("*anthropic.claude*", lambda: CharacterRatioCounter(3.5)),
+    ("gemini*", lambda: CharacterRatioCounter(4.0)),
+]
+
+
+def register_token_counter(pattern: str, factory: Callable[[], TokenCounter]) -> None:
+    """Register a token counter for the models matching the glob pattern
+
+    Counters registered later take precedence over the built in ones.
+    """
+    _token_counters.insert(0, (pattern, factory))
+    get_token_counter.cache_clear()
+
+
+@cache
+def get_token_counter(model: str) -> Optional[TokenCounter]:
+    """Get the token counter for the model, or None if tokens can only be counted by the provider"""
+    for pattern, factory in _token_counters:
+        if fnmatch(model, pattern):
+            counter = factory()
+            return counter if counter.available else None
+    return None
+
+
+class TokenizerService:
+    """Checks texts, such as tool outputs and files, against token limits
+
+    An encoding never produces more tokens than the text has utf-8 bytes, so a text within the
+    limit by that bound is accepted without encoding it. A much longer text is first checked by
+    encoding a prefix of it, which is enough when the prefix is already over the limit. Otherwise
+    texts are encoded exactly,
+    and their counts are cached by a hash of the content, so checking the same text again is free.
+    If the encoding can't be loaded, for example when offline, tokens are estimated from the
+    length of the text instead.
+    """
+
+    def __init__(
+        self,
+        encoding_name: str = "cl100k_base",
+        fallback: Optional[TokenCounter] = None,
+        maxsize: int = 1024,
+    ) -> None:
+        self.encoding_name = encoding_name
+        self.fallback = fallback or CharacterRatioCounter(4.0)
+        self.maxsize = maxsize
+        self._counts: OrderedDict[bytes, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> threading.Thread:
+        """Load the encoding in a background thread, so that the first check doesn't wait for it"""
+        thread = threading.Thread(target=_load_encoding, args=(self.encoding_name,), daemon=True)
+        thread.start()
+        return thread
+
+    def count(self, text: str) -> int:
+        """Count the tokens in the text, exactly if the encoding is available"""
+        return self._count(text, text.encode("utf-8", errors="surrogatepass"))
+
+    def exceeds(self, text: str, max_tokens: int) -> bool:
+        """Whether the text has more than max_tokens tokens"""
+        data = text.encode("utf-8", errors="surrogatepass")
+        if len(data) <= max_tokens:
+            return False
+        window = max_tokens * PREFIX_CHARS_PER_TOKEN
+        if len(text) > window:
+            # the tokens of a prefix which ends before whitespace are the first tokens of the
+            # text, so a prefix already over the limit settles it. one token of slack covers an
+            # encoding which splits differently at the cut
+            cut = max(text.rfind(" ", 0, window), text.rfind("\n", 0, window))
+            if cut > 0:
+                prefix = text[:cut]
+                if self._count(prefix, prefix.encode("utf-8", errors="surrogatepass")) > max_tokens + 1:
+                    return True
+        return self._count(text, data) > max_tokens
+
+    def _count(self, text: str, data: bytes) -> int:
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+
+        encoding = _load_encoding(self.encoding_name)
+        if encoding is not None:
+            count = len(encoding.encode(text, disallowed_special=()))
+        else:
+            count = self.fallback.count(text)
+
+        with self._lock:
+            self._counts[key] = count
+            while len(self._counts) > self.maxsize:
+                self._counts.popitem(last=False)
+        return count
+
+
+@cache
+def get_tokenizer_service(encoding_name: str = "cl100k_base") -> TokenizerService:
+    """Get the tokenizer service for the encoding, shared by everything in the process"""
+    return TokenizerService(encoding_name)
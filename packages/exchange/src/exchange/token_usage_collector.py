@@ -20,6 +20,10 @@ class _TokenUsageCollector:
                 usage_by_model.output_tokens += usage.output_tokens
             if usage is not None and usage.total_tokens is not None:
                 usage_by_model.total_tokens += usage.total_tokens
+            if usage is not None and usage.cache_read_tokens is not None:
+                usage_by_model.cache_read_tokens = (usage_by_model.cache_read_tokens or 0) + usage.cache_read_tokens
+            if usage is not None and usage.cache_write_tokens is not None:
+                usage_by_model.cache_write_tokens = (usage_by_model.cache_write_tokens or 0) + usage.cache_write_tokens
         return usage_group_by_model
 
 
@@ -1,6 +1,6 @@
 import inspect
 
-from attrs import define
+from attrs import define, field
 
 from exchange.utils import json_schema, parse_docstring
 
@@ -14,15 +14,19 @@ class Tool:
         description (str): A description of what the tool does
         parameters dict[str, any]: A json schema of the function signature
         function (Callable): The python function that powers the tool
+        parallel_safe (bool): Whether the tool can run concurrently with other tools
+            requested in the same message. Tools that change shared state, such as writing
+            files or changing directory, should set this to False.
     """
 
     name: str
     description: str
     parameters: dict[str, any]
     function: callable
+    parallel_safe: bool = field(default=True)
 
     @classmethod
-    def from_function(cls: type["Tool"], func: any) -> "Tool":  # noqa: ANN401
+    def from_function(cls: type["Tool"], func: any, parallel_safe: bool = True) -> "Tool":  # noqa: ANN401
         """Create a tool instance from a function and its docstring
 
         The function must have a docstring - we require it to load the description
@@ -51,4 +55,5 @@ class Tool:
             description=description,
             parameters=schema,
             function=func,
+            parallel_safe=parallel_safe,
         )
@@ -0,0 +1,73 @@
+import contextvars
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from exchange.content import ToolResult, ToolUse
+
+# the default upper bound on how many tools of a single assistant message run at once
+MAX_TOOL_WORKERS = 8
+
+
+class ToolScheduler:
+    """Runs the tool uses of a single assistant message, concurrently where it is safe to
+
+    Consecutive tool uses of parallel safe tools are run together on a bounded thread pool.
+    A tool use which is not parallel safe acts as a barrier: it only starts once everything
+    requested before it has finished, and it finishes before anything requested after it starts.
+
+    Results are always returned in the same order as the tool uses, regardless of the order
+    in which the tools complete.
+    """
+
+    def __init__(self, max_workers: int = MAX_TOOL_WORKERS) -> None:
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        self.max_workers = max_workers
+
+    def batches(self, tool_uses: list[ToolUse], is_parallel_safe: Callable[[ToolUse], bool]) -> list[list[ToolUse]]:
+        """Group the tool uses into batches that can each run concurrently, in order"""
+        batches = []
+        current = []
+        for tool_use in tool_uses:
+            if is_parallel_safe(tool_use):
+                current.append(tool_use)
+                continue
+            if current:
+                batches.append(current)
+                current = []
+            batches.append([tool_use])
+        if current:
+            batches.append(current)
+        return batches
+
+    def run(
+        self,
+        tool_uses: list[ToolUse],
+        call: Callable[[ToolUse], ToolResult],
+        is_parallel_safe: Callable[[ToolUse], bool],
+    ) -> list[ToolResult]:
+        """Call every tool use, returning the results in the order of the tool uses
+
+        Args:
+            tool_uses (list[ToolUse]): The tool uses requested by the model
+            call (Callable[[ToolUse], ToolResult]): Calls a single tool use
+            is_parallel_safe (Callable[[ToolUse], bool]): Whether a tool use may run alongside others
+        """
+        results = []
+        executor: Optional[Executor] = None
+        try:
+            for batch in self.batches(tool_uses, is_parallel_safe):
+                if len(batch) == 1 or self.max_workers == 1:
+                    results.extend(call(tool_use) for tool_use in batch)
+                    continue
+
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+                # each tool runs in a copy of the caller's context, so that tracing spans nest correctly
+                futures = [executor.submit(contextvars.copy_context().run, call, tool_use) for tool_use in batch]
+                results.extend(future.result() for future in futures)
+        finally:
+            if executor is not None:
+                # on an interrupt we don't want to wait for tools that haven't started yet
+                executor.shutdown(wait=False, cancel_futures=True)
+        return results
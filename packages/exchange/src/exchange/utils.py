@@ -1,14 +1,10 @@
 import inspect
 import uuid
 from importlib.metadata import entry_points
-from typing import get_args, get_origin
+from typing import TYPE_CHECKING, get_args, get_origin
 
-from griffe import (
-    Docstring,
-    DocstringSection,
-    DocstringSectionParameters,
-    DocstringSectionText,
-)
+if TYPE_CHECKING:
+    from griffe import DocstringSection, DocstringSectionText
 
 
 def create_object_id(prefix: str) -> str:
@@ -22,6 +18,9 @@ def compact(content: str) -> str:
 
 def parse_docstring(func: callable) -> tuple[str, list[dict]]:
     """Get description and parameters from function docstring"""
+    # griffe is only needed once tools are defined, so it is not imported with the package
+    from griffe import Docstring, DocstringSectionParameters, DocstringSectionText
+
     function_args = list(inspect.signature(func).parameters.keys())
     text = str(func.__doc__)
     docstring = Docstring(text)
@@ -71,7 +70,7 @@ def parse_docstring(func: callable) -> tuple[str, list[dict]]:
 
 
 def _check_section_is_present(
-    parsed_docstring: list[DocstringSection], section_type: type[DocstringSectionText]
+    parsed_docstring: list["DocstringSection"], section_type: type["DocstringSectionText"]
 ) -> bool:
     for section in parsed_docstring:
         if isinstance(section, section_type):
@@ -1,5 +1,7 @@
+import asyncio
+import json
 import os
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import httpx
 import pytest
@@ -7,6 +9,7 @@ from exchange import Message, Text
 from exchange.content import ToolResult, ToolUse
 from exchange.providers.anthropic import AnthropicProvider
 from exchange.providers.base import MissingProviderEnvVariableError
+from exchange.providers.streaming import MessageBuilder
 from exchange.tool import Tool
 
 
@@ -170,6 +173,117 @@ def test_anthropic_completion(mock_error, mock_warning, mock_post, anthropic_pro
     )
 
 
+@patch("httpx.AsyncClient.post", new_callable=AsyncMock)
+def test_anthropic_acompletion(mock_post, anthropic_provider):
+    response = httpx.Response(
+        200,
+        json={
+            "content": [{"type": "text", "text": "Hello from Claude!"}],
+            "usage": {"input_tokens": 10, "output_tokens": 25},
+        },
+        request=httpx.Request("POST", "https://api.anthropic.com/v1/messages"),
+    )
+    mock_post.return_value = response
+
+    reply_message, reply_usage = asyncio.run(
+        anthropic_provider.acomplete(
+            model="claude-3-5-sonnet-20240620",
+            system="You are a helpful assistant.",
+            messages=[Message.user("Hello, Claude")],
+        )
+    )
+
+    assert reply_message.content == [Text("Hello from Claude!")]
+    assert reply_usage.total_tokens == 35
+    # the async client is created once and shares the provider's configuration
+    assert anthropic_provider.async_client is anthropic_provider.async_client
+    assert anthropic_provider.async_client.headers["x-api-key"] == "test_api_key"
+
+
+@patch("httpx.Client.send")
+def test_anthropic_stream(mock_send, anthropic_provider):
+    events = [
+        ("message_start", {"message": {"usage": {"input_tokens": 10, "output_tokens": 1}}}),
+        ("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}}),
+        ("ping", {"type": "ping"}),
+        ("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": "Hello "}}),
+        ("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": "from Claude!"}}),
+        ("content_block_start", {"index": 1, "content_block": {"type": "tool_use", "id": "1", "name": "example_fn"}}),
+        ("content_block_delta", {"index": 1, "delta": {"type": "input_json_delta", "partial_json": '{"param": '}}),
+        ("content_block_delta", {"index": 1, "delta": {"type": "input_json_delta", "partial_json": '"value"}'}}),
+        ("message_delta", {"delta": {"stop_reason": "tool_use"}, "usage": {"output_tokens": 25}}),
+        ("message_stop", {}),
+    ]
+    body = "".join(f"event: {event}\ndata: {json.dumps(data)}\n\n" for event, data in events)
+    mock_send.return_value = httpx.Response(
+        200,
+        content=body.encode(),
+        request=httpx.Request("POST", "https://api.anthropic.com/v1/messages"),
+    )
+
+    builder = MessageBuilder()
+    for delta in anthropic_provider.stream(
+        model="claude-3-5-sonnet-20240620",
+        system="You are a helpful assistant.",
+        messages=[Message.user("Hello, Claude")],
+    ):
+        builder.add(delta)
+    reply_message, reply_usage = builder.build()
+
+    assert json.loads(mock_send.call_args.args[0].content)["stream"] is True
+    assert reply_message.content == [
+        Text("Hello from Claude!"),
+        ToolUse(id="1", name="example_fn", parameters={"param": "value"}),
+    ]
+    assert reply_usage.total_tokens == 35
+
+
+def test_anthropic_usage_with_prompt_caching():
+    usage = AnthropicProvider.get_usage(
+        {
+            "usage": {
+                "input_tokens": 10,
+                "cache_creation_input_tokens": 200,
+                "cache_read_input_tokens": 1000,
+                "output_tokens": 25,
+            }
+        }
+    )
+    assert usage.input_tokens == 1210
+    assert usage.total_tokens == 1235
+    assert usage.cache_read_tokens == 1000
+    assert usage.cache_write_tokens == 200
+
+
+def test_anthropic_prompt_caching_breakpoints():
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test_api_key", "ANTHROPIC_PROMPT_CACHING": "true"}):
+        provider = AnthropicProvider.from_env()
+    assert provider.prompt_caching
+    assert "prompt-caching" in provider.client.headers["anthropic-beta"]
+
+    messages = [
+        Message.user("first"),
+        Message(role="assistant", content=[ToolUse(id="1", name="example_fn", parameters={"param": "value"})]),
+        Message(role="user", content=[ToolResult(tool_use_id="1", output="result")]),
+        Message.assistant("done"),
+        Message.user("second"),
+    ]
+    tools = (Tool.from_function(example_fn), Tool.from_function(example_fn))
+    payload = provider.get_payload("claude-3-5-sonnet-20240620", "system", messages, tools)
+
+    cache_control = {"type": "ephemeral"}
+    assert payload["system"] == [{"type": "text", "text": "system", "cache_control": cache_control}]
+    assert payload["tools"][-1]["cache_control"] == cache_control
+    marked = [index for index, message in enumerate(payload["messages"]) if "cache_control" in message["content"][-1]]
+    assert marked == [2, 4]
+
+    # the converted messages and tools are cached, and must not keep the breakpoints
+    uncached = AnthropicProvider(provider.client).get_payload("claude-3-5-sonnet-20240620", "system", messages, tools)
+    assert uncached["system"] == "system"
+    assert "cache_control" not in uncached["tools"][-1]
+    assert all("cache_control" not in message["content"][-1] for message in uncached["messages"])
+
+
 @pytest.mark.integration
 def test_anthropic_integration():
     provider = AnthropicProvider.from_env()
@@ -1,9 +1,11 @@
+import json
 import os
 from unittest.mock import patch
 
+import httpx
 import pytest
 
-from exchange import Text, ToolUse
+from exchange import Message, Text, ToolUse
 from exchange.providers.azure import AzureProvider
 from exchange.providers.base import MissingProviderEnvVariableError
 from .conftest import complete, tools
@@ -76,3 +78,18 @@ def test_azure_tools_integration():
     assert tool_use.id is not None
     assert tool_use.name == "read_file"
     assert tool_use.parameters == {"filename": "test.txt"}
+
+
+@patch("httpx.Client.send")
+def test_azure_stream_without_stream_options(mock_send, default_azure_env):
+    mock_send.return_value = httpx.Response(
+        200,
+        content=b"data: [DONE]\n\n",
+        request=httpx.Request("POST", "https://test.openai.azure.com/chat/completions"),
+    )
+
+    list(AzureProvider.from_env().stream(AZURE_MODEL, "You are a helpful assistant.", [Message.user("Hello")], ()))
+
+    payload = json.loads(mock_send.call_args.args[0].content)
+    assert payload["stream"] is True
+    assert "stream_options" not in payload
@@ -1,12 +1,18 @@
+import asyncio
+import json
 import logging
 import os
+import struct
+import zlib
 from unittest.mock import patch
 
+import httpx
 import pytest
 from exchange.content import Text, ToolResult, ToolUse
 from exchange.message import Message
 from exchange.providers.base import MissingProviderEnvVariableError
-from exchange.providers.bedrock import BedrockProvider
+from exchange.providers.bedrock import BedrockProvider, iter_event_stream
+from exchange.providers.streaming import MessageBuilder
 from exchange.tool import Tool
 
 logger = logging.getLogger(__name__)
@@ -95,6 +101,64 @@ def test_complete(mock_post, bedrock_provider):
     assert reply_usage.total_tokens == 25
 
 
+def encode_event(event_type: str, payload: dict) -> bytes:
+    headers = b""
+    for name, value in [(":event-type", event_type), (":message-type", "event")]:
+        headers += bytes([len(name)]) + name.encode() + b"\x07" + struct.pack(">H", len(value)) + value.encode()
+    body = json.dumps(payload).encode()
+    prelude = struct.pack(">II", 12 + len(headers) + len(body) + 4, len(headers))
+    message = prelude + struct.pack(">I", zlib.crc32(prelude)) + headers + body
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+def test_iter_event_stream_across_chunks():
+    data = encode_event("messageStart", {"role": "assistant"}) + encode_event("messageStop", {"stopReason": "end"})
+    # split the body at arbitrary points, like a network would
+    chunks = [data[:5], data[5:40], data[40:]]
+
+    events = list(iter_event_stream(iter(chunks)))
+
+    assert [headers[":event-type"] for headers, _ in events] == ["messageStart", "messageStop"]
+    assert json.loads(events[1][1]) == {"stopReason": "end"}
+
+
+def test_iter_event_stream_corrupted():
+    data = bytearray(encode_event("messageStart", {"role": "assistant"}))
+    data[-6] ^= 0xFF
+    with pytest.raises(ValueError):
+        list(iter_event_stream(iter([bytes(data)])))
+
+
+@patch("httpx.Client.send")
+def test_stream(mock_send, bedrock_provider):
+    events = [
+        ("messageStart", {"role": "assistant"}),
+        ("contentBlockDelta", {"contentBlockIndex": 0, "delta": {"text": "Hello, "}}),
+        ("contentBlockDelta", {"contentBlockIndex": 0, "delta": {"text": "world!"}}),
+        ("contentBlockStop", {"contentBlockIndex": 0}),
+        ("contentBlockStart", {"contentBlockIndex": 1, "start": {"toolUse": {"toolUseId": "1", "name": "fn"}}}),
+        ("contentBlockDelta", {"contentBlockIndex": 1, "delta": {"toolUse": {"input": '{"a": 1}'}}}),
+        ("messageStop", {"stopReason": "tool_use"}),
+        ("metadata", {"usage": {"inputTokens": 10, "outputTokens": 15, "totalTokens": 25}}),
+    ]
+    mock_send.return_value = httpx.Response(
+        200,
+        content=b"".join(encode_event(event_type, payload) for event_type, payload in events),
+        request=httpx.Request("POST", "https://bedrock-runtime.us-east-1.amazonaws.com/"),
+    )
+
+    builder = MessageBuilder()
+    for delta in bedrock_provider.stream("test-model", "You are a helpful assistant.", [Message.user("Hello")], ()):
+        builder.add(delta)
+    reply_message, reply_usage = builder.build()
+
+    request = mock_send.call_args.args[0]
+    assert request.url.path.endswith("/model/test-model/converse-stream")
+    assert "Authorization" in request.headers
+    assert reply_message.content == [Text("Hello, world!"), ToolUse(id="1", name="fn", parameters={"a": 1})]
+    assert reply_usage.total_tokens == 25
+
+
 def test_message_to_bedrock_spec_text(bedrock_provider):
     message = Message(role="user", content=[Text("Hello, world!")])
     expected = {"role": "user", "content": [{"text": "Hello, world!"}]}
@@ -253,3 +317,13 @@ def test_tools_to_bedrock_spec_duplicate(bedrock_provider):
     )
     tools = bedrock_provider.tools_to_bedrock_spec((tool, tool_duplicate))
     assert set(tool["toolSpec"]["name"] for tool in tools["tools"]) == {"WordCount"}
+
+
+def test_async_client_shares_the_rate_limit_governor(bedrock_provider):
+    from exchange.providers.rate_limit import RateLimitGovernor, install_governor
+
+    governor = RateLimitGovernor()
+    install_governor(bedrock_provider.client, governor)
+    async_client = bedrock_provider.create_async_client()
+    assert async_client._transport.governor is governor
+    asyncio.run(async_client.aclose())
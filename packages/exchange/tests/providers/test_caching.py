@@ -0,0 +1,121 @@
+import os
+import time
+
+import pytest
+from exchange import Message, Text, ToolUse
+from exchange.providers import Provider, Usage
+from exchange.providers.caching import CacheMissError, CachingProvider, ResponseCache, request_key
+from exchange.providers.streaming import MessageBuilder
+from exchange.tool import Tool
+
+
+class CountingProvider(Provider):
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, model, system, messages, tools, **kwargs):
+        self.calls += 1
+        content = [Text(f"reply {self.calls}"), ToolUse(id="1", name="read", parameters={"path": "a"})]
+        return Message(role="assistant", content=content), Usage(10, 5, 15)
+
+
+def dummy_tool() -> str:
+    """A tool that does nothing"""
+    return ""
+
+
+def complete(provider, text="hello", **kwargs):
+    return provider.complete("model", "system", [Message.user(text)], (Tool.from_function(dummy_tool),), **kwargs)
+
+
+def test_request_key_ignores_message_ids():
+    first = request_key("model", "system", [Message.user("hello")], ())
+    second = request_key("model", "system", [Message.user("hello")], ())
+    assert first == second
+    assert first != request_key("model", "system", [Message.user("hello")], (), temperature=0.5)
+    assert first != request_key("other", "system", [Message.user("hello")], ())
+
+
+def test_read_write_serves_repeated_requests(tmp_path):
+    inner = CountingProvider()
+    provider = CachingProvider(inner, ResponseCache(tmp_path))
+
+    message, usage = complete(provider)
+    cached_message, cached_usage = complete(provider)
+
+    assert inner.calls == 1
+    assert cached_message.content == message.content
+    assert cached_usage == usage
+    complete(provider, text="something else")
+    assert inner.calls == 2
+
+
+def test_record_then_replay_offline(tmp_path):
+    inner = CountingProvider()
+    complete(CachingProvider(inner, ResponseCache(tmp_path), mode="record"))
+    complete(CachingProvider(inner, ResponseCache(tmp_path), mode="record"))
+    assert inner.calls == 2
+
+    replay = CachingProvider(None, ResponseCache(tmp_path, ttl=0), mode="replay")
+    message, _ = complete(replay)
+    assert message.text == "reply 2"
+    with pytest.raises(CacheMissError):
+        complete(replay, text="never recorded")
+
+
+def test_provider_required_unless_replaying(tmp_path):
+    with pytest.raises(ValueError):
+        CachingProvider(None, ResponseCache(tmp_path))
+
+
+def test_off_does_not_touch_cache(tmp_path):
+    inner = CountingProvider()
+    provider = CachingProvider(inner, ResponseCache(tmp_path), mode="off")
+    complete(provider)
+    complete(provider)
+    assert inner.calls == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_expired_entries_are_misses(tmp_path):
+    inner = CountingProvider()
+    provider = CachingProvider(inner, ResponseCache(tmp_path, ttl=60))
+    complete(provider)
+    for entry in tmp_path.glob("*/*.json"):
+        entry.write_text(entry.read_text().replace('"created": ', '"created": -1e9 + '))
+    provider.cache = ResponseCache(tmp_path, ttl=60)
+    assert complete(provider)[0].text == "reply 2"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    ResponseCache(tmp_path).put("aa1", Message.assistant("first"), Usage(1, 1, 2))
+    size = next(tmp_path.glob("*/*.json")).stat().st_size
+    cache = ResponseCache(tmp_path, max_size=int(size * 2.5))
+    cache.put("aa1", Message.assistant("first"), Usage(1, 1, 2))
+    cache.put("bb2", Message.assistant("second"), Usage(1, 1, 2))
+    # make the first entry the oldest, then read it so that the second becomes least recently used
+    old = time.time() - 100
+    os.utime(tmp_path / "aa" / "aa1.json", (old, old))
+    os.utime(tmp_path / "bb" / "bb2.json", (old - 10, old - 10))
+    assert cache.get("aa1") is not None
+    cache.put("cc3", Message.assistant("third"), Usage(1, 1, 2))
+
+    assert cache.get("bb2") is None
+    assert cache.get("aa1") is not None
+    assert cache.get("cc3") is not None
+
+
+def test_stream_records_and_replays(tmp_path):
+    inner = CountingProvider()
+    provider = CachingProvider(inner, ResponseCache(tmp_path))
+    args = ("model", "system", [Message.user("hello")], ())
+
+    for _ in range(2):
+        builder = MessageBuilder()
+        for delta in provider.stream(*args):
+            builder.add(delta)
+        message, usage = builder.build()
+        assert message.text == "reply 1"
+        assert message.tool_use[0].parameters == {"path": "a"}
+        assert usage == Usage(10, 5, 15)
+    assert inner.calls == 1
@@ -1,11 +1,14 @@
+import json
 import os
 from unittest.mock import patch
 
+import httpx
 import pytest
 from exchange import Message, Text
 from exchange.content import ToolResult, ToolUse
 from exchange.providers.base import MissingProviderEnvVariableError
 from exchange.providers.google import GoogleProvider
+from exchange.providers.streaming import MessageBuilder
 from exchange.tool import Tool
 from .conftest import complete, tools
 
@@ -109,6 +112,36 @@ def test_google_complete(default_google_env):
     assert reply_usage.total_tokens == 21
 
 
+@patch("httpx.Client.send")
+def test_google_stream(mock_send, default_google_env):
+    chunks = [
+        {"candidates": [{"content": {"parts": [{"text": "Hello "}], "role": "model"}}]},
+        {
+            "candidates": [{"content": {"parts": [{"text": "from Gemini!"}], "role": "model"}}],
+            "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 5, "totalTokenCount": 15},
+        },
+    ]
+    body = "".join(f"data: {json.dumps(chunk)}\r\n\r\n" for chunk in chunks)
+    mock_send.return_value = httpx.Response(
+        200,
+        content=body.encode(),
+        request=httpx.Request("POST", "https://generativelanguage.googleapis.com/v1beta"),
+    )
+
+    builder = MessageBuilder()
+    provider = GoogleProvider.from_env()
+    for delta in provider.stream(GOOGLE_MODEL, "You are a helpful assistant.", [Message.user("Hello")], ()):
+        builder.add(delta)
+    reply_message, reply_usage = builder.build()
+
+    request = mock_send.call_args.args[0]
+    assert request.url.path.endswith(f"models/{GOOGLE_MODEL}:streamGenerateContent")
+    assert request.url.params["alt"] == "sse"
+    assert "key" in request.url.params
+    assert reply_message.content == [Text("Hello from Gemini!")]
+    assert reply_usage.total_tokens == 15
+
+
 @pytest.mark.integration
 def test_google_complete_integration():
     reply = complete(GoogleProvider, GOOGLE_MODEL)
@@ -1,11 +1,15 @@
+import json
 import os
 from unittest.mock import patch
 
+import httpx
 import pytest
 
-from exchange import Text, ToolUse
+from exchange import Message, Text, ToolUse
 from exchange.providers.base import MissingProviderEnvVariableError
 from exchange.providers.openai import OpenAiProvider
+from exchange.providers.streaming import MessageBuilder
+from exchange.providers.utils import InitialMessageTooLargeError
 from .conftest import complete, vision, tools
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
@@ -73,3 +77,59 @@ def test_openai_vision_integration():
     reply = vision(OpenAiProvider, OPENAI_MODEL)
 
     assert "ask goose" in reply[0].text.lower()
+
+
+@patch("httpx.Client.send")
+def test_openai_stream(mock_send, default_openai_env):
+    chunks = [
+        {"choices": [{"index": 0, "delta": {"role": "assistant", "content": "Let me "}}]},
+        {"choices": [{"index": 0, "delta": {"content": "check."}}]},
+        {
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {
+                        "tool_calls": [{"index": 0, "id": "call_1", "function": {"name": "read_file", "arguments": ""}}]
+                    },
+                }
+            ]
+        },
+        {"choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "function": {"arguments": '{"filen'}}]}}]},
+        {"choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "function": {"arguments": 'ame": "a"}'}}]}}]},
+        {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 12, "total_tokens": 22}},
+    ]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+    mock_send.return_value = httpx.Response(
+        200,
+        content=body.encode(),
+        request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"),
+    )
+
+    builder = MessageBuilder()
+    provider = OpenAiProvider.from_env()
+    for delta in provider.stream(OPENAI_MODEL, "You are a helpful assistant.", [Message.user("Hello")], ()):
+        builder.add(delta)
+    reply_message, reply_usage = builder.build()
+
+    payload = json.loads(mock_send.call_args.args[0].content)
+    assert payload["stream"] is True
+    assert payload["stream_options"] == {"include_usage": True}
+    assert reply_message.content == [
+        Text("Let me check."),
+        ToolUse(id="call_1", name="read_file", parameters={"filename": "a"}),
+    ]
+    assert reply_usage.total_tokens == 22
+
+
+@patch("httpx.Client.send")
+def test_openai_stream_single_message_too_long(mock_send, default_openai_env):
+    error = {"error": {"code": "context_length_exceeded", "message": "too long"}}
+    mock_send.return_value = httpx.Response(
+        200,
+        content=f"data: {json.dumps(error)}\n\n".encode(),
+        request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"),
+    )
+
+    provider = OpenAiProvider.from_env()
+    with pytest.raises(InitialMessageTooLargeError):
+        list(provider.stream(OPENAI_MODEL, "You are a helpful assistant.", [Message.user("Hello")], ()))
@@ -1,6 +1,9 @@
+import httpx
 import pytest
 from exchange.invalid_choice_error import InvalidChoiceError
 from exchange.providers import get_provider
+from exchange.providers.ollama import OllamaProvider
+from exchange.providers.openai import OpenAiProvider
 
 
 def test_get_provider_valid():
@@ -16,3 +19,24 @@ def test_get_provider_throw_error_for_unknown_provider():
     assert error.value.attribute_value == "nonexistent"
     assert "openai" in error.value.available_values
     assert "openai" in error.value.message
+
+
+def test_is_available_checks_the_required_env_vars(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert not OpenAiProvider.is_available(timeout=0.1)
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    assert OpenAiProvider.is_available(timeout=0.1)
+
+
+def test_ollama_is_available_when_the_server_answers(monkeypatch):
+    def get(url, timeout):
+        assert timeout == 0.1
+        if url == "http://down:11434/":
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200)
+
+    monkeypatch.setattr(httpx, "get", get)
+    monkeypatch.setenv("OLLAMA_HOST", "http://up:11434/")
+    assert OllamaProvider.is_available(timeout=0.1)
+    monkeypatch.setenv("OLLAMA_HOST", "http://down:11434/")
+    assert not OllamaProvider.is_available(timeout=0.1)
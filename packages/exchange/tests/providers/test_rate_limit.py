@@ -0,0 +1,170 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+from exchange.providers.rate_limit import (
+    RateLimitGovernor,
+    RateLimiter,
+    TokenBucket,
+    install_governor,
+    parse_duration,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_waits_once_empty():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    clock.now += 10
+    assert bucket.reserve(1) == 0
+
+
+def test_token_bucket_limit_to():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock)
+    bucket.limit_to(0)
+    assert bucket.reserve(10) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize(
+    "value,seconds",
+    [("2", 2), ("1.5", 1.5), ("6m0s", 360), ("20ms", 0.02), ("1h2m3s", 3723), ("soon", None)],
+)
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_parse_duration_timestamp():
+    assert parse_duration("2000-01-01T00:00:00Z") < 0
+    assert parse_duration("Sat, 01 Jan 2000 00:00:00 GMT") < 0
+    # timestamps without a timezone are taken as utc
+    assert parse_duration("2000-01-01T00:00:00") < 0
+    assert parse_duration("Sat, 01 Jan 2000 00:00:00 -0000") < 0
+
+
+def test_rate_limiter_paces_requests():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, clock=clock, sleep=clock.sleep)
+    for _ in range(61):
+        limiter.acquire()
+        limiter.release(200)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_rate_limiter_paces_tokens():
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=6000, clock=clock, sleep=clock.sleep)
+    limiter.acquire(6000)
+    limiter.release(200)
+    limiter.acquire(100)
+    limiter.release(200)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_rate_limiter_follows_retry_after():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+    limiter.acquire()
+    limiter.release(429, {"retry-after": "5"})
+    limiter.acquire()
+    limiter.release(200)
+    assert clock.sleeps == [pytest.approx(5.0)]
+
+
+def test_rate_limiter_pauses_when_no_requests_remain():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+    limiter.acquire()
+    limiter.release(200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m"})
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(60.0)]
+
+
+def test_rate_limiter_adapts_concurrency():
+    limiter = RateLimiter(max_concurrency=8)
+    limiter.acquire()
+    limiter.release(429)
+    assert limiter.concurrency == 4
+    for _ in range(40):
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.concurrency == 8
+
+
+def test_rate_limiter_limits_concurrency():
+    limiter = RateLimiter(max_concurrency=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def request():
+        limiter.acquire()
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+        limiter.release(200)
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+
+def test_governor_has_a_limiter_per_model():
+    governor = RateLimitGovernor(requests_per_minute=100, models={"small": {"requests_per_minute": 1000}})
+    assert governor.limiter("big") is governor.limiter("big")
+    assert governor.limiter("big").requests.capacity == 100
+    assert governor.limiter("small").requests.capacity == 1000
+
+
+def test_install_governor_routes_requests():
+    responses = iter([httpx.Response(429, headers={"retry-after": "0"}), httpx.Response(200, json={})])
+    client = httpx.Client(transport=httpx.MockTransport(lambda request: next(responses)), base_url="http://test")
+    governor = RateLimitGovernor(max_concurrency=4)
+    install_governor(client, governor)
+
+    assert client.post("/", content=json.dumps({"model": "gpt-4o"})).status_code == 429
+    assert client.post("/", content=json.dumps({"model": "gpt-4o"})).status_code == 200
+    limiter = governor.limiter("gpt-4o")
+    assert limiter.active == 0
+    assert 2 < limiter.concurrency < 4
+
+
+def test_async_client_shares_the_governor():
+    from exchange.providers.base import Provider
+
+    class FakeProvider(Provider):
+        def __init__(self, client: httpx.Client) -> None:
+            self.client = client
+
+        def complete(self, *args, **kwargs):
+            raise NotImplementedError
+
+    client = httpx.Client(base_url="http://test")
+    governor = RateLimitGovernor()
+    install_governor(client, governor)
+    async_client = FakeProvider(client).create_async_client()
+    assert async_client._transport.governor is governor
+    asyncio.run(async_client.aclose())
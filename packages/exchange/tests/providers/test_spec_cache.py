@@ -0,0 +1,81 @@
+import gc
+
+from exchange import Message
+from exchange.providers.spec_cache import SpecCache
+from exchange.providers.utils import messages_to_openai_spec, tools_to_openai_spec
+from exchange.tool import Tool
+
+
+class CountingConverter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, *objects):
+        self.calls += 1
+        return [obj.text for obj in objects]
+
+
+def test_converts_each_object_once():
+    convert = CountingConverter()
+    cache = SpecCache(convert)
+    first = Message.user("first")
+    second = Message.user("second")
+
+    assert cache(first) == ["first"]
+    assert cache(first) == ["first"]
+    assert cache(second) == ["second"]
+    assert cache(first, second) == ["first", "second"]
+    assert convert.calls == 3
+
+
+def test_equal_objects_are_converted_separately():
+    convert = CountingConverter()
+    cache = SpecCache(convert)
+    cache(Message.user("same"))
+    message = Message.user("same")
+    cache(message)
+    cache(message)
+    assert convert.calls == 2
+
+
+def test_collected_objects_are_not_reused():
+    convert = CountingConverter()
+    cache = SpecCache(convert)
+    message = Message.user("first")
+    cache(message)
+    del message
+    gc.collect()
+
+    # even if the new message reuses the id of the collected one, it gets its own spec
+    assert cache(Message.user("second")) == ["second"]
+
+
+def test_evicts_least_recently_used():
+    convert = CountingConverter()
+    cache = SpecCache(convert, maxsize=2)
+    messages = [Message.user(str(i)) for i in range(3)]
+    for message in messages:
+        cache(message)
+    cache(messages[2])
+    cache(messages[0])
+    assert convert.calls == 4
+
+
+def test_messages_to_openai_spec_reuses_converted_messages():
+    messages = [Message.user("hello"), Message.assistant("hi")]
+    first = messages_to_openai_spec(messages)
+    messages.append(Message.user("again"))
+    second = messages_to_openai_spec(messages)
+
+    assert second[:2] == first
+    assert all(a is b for a, b in zip(first, second))
+
+
+def test_tools_to_openai_spec_is_cached_per_tools():
+    def dummy_tool() -> str:
+        """An example tool"""
+        return "dummy response"
+
+    tools = (Tool.from_function(dummy_tool),)
+    assert tools_to_openai_spec(tools) is tools_to_openai_spec(tools)
+    assert tools_to_openai_spec(tools) == tools_to_openai_spec((Tool.from_function(dummy_tool),))
@@ -0,0 +1,74 @@
+from exchange import Message, Text, ToolUse
+from exchange.providers.base import Usage
+from exchange.providers.streaming import (
+    MessageBuilder,
+    TextDelta,
+    ToolUseDelta,
+    UsageDelta,
+    message_to_deltas,
+    parse_partial_json,
+)
+
+
+def test_parse_partial_json():
+    assert parse_partial_json("") == {}
+    assert parse_partial_json('{"path": "src/ma') == {"path": "src/ma"}
+    assert parse_partial_json('{"a": 1, "b": [1, 2') == {"a": 1, "b": [1, 2]}
+    assert parse_partial_json('{"a": {"b": "c"}, ') == {"a": {"b": "c"}}
+    assert parse_partial_json('{"a":') == {"a": None}
+    assert parse_partial_json('{"a": "x\\') == {"a": "x"}
+    assert parse_partial_json('{"a": tr') is None
+
+
+def test_message_builder_assembles_text_and_tool_uses():
+    builder = MessageBuilder()
+    deltas = [
+        UsageDelta(input_tokens=10, output_tokens=1),
+        TextDelta("Let me "),
+        TextDelta("check."),
+        ToolUseDelta(index=1, id="tool_1", name="read_file"),
+        ToolUseDelta(index=1, arguments='{"filename": '),
+        ToolUseDelta(index=1, arguments='"test.txt"}'),
+        TextDelta("Done"),
+        UsageDelta(output_tokens=20),
+    ]
+    for delta in deltas[:5]:
+        builder.add(delta)
+
+    # the tool use is available while its parameters are still being generated
+    assert builder.text == "Let me check."
+    assert builder.content[1] == ToolUse(id="tool_1", name="read_file", parameters={"filename": None})
+
+    for delta in deltas[5:]:
+        builder.add(delta)
+    message, usage = builder.build()
+
+    assert message.content == [
+        Text("Let me check."),
+        ToolUse(id="tool_1", name="read_file", parameters={"filename": "test.txt"}),
+        Text("Done"),
+    ]
+    assert usage == Usage(input_tokens=10, output_tokens=20, total_tokens=30)
+
+
+def test_message_builder_invalid_tool_parameters():
+    builder = MessageBuilder()
+    builder.add(ToolUseDelta(index=0, id="tool_1", name="read_file", arguments='{"filename": '))
+    message, _ = builder.build()
+
+    assert message.tool_use[0].is_error
+    assert message.tool_use[0].parameters == '{"filename": '
+
+
+def test_message_to_deltas_round_trip():
+    message = Message(
+        role="assistant",
+        content=[Text("Hello"), ToolUse(id="1", name="read_file", parameters={"filename": "test.txt"})],
+    )
+    builder = MessageBuilder()
+    for delta in message_to_deltas(message, Usage(10, 5, 15)):
+        builder.add(delta)
+
+    rebuilt, usage = builder.build()
+    assert rebuilt.content == message.content
+    assert usage == Usage(10, 5, 15)
@@ -0,0 +1,77 @@
+import random
+
+from exchange.checkpoint import Checkpoint, CheckpointData, CheckpointIndex
+
+
+def checkpoint(token_count: int) -> Checkpoint:
+    return Checkpoint(token_count=token_count)
+
+
+def test_running_totals_follow_changes():
+    rng = random.Random(0)
+    index = CheckpointIndex()
+    expected = []
+    for _ in range(500):
+        operation = rng.choice(["append", "append", "pop", "pop_first", "prepend", "insert", "delete"])
+        if operation == "append" or not expected:
+            value = checkpoint(rng.randint(0, 50))
+            index.append(value)
+            expected.append(value)
+        elif operation == "pop":
+            assert index.pop() == expected.pop()
+        elif operation == "pop_first":
+            assert index.pop(0) == expected.pop(0)
+        elif operation == "prepend":
+            value = checkpoint(rng.randint(0, 50))
+            index.insert(0, value)
+            expected.insert(0, value)
+        elif operation == "insert":
+            position = rng.randrange(len(expected))
+            value = checkpoint(rng.randint(0, 50))
+            index.insert(position, value)
+            expected.insert(position, value)
+        else:
+            position = rng.randrange(len(expected))
+            del index[position]
+            del expected[position]
+
+        assert index == expected
+        assert index.token_count == sum(c.token_count for c in expected)
+        count = rng.randint(0, len(expected))
+        assert index.leading_token_count(count) == sum(c.token_count for c in expected[:count])
+
+
+def test_count_covering():
+    index = CheckpointIndex([checkpoint(10), checkpoint(0), checkpoint(5), checkpoint(20)])
+    assert index.count_covering(0) == 0
+    assert index.count_covering(1) == 1
+    assert index.count_covering(10) == 1
+    assert index.count_covering(11) == 3
+    assert index.count_covering(35) == 4
+    assert index.count_covering(100) == 4
+
+    index.pop(0)
+    assert index.count_covering(5) == 2
+    assert index.count_covering(6) == 3
+
+
+def test_fork_is_independent():
+    index = CheckpointIndex([checkpoint(1), checkpoint(2)])
+    fork = index.fork()
+    fork.pop(0)
+    fork.append(checkpoint(4))
+    assert index.token_count == 3
+    assert fork.token_count == 6
+
+
+def test_checkpoints_to_remove():
+    data = CheckpointData(total_token_count=110, checkpoints=[checkpoint(10), checkpoint(30), checkpoint(40)])
+    # the total includes 30 tokens of system prompt, which are never removed
+    assert data.checkpoints_to_remove(100) == 1
+    assert data.checkpoints_to_remove(70) == 2
+    assert data.checkpoints_to_remove(110) == 0
+    assert data.checkpoints_to_remove(10) == 3
+
+    data.reset()
+    assert isinstance(data.checkpoints, CheckpointIndex)
+    assert data.checkpoints_to_remove(10) == 0
@@ -0,0 +1,72 @@
+import pytest
+from exchange.copy_on_write import CopyOnWriteList
+
+
+def test_behaves_like_a_list():
+    items = CopyOnWriteList([1, 2, 3])
+    items.append(4)
+    items.insert(0, 0)
+    assert items == [0, 1, 2, 3, 4]
+    assert items[-1] == 4
+    assert items[1:3] == [1, 2]
+    assert items.pop() == 4
+    assert items.pop(0) == 0
+    assert items.pop(1) == 2
+    items[0] = 10
+    assert items == [10, 3]
+    assert 3 in items
+    items.clear()
+    assert items == []
+    with pytest.raises(IndexError):
+        items.pop()
+
+
+def test_forks_do_not_see_each_others_changes():
+    original = CopyOnWriteList([1, 2, 3])
+    fork = original.fork()
+
+    fork.append(4)
+    original.append(5)
+    assert original == [1, 2, 3, 5]
+    assert fork == [1, 2, 3, 4]
+
+    fork.pop(0)
+    fork.insert(0, 0)
+    original[1] = 20
+    assert original == [1, 20, 3, 5]
+    assert fork == [0, 2, 3, 4]
+
+
+def test_fork_shares_items_until_changed():
+    original = CopyOnWriteList(range(1000))
+    fork = original.fork()
+    assert fork._items is original._items
+
+    # popping from the front and appending only moves the window
+    fork.pop(0)
+    fork.append(-1)
+    assert fork._items is original._items
+    assert original == list(range(1000))
+    assert fork == list(range(1, 1000)) + [-1]
+
+    # the end of the backing list is claimed by the fork now, so the original copies
+    original.append(1000)
+    assert fork._items is not original._items
+    assert original == list(range(1001))
+
+
+def test_pop_then_append_after_fork():
+    original = CopyOnWriteList([1, 2, 3])
+    fork = original.fork()
+    original.pop()
+    original.append(4)
+    assert original == [1, 2, 4]
+    assert fork == [1, 2, 3]
+
+
+def test_compacts_after_popping_from_front():
+    items = CopyOnWriteList(range(200))
+    for _ in range(150):
+        items.pop(0)
+    assert items == list(range(150, 200))
+    assert len(items._items) < 200
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from exchange.checkpoint import Checkpoint, CheckpointData
@@ -6,6 +8,7 @@ from exchange.exchange import Exchange
 from exchange.message import Message
 from exchange.moderators import PassiveModerator
 from exchange.providers import Provider, Usage
+from exchange.providers.streaming import TextDelta
 from exchange.tool import Tool
 
 
@@ -133,6 +136,39 @@ def test_invalid_tool_parameters():
     assert isinstance(content, ToolResult) and content.is_error and "invalid json" in content.output.lower()
 
 
+def test_areply_with_tool_use():
+    ex = Exchange(
+        provider=MockProvider(
+            sequence=[
+                Message(
+                    role="assistant",
+                    content=[ToolUse(id="1", name="dummy_tool", parameters={})],
+                ),
+                Message(
+                    role="assistant",
+                    content=[Text(text="Here is the completion after tool call")],
+                ),
+            ],
+            usage_dicts=[
+                {"usage": {"input_tokens": 12, "output_tokens": 23}},
+                {"usage": {"input_tokens": 40, "output_tokens": 23}},
+            ],
+        ),
+        model="gpt-4o-2024-05-13",
+        system="You are a helpful assistant.",
+        tools=(Tool.from_function(dummy_tool),),
+        moderator=PassiveModerator(),
+    )
+
+    ex.add(Message(role="user", content=[Text(text="test")]))
+
+    response = asyncio.run(ex.areply())
+
+    assert response.text == "Here is the completion after tool call"
+    assert ex.messages[2].content[0].tool_use_id == "1"
+    assert ex.checkpoint_data.total_token_count == 63
+
+
 def test_max_tool_use_when_limit_reached():
     """Test the max_tool_use parameter in the reply method."""
     ex = Exchange(
@@ -694,6 +730,39 @@ def test_generate_successful_response_on_first_try(normal_exchange):
     ex.generate()
 
 
+def test_generate_streams_deltas(normal_exchange):
+    ex = normal_exchange
+    ex.add(Message(role="user", content=[Text("Hello")]))
+    deltas = []
+
+    # the mock provider only implements complete, so this streams through the default replay
+    message = ex.generate(on_delta=deltas.append)
+
+    assert "".join(delta.text for delta in deltas if isinstance(delta, TextDelta)) == message.text
+    assert ex.messages[-1] is message
+    assert ex.checkpoint_data.total_token_count > 0
+
+
+class UsagelessStreamProvider(MockProvider):
+    def stream(self, model, system, messages, tools, **kwargs):
+        message = self.sequence[self.call_count]
+        self.call_count += 1
+        yield TextDelta(message.text)
+
+
+def test_generate_estimates_usage_missing_from_stream(normal_exchange):
+    ex = normal_exchange.replace(provider=UsagelessStreamProvider(normal_exchange.provider.sequence, []))
+    ex.add(Message(role="user", content=[Text("Hello")]))
+
+    ex.generate(on_delta=lambda delta: None)
+    ex.add(Message(role="user", content=[Text("And again")]))
+    ex.generate(on_delta=lambda delta: None)
+
+    assert checkpoint_to_index_pairs(ex.checkpoint_data.checkpoints) == [(0, 0), (1, 1), (2, 2), (3, 3)]
+    assert all(checkpoint.token_count > 0 for checkpoint in ex.checkpoint_data.checkpoints)
+    assert ex.checkpoint_data.total_token_count == sum(c.token_count for c in ex.checkpoint_data.checkpoints)
+
+
 def test_rewind_in_normal_exchange(normal_exchange):
     ex = normal_exchange
     ex.rewind()
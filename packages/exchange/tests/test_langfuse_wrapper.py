@@ -1,6 +1,9 @@
+import subprocess
+import sys
+
 import pytest
 from unittest.mock import patch, MagicMock
-from exchange.langfuse_wrapper import observe_wrapper
+from exchange.langfuse_wrapper import enable_tracing, observe_wrapper
 
 
 @pytest.fixture
@@ -40,7 +43,40 @@ def test_function_is_not_wrapped(mock_langfuse_context):
     def hello() -> str:
         return "Hello"
 
-    assert not hasattr(hello, "__wrapped__")
     assert hello() == "Hello"
 
     mock_observe.assert_not_called()
+
+
+def test_function_is_traced_once_tracing_is_enabled(mock_langfuse_context):
+    mock_langfuse_context.auth_check.return_value = True
+    mock_observe = MagicMock(side_effect=lambda *args, **kwargs: lambda fn: fn)
+    mock_langfuse_context.observe = mock_observe
+
+    @observe_wrapper()
+    def hello() -> str:
+        return "Hello"
+
+    with patch("exchange.langfuse_wrapper.HAS_LANGFUSE_CREDENTIALS", False):
+        assert hello() == "Hello"
+        mock_observe.assert_not_called()
+
+        assert enable_tracing()
+        assert hello() == "Hello"
+        assert hello() == "Hello"
+        # the langfuse wrapper is only created once
+        mock_observe.assert_called_once()
+        mock_langfuse_context.configure.assert_called_once()
+
+
+def test_enable_tracing_without_a_server(mock_langfuse_context):
+    mock_langfuse_context.auth_check.return_value = False
+    with patch("exchange.langfuse_wrapper.HAS_LANGFUSE_CREDENTIALS", False):
+        assert not enable_tracing()
+        mock_langfuse_context.configure.assert_not_called()
+
+
+def test_import_does_not_load_langfuse():
+    code = "import sys, exchange.langfuse_wrapper, exchange.exchange; print('langfuse' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
@@ -0,0 +1,154 @@
+from unittest.mock import patch
+
+import pytest
+from exchange import Exchange, Message
+from exchange.moderators.truncate import ContextTruncate
+from exchange.providers import Provider, Usage
+from exchange.token_counter import (
+    TOOL_OVERHEAD_TOKENS,
+    CharacterRatioCounter,
+    TiktokenCounter,
+    TokenizerService,
+    _load_encoding,
+    _token_counters,
+    get_token_counter,
+    register_token_counter,
+)
+from exchange.tool import Tool
+
+
+def dummy_tool() -> str:
+    """An example tool"""
+    return "dummy response"
+
+
+@pytest.fixture(autouse=True)
+def restore_registry():
+    registered = list(_token_counters)
+    yield
+    _token_counters[:] = registered
+    get_token_counter.cache_clear()
+    _load_encoding.cache_clear()
+
+
+def test_character_ratio_counter():
+    counter = CharacterRatioCounter(4.0)
+    assert counter.count("") == 0
+    assert counter.count("abcd") == 1
+    assert counter.count("abcde") == 2
+
+
+def test_count_system_includes_tools():
+    counter = CharacterRatioCounter(4.0)
+    without_tools = counter.count_system("You are a helpful assistant.", ())
+    with_tools = counter.count_system("You are a helpful assistant.", (Tool.from_function(dummy_tool),))
+    assert with_tools > without_tools + TOOL_OVERHEAD_TOKENS
+
+
+def test_get_token_counter_for_model_families():
+    assert isinstance(get_token_counter("claude-3-5-sonnet-20240620"), CharacterRatioCounter)
+    assert isinstance(get_token_counter("us.anthropic.claude-3-5-sonnet-20240620-v1:0"), CharacterRatioCounter)
+    assert isinstance(get_token_counter("gemini-1.5-flash"), CharacterRatioCounter)
+    assert get_token_counter("some-unknown-model") is None
+
+
+def test_registered_counter_takes_precedence():
+    counter = CharacterRatioCounter(1.0)
+    register_token_counter("claude*", lambda: counter)
+    assert get_token_counter("claude-3-5-sonnet-20240620") is counter
+
+
+def test_tiktoken_counter_unavailable_without_encoding():
+    with patch("exchange.token_counter.get_encoding", side_effect=ConnectionError("offline")):
+        assert not TiktokenCounter("o200k_base").available
+        assert get_token_counter("gpt-4o") is None
+
+
+class CountingProvider(Provider):
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, model, system, messages, tools, **kwargs):
+        self.calls += 1
+        return Message.assistant("ok"), Usage(input_tokens=50, output_tokens=1, total_tokens=51)
+
+
+def test_truncate_counts_system_prompt_locally():
+    register_token_counter("local-model", lambda: CharacterRatioCounter(1.0))
+    provider = CountingProvider()
+    exchange = Exchange(provider=provider, model="local-model", system="0123456789", moderator=ContextTruncate())
+    exchange.add(Message.user("hi"))
+
+    exchange.generate()
+
+    # only the real request reached the provider
+    assert provider.calls == 1
+    assert exchange.moderator.system_prompt_token_count == CharacterRatioCounter(1.0).count_system("0123456789", ())
+
+
+def test_truncate_falls_back_to_provider():
+    provider = CountingProvider()
+    exchange = Exchange(provider=provider, model="some-unknown-model", system="system", moderator=ContextTruncate())
+    exchange.add(Message.user("hi"))
+
+    exchange.generate()
+
+    assert provider.calls == 2
+    assert exchange.moderator.system_prompt_token_count == 50
+
+
+class CountingEncoding:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, disallowed_special=()):
+        self.calls += 1
+        return text.split()
+
+
+def test_tokenizer_service_skips_encoding_short_texts():
+    encoding = CountingEncoding()
+    service = TokenizerService("test_encoding")
+    with patch("exchange.token_counter._load_encoding", return_value=encoding):
+        assert not service.exceeds("a few words", 100)
+        assert encoding.calls == 0
+        assert service.exceeds("word " * 200, 100)
+        assert not service.exceeds("word" * 200, 100)
+        assert encoding.calls == 2
+
+
+def test_tokenizer_service_encodes_a_prefix_of_long_texts():
+    encoded = []
+
+    class RecordingEncoding:
+        def encode(self, text, disallowed_special=()):
+            encoded.append(len(text))
+            return text.split()
+
+    service = TokenizerService("test_encoding")
+    with patch("exchange.token_counter._load_encoding", return_value=RecordingEncoding()):
+        assert service.exceeds("word " * 100_000, 100)
+        assert encoded == [799]
+        # a prefix within the limit doesn't settle it, so the whole text is encoded
+        assert service.exceeds("word " * 90 + "x" * 1000 + " word" * 20, 100)
+        assert encoded[-1] == 1550
+
+
+def test_tokenizer_service_caches_counts():
+    encoding = CountingEncoding()
+    service = TokenizerService("test_encoding", maxsize=2)
+    with patch("exchange.token_counter._load_encoding", return_value=encoding):
+        assert service.count("one two three") == 3
+        assert service.count("one two three") == 3
+        assert encoding.calls == 1
+        service.count("a")
+        service.count("b")
+        service.count("one two three")
+        assert encoding.calls == 4
+
+
+def test_tokenizer_service_estimates_without_encoding():
+    service = TokenizerService("test_encoding")
+    with patch("exchange.token_counter._load_encoding", return_value=None):
+        assert service.count("x" * 400) == 100
+        assert service.exceeds("x" * 400, 99)
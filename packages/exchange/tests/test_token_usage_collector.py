@@ -1,3 +1,4 @@
+from exchange.providers.base import Usage
 from exchange.token_usage_collector import _TokenUsageCollector
 
 
@@ -22,3 +23,15 @@ def test_collect_with_non_input_or_output_token(usage_factory):
     assert usage_collector.get_token_usage_group_by_model() == {
         "model1": usage_factory(100, 2000, 0),
     }
+
+
+def test_collect_cache_tokens():
+    usage_collector = _TokenUsageCollector()
+    usage_collector.collect("model1", Usage(100, 10, 110, cache_read_tokens=80, cache_write_tokens=20))
+    usage_collector.collect("model1", Usage(200, 10, 210, cache_read_tokens=100))
+    usage_collector.collect("model2", Usage(100, 10, 110))
+    usage = usage_collector.get_token_usage_group_by_model()
+    assert usage["model1"] == Usage(300, 20, 320, cache_read_tokens=180, cache_write_tokens=20)
+    # models without prompt caching don't report it
+    assert usage["model2"] == Usage(100, 10, 110)
+    assert repr(usage["model2"]) == "Usage(input_tokens=100, output_tokens=10, total_tokens=110)"
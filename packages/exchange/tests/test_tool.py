@@ -28,6 +28,7 @@ def test_load():
             "required": ["location"],
         },
         "function": get_current_weather,
+        "parallel_safe": True,
     }
 
     assert attrs.asdict(tool) == expected
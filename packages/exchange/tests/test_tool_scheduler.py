@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+from exchange.content import ToolResult, ToolUse
+from exchange.exchange import Exchange
+from exchange.message import Message
+from exchange.moderators import PassiveModerator
+from exchange.providers import Provider, Usage
+from exchange.tool import Tool
+from exchange.tool_scheduler import ToolScheduler
+
+
+def tool_uses(*names: str) -> list[ToolUse]:
+    return [ToolUse(id=str(i), name=name, parameters={}) for i, name in enumerate(names)]
+
+
+def test_batches_split_on_unsafe_tools():
+    scheduler = ToolScheduler()
+    uses = tool_uses("read", "read", "write", "read", "write", "write", "read")
+    batches = scheduler.batches(uses, lambda tool_use: tool_use.name != "write")
+    assert [[tool_use.id for tool_use in batch] for batch in batches] == [
+        ["0", "1"],
+        ["2"],
+        ["3"],
+        ["4"],
+        ["5"],
+        ["6"],
+    ]
+
+
+def test_run_preserves_order():
+    def call(tool_use: ToolUse) -> ToolResult:
+        # finish in the reverse order of the request
+        time.sleep(0.05 * (5 - int(tool_use.id)))
+        return ToolResult(tool_use_id=tool_use.id, output=tool_use.id)
+
+    results = ToolScheduler().run(tool_uses(*["read"] * 5), call=call, is_parallel_safe=lambda _: True)
+    assert [result.tool_use_id for result in results] == ["0", "1", "2", "3", "4"]
+
+
+def test_run_is_concurrent():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def call(tool_use: ToolUse) -> ToolResult:
+        # this only completes if all three tools are running at the same time
+        barrier.wait()
+        return ToolResult(tool_use_id=tool_use.id, output="ok")
+
+    results = ToolScheduler().run(tool_uses("a", "b", "c"), call=call, is_parallel_safe=lambda _: True)
+    assert [result.output for result in results] == ["ok", "ok", "ok"]
+
+
+def test_unsafe_tool_runs_alone():
+    running = []
+    overlapped = []
+    lock = threading.Lock()
+
+    def call(tool_use: ToolUse) -> ToolResult:
+        with lock:
+            if tool_use.name == "write" and running or any(name == "write" for name in running):
+                overlapped.append(tool_use.id)
+            running.append(tool_use.name)
+        time.sleep(0.05)
+        with lock:
+            running.remove(tool_use.name)
+        return ToolResult(tool_use_id=tool_use.id, output=tool_use.name)
+
+    uses = tool_uses("read", "read", "write", "read", "read")
+    results = ToolScheduler().run(uses, call=call, is_parallel_safe=lambda tool_use: tool_use.name != "write")
+    assert [result.output for result in results] == ["read", "read", "write", "read", "read"]
+    assert overlapped == []
+
+
+def test_max_workers_must_be_positive():
+    with pytest.raises(ValueError):
+        ToolScheduler(max_workers=0)
+
+
+class SingleToolTurnProvider(Provider):
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, model, system, messages, tools, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            content = [ToolUse(id=str(i), name="slow_tool", parameters={"delay": 0.2}) for i in range(4)]
+            return Message(role="assistant", content=content), Usage(10, 10, 20)
+        return Message.assistant("done"), Usage(10, 10, 20)
+
+
+def slow_tool(delay: float) -> str:
+    """Sleep for a while
+
+    Args:
+        delay (float): How long to sleep for
+    """
+    time.sleep(delay)
+    return "slept"
+
+
+def test_exchange_reply_runs_tools_concurrently():
+    ex = Exchange(
+        provider=SingleToolTurnProvider(),
+        model="gpt-4o-2024-05-13",
+        system="You are a helpful assistant.",
+        tools=[Tool.from_function(slow_tool)],
+        moderator=PassiveModerator(),
+    )
+    ex.add(Message.user("sleep four times"))
+
+    start = time.time()
+    ex.reply()
+    elapsed = time.time() - start
+
+    assert elapsed < 0.6
+    assert [result.tool_use_id for result in ex.messages[2].tool_result] == ["0", "1", "2", "3"]
+
+
+def test_exchange_reply_serializes_unsafe_tools():
+    ex = Exchange(
+        provider=SingleToolTurnProvider(),
+        model="gpt-4o-2024-05-13",
+        system="You are a helpful assistant.",
+        tools=[Tool.from_function(slow_tool, parallel_safe=False)],
+        moderator=PassiveModerator(),
+    )
+    ex.add(Message.user("sleep four times"))
+
+    start = time.time()
+    ex.reply()
+    elapsed = time.time() - start
+
+    assert elapsed >= 0.8
+    assert [result.tool_use_id for result in ex.messages[2].tool_result] == ["0", "1", "2", "3"]
@@ -1,6 +1,7 @@
 import pytest
 from exchange import utils
 from unittest.mock import patch
+from exchange.plugins import PluginRegistry
 from exchange.message import Message
 from exchange.content import Text, ToolResult
 from exchange.providers.utils import messages_to_openai_spec, encode_image
@@ -123,3 +124,28 @@ def test_messages_to_openai_spec():
 
     assert "This tool result included an image that is uploaded in the next message." in str(output)
     assert "{'role': 'user', 'content': [{'type': 'image_url'" in str(output)
+
+
+def test_plugin_registry_loads_plugins_when_looked_up() -> None:
+    class DummyEntryPoint:
+        def __init__(self, name, plugin):
+            self.name = name
+            self.plugin = plugin
+            self.loads = 0
+
+        def load(self):
+            self.loads += 1
+            return self.plugin
+
+    first, second = DummyEntryPoint("plugin1", object()), DummyEntryPoint("plugin2", object())
+    with patch("exchange.plugins.entry_points", return_value=[first, second]):
+        registry = PluginRegistry("dummy_group")
+
+        assert "plugin1" in registry
+        assert "missing" not in registry
+        assert list(registry) == ["plugin1", "plugin2"]
+        assert first.loads == second.loads == 0
+
+        assert registry["plugin1"] is first.plugin
+        assert registry["plugin1"] is first.plugin
+        assert (first.loads, second.loads) == (1, 0)
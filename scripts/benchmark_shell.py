@@ -0,0 +1,37 @@
+"""Measure the CPU time goose spends waiting on shell commands
+
+Usage: uv run python scripts/benchmark_shell.py [seconds]
+
+For each command this reports the CPU time used by the goose process for every second the
+command runs. A loop which waits on the output without blocking shows up close to 1.0.
+"""
+
+import sys
+import time
+from unittest.mock import MagicMock
+
+from goose.utils.shell import shell
+
+
+def measure(command: str) -> tuple[float, float]:
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    shell(command, MagicMock(), MagicMock())
+    return time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    commands = {
+        "quiet": f"sleep {seconds}",
+        "line per 10ms": f"for i in $(seq {int(seconds * 100)}); do echo line $i; sleep 0.01; done",
+        "bulk output": f"yes 'some output' | head -c {int(seconds * 10_000_000)}",
+    }
+    print(f"{'command':<16}{'wall (s)':>10}{'cpu (s)':>10}{'cpu/s':>10}")
+    for name, command in commands.items():
+        cpu, wall = measure(command)
+        print(f"{name:<16}{wall:>10.2f}{cpu:>10.3f}{cpu / wall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Measure how long goose takes to start
+
+Usage: uv run python scripts/benchmark_startup.py [runs]
+
+Each command runs in a fresh process with an empty home directory, so that nothing is cached
+between runs other than by the operating system. Session start is measured up to the point where
+goose would prompt for the first message. A dummy OpenAI key lets the exchange be built offline.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+START_SESSION = """
+from unittest.mock import patch
+from goose.cli.prompt.goose_prompt_session import GoosePromptSession
+from goose.cli.prompt.user_input import PromptAction, UserInput
+from goose.cli.session import Session
+
+with patch.object(GoosePromptSession, "get_user_input", return_value=UserInput(action=PromptAction.EXIT)):
+    Session(name="benchmark").run()
+"""
+
+COMMANDS = {
+    "goose --help": [sys.executable, "-m", "goose.cli.main", "--help"],
+    "goose session list": [sys.executable, "-m", "goose.cli.main", "session", "list"],
+    "goose session start": [sys.executable, "-c", START_SESSION],
+}
+
+
+def measure(command: list[str], home: str) -> float:
+    env = {**os.environ, "HOME": home, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark")}
+    start = time.perf_counter()
+    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'command':<22}{'median (s)':>12}{'min (s)':>10}")
+    with tempfile.TemporaryDirectory() as home:
+        for name, command in COMMANDS.items():
+            # the first run writes the default profile and warms the filesystem cache
+            measure(command, home)
+            times = [measure(command, home) for _ in range(runs)]
+            print(f"{name:<22}{statistics.median(times):>12.3f}{min(times):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 from itertools import chain
+from pathlib import Path
+from typing import Optional
 
+import httpx
 from exchange import Exchange, Message
 from exchange.moderators import get_moderator
-from exchange.providers import get_provider
+from exchange.providers import Provider, get_provider
+from exchange.providers.base import MissingProviderEnvVariableError
+from exchange.providers.caching import CachingProvider, ResponseCache
+from exchange.providers.rate_limit import RateLimitGovernor, install_governor
 
+from goose.cli.config import RESPONSE_CACHE_PATH
 from goose.notifier import Notifier
-from goose.profile import Profile
+from goose.profile import CacheSpec, Profile, RateLimitSpec
 from goose.toolkit import get_toolkit
 from goose.toolkit.base import Requirements
 from goose.view import ExchangeView
@@ -22,7 +29,7 @@ def build_exchange(profile: Profile, notifier: Notifier) -> Exchange:
         notifier (Notifier): A notifier instance used by tools to send info
     """
 
-    provider = get_provider(profile.provider).from_env()
+    provider = _build_provider(profile.provider, profile.cache, profile.rate_limit or RateLimitSpec())
 
     # Support instantating toolkits in *two* passes for now, no further nesting
     concrete_toolkits = {}
@@ -63,3 +70,35 @@ def build_exchange(profile: Profile, notifier: Notifier) -> Exchange:
         toolkit.exchange_view = ExchangeView(profile.processor, profile.accelerator, exchange)
 
     return exchange
+
+
+def _build_provider(name: str, cache: Optional[CacheSpec], rate_limit: RateLimitSpec) -> Provider:
+    """Build the provider, pacing its requests and wrapped in a response cache if the profile configures one"""
+    if cache is None or cache.mode == "off":
+        return _limit_rate(get_provider(name).from_env(), rate_limit)
+
+    try:
+        provider = _limit_rate(get_provider(name).from_env(), rate_limit)
+    except MissingProviderEnvVariableError:
+        # replaying recorded responses works offline, without credentials for the provider
+        if cache.mode != "replay":
+            raise
+        provider = None
+
+    path = Path(cache.path).expanduser() if cache.path else RESPONSE_CACHE_PATH.joinpath(name)
+    store = ResponseCache(path, max_size=cache.max_size_mb * 1024 * 1024, ttl=cache.ttl)
+    return CachingProvider(provider, store, mode=cache.mode)
+
+
+def _limit_rate(provider: Provider, rate_limit: RateLimitSpec) -> Provider:
+    """Send the provider's requests through one governor, which every exchange using the provider shares"""
+    client = getattr(provider, "client", None)
+    if isinstance(client, httpx.Client):
+        governor = RateLimitGovernor(
+            requests_per_minute=rate_limit.requests_per_minute,
+            tokens_per_minute=rate_limit.tokens_per_minute,
+            max_concurrency=rate_limit.max_concurrency,
+            models=rate_limit.models,
+        )
+        install_governor(client, governor)
+    return provider
@@ -1,3 +1,7 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import cache
 from pathlib import Path
 from typing import Mapping, Optional
@@ -6,22 +10,27 @@ from rich import print
 from rich.panel import Panel
 from ruamel.yaml import YAML
 
-from exchange.providers.ollama import OLLAMA_MODEL
+from exchange.plugins import plugin_registry
 
 from goose.profile import Profile
-from goose.utils import load_plugins
 
 GOOSE_GLOBAL_PATH = Path("~/.config/goose").expanduser()
 PROFILES_CONFIG_PATH = GOOSE_GLOBAL_PATH.joinpath("profiles.yaml")
 SESSIONS_PATH = GOOSE_GLOBAL_PATH.joinpath("sessions")
 SESSION_FILE_SUFFIX = ".jsonl"
 LOG_PATH = GOOSE_GLOBAL_PATH.joinpath("logs")
+RESPONSE_CACHE_PATH = GOOSE_GLOBAL_PATH.joinpath("cache", "responses")
+PROVIDER_CACHE_PATH = GOOSE_GLOBAL_PATH.joinpath("cache", "provider.json")
 RECOMMENDED_DEFAULT_PROVIDER = "openai"
+# how long a detected provider is trusted, unless the provider env variables change first
+PROVIDER_CACHE_TTL = 60 * 60 * 24
+# how long a health check may take, for the providers which need one
+PROVIDER_PROBE_TIMEOUT = 0.5
 
 
 @cache
 def default_profiles() -> Mapping[str, callable]:
-    return load_plugins(group="goose.profile")
+    return plugin_registry("goose.profile")
 
 
 def session_path(name: str) -> Path:
@@ -44,6 +53,13 @@ def ensure_config(name: Optional[str]) -> tuple[str, Profile]:
     # but this is complicated a bit by autodetecting the provider
     default_profile_name = "default"
     name = name or default_profile_name
+
+    # an existing profile already names its provider, so there is nothing to detect
+    if PROFILES_CONFIG_PATH.exists():
+        profiles = read_config()
+        if name in profiles:
+            return (name, profiles[name])
+
     default_profiles_dict = default_profiles()
     provider, processor, accelerator = default_model_configuration()
     default_profile = default_profiles_dict.get(name, default_profiles_dict[default_profile_name])(
@@ -61,9 +77,6 @@ def ensure_config(name: Optional[str]) -> tuple[str, Profile]:
         write_config({name: default_profile})
         return (name, default_profile)
 
-    profiles = read_config()
-    if name in profiles:
-        return (name, profiles[name])
     print(Panel(f"[yellow]Your configuration doesn't have a profile named '{name}', adding one now[/yellow]"))
     profiles.update({name: default_profile})
     write_config(profiles)
@@ -80,16 +93,80 @@ def read_config() -> dict[str, Profile]:
     return {name: Profile(**profile) for name, profile in data.items()}
 
 
-def default_model_configuration() -> tuple[str, str, str]:
-    providers = load_plugins(group="exchange.provider")
-    for provider, cls in providers.items():
+def _provider_env_vars() -> list[str]:
+    """The env variables which decide which provider is detected, which imports every provider"""
+    variables = {"OLLAMA_HOST"}
+    for name in plugin_registry("exchange.provider"):
         try:
-            cls.from_env()
-            break
+            variables.update(plugin_registry("exchange.provider")[name].REQUIRED_ENV_VARS)
         except Exception:
             pass
-    else:
-        provider = RECOMMENDED_DEFAULT_PROVIDER
+    return sorted(variables)
+
+
+def _is_available(name: str, timeout: float) -> bool:
+    try:
+        return plugin_registry("exchange.provider")[name].is_available(timeout)
+    except Exception:
+        return False
+
+
+def _is_health_checked(name: str) -> bool:
+    """Whether the provider is judged by a health check, which may pass later, rather than by env variables"""
+    try:
+        return not plugin_registry("exchange.provider")[name].REQUIRED_ENV_VARS
+    except Exception:
+        return False
+
+
+def detect_provider(timeout: float = PROVIDER_PROBE_TIMEOUT) -> Optional[str]:
+    """The first installed provider which looks usable, or None if there is none
+
+    The providers are judged by their env variables, apart from those which need no credentials
+    which get a health check. The checks run at once and give up after the timeout. The result is
+    cached for a day, or until the provider env variables or installed providers change, unless
+    a provider before it failed its health check, as that one may be started at any moment.
+    """
+    # the names of the providers come from the package metadata, so checking the cache imports none of them
+    names = list(plugin_registry("exchange.provider"))
+    try:
+        cached = json.loads(PROVIDER_CACHE_PATH.read_text())
+        if (
+            time.time() - cached["detected_at"] < PROVIDER_CACHE_TTL
+            and cached["providers"] == names
+            and {variable: variable in os.environ for variable in cached["environment"]} == cached["environment"]
+        ):
+            return cached["provider"]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    environment = {variable: variable in os.environ for variable in _provider_env_vars()}
+
+    executor = ThreadPoolExecutor(max_workers=len(names) or 1)
+    checks = [executor.submit(_is_available, name, timeout) for name in names]
+    # the first provider in order wins, without waiting on the health checks of those after it
+    provider = next((name for name, check in zip(names, checks) if check.result()), None)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    passed_over = names[: names.index(provider)] if provider is not None else names
+    if any(_is_health_checked(name) for name in passed_over):
+        return provider
+
+    record = dict(provider=provider, providers=names, environment=environment, detected_at=time.time())
+    try:
+        PROVIDER_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        temporary = PROVIDER_CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_text(json.dumps(record))
+        os.replace(temporary, PROVIDER_CACHE_PATH)
+    except OSError:
+        pass
+    return provider
+
+
+def default_model_configuration() -> tuple[str, str, str]:
+    from exchange.providers.ollama import OLLAMA_MODEL
+
+    provider = detect_provider() or RECOMMENDED_DEFAULT_PROVIDER
     recommended = {
         "ollama": (OLLAMA_MODEL, OLLAMA_MODEL),
         "openai": ("gpt-4o", "gpt-4o-mini"),
@@ -7,12 +7,10 @@ import click
 from rich import print
 from ruamel.yaml import YAML
 
-from goose.cli.config import SESSIONS_PATH
-from goose.cli.session import Session
-from goose.toolkit.utils import render_template, parse_plan
+from goose.cli.config import SESSION_FILE_SUFFIX, SESSIONS_PATH
 from goose.utils import load_plugins
 from goose.utils.autocomplete import SUPPORTED_SHELLS, setup_autocomplete
-from goose.utils.session_file import list_sorted_session_files
+from goose.utils.session_index import SessionIndex
 
 LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
 LOG_CHOICE = click.Choice(LOG_LEVELS)
@@ -123,15 +121,13 @@ def list_providers() -> None:
 
 
 def autocomplete_session_files(ctx: click.Context, args: str, incomplete: str) -> None:
-    return [
-        f"{session_name}"
-        for session_name in sorted(get_session_files().keys(), reverse=True, key=lambda x: x.lower())
-        if session_name.startswith(incomplete)
-    ]
+    return sorted(
+        (entry.name for entry in get_session_index().entries(prefix=incomplete)), reverse=True, key=lambda x: x.lower()
+    )
 
 
-def get_session_files() -> dict[str, Path]:
-    return list_sorted_session_files(SESSIONS_PATH)
+def get_session_index() -> SessionIndex:
+    return SessionIndex(SESSIONS_PATH)
 
 
 @session.command(name="start")
@@ -144,6 +140,8 @@ def session_start(
     name: Optional[str], profile: str, log_level: str, plan: Optional[str] = None, tracing: bool = False
 ) -> None:
     """Start a new goose session"""
+    from goose.cli.session import Session
+
     if plan:
         yaml = YAML()
         with open(plan, "r") as f:
@@ -174,6 +172,9 @@ def parse_args(ctx: click.Context, param: click.Parameter, value: str) -> dict[s
 @click.option("--log-level", type=LOG_CHOICE, default="INFO")
 @click.option("-a", "--args", callback=parse_args, help="Args in the format arg1:value1,arg2:value2")
 def session_planned(plan: str, log_level: str, args: Optional[dict[str, str]]) -> None:
+    from goose.cli.session import Session
+    from goose.toolkit.utils import parse_plan, render_template
+
     plan_templated = render_template(Path(plan), context=args)
     _plan = parse_plan(plan_templated)
     session = Session(plan=_plan, log_level=log_level)
@@ -186,16 +187,18 @@ def session_planned(plan: str, log_level: str, args: Optional[dict[str, str]]) -
 @click.option("--log-level", type=LOG_CHOICE, default="INFO")
 def session_resume(name: Optional[str], profile: str, log_level: str) -> None:
     """Resume an existing goose session"""
-    session_files = get_session_files()
+    from goose.cli.session import Session
+
     if name is None:
-        if session_files:
-            name = list(session_files.keys())[0]
-            print(f"Resuming most recent session: {name} from {session_files[name]}")
+        latest = get_session_index().latest()
+        if latest is not None:
+            name = latest.name
+            print(f"Resuming most recent session: {name} from {latest.path}")
         else:
             print("No sessions found.")
             return
     else:
-        if name in session_files:
+        if SESSIONS_PATH.joinpath(f"{name}{SESSION_FILE_SUFFIX}").is_file():
             print(f"Resuming session: {name}")
         else:
             print(f"Creating new session: {name}")
@@ -210,6 +213,9 @@ def session_resume(name: Optional[str], profile: str, log_level: str) -> None:
 @click.option("--resume-session", is_flag=True, help="Resume the last session if available")
 def run(message_file: Optional[str], profile: str, log_level: str, resume_session: bool = False) -> None:
     """Run a single-pass session with a message from a markdown input file"""
+    # the session brings in the exchange, providers and prompt, which the other commands don't need
+    from goose.cli.session import Session
+
     if message_file:
         with open(message_file, "r") as f:
             initial_message = f.read()
@@ -217,10 +223,9 @@ def run(message_file: Optional[str], profile: str, log_level: str, resume_sessio
         initial_message = click.get_text_stream("stdin").read()
 
     if resume_session:
-        session_files = get_session_files()
-        if session_files:
-            name = list(session_files.keys())[0]
-            session = Session(name=name, profile=profile, log_level=log_level)
+        latest = get_session_index().latest()
+        if latest is not None:
+            session = Session(name=latest.name, profile=profile, log_level=log_level)
     else:
         session = Session(profile=profile, log_level=log_level)
     session.single_pass(initial_message=initial_message)
@@ -229,18 +234,16 @@ def run(message_file: Optional[str], profile: str, log_level: str, resume_sessio
 @session.command(name="list")
 def session_list() -> None:
     """List goose sessions"""
-    session_files = get_session_files().items()
-    for session_name, session_file in session_files:
-        print(f"{datetime.fromtimestamp(session_file.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')}    {session_name}")
+    for entry in get_session_index().entries():
+        print(f"{datetime.fromtimestamp(entry.mtime).strftime('%Y-%m-%d %H:%M:%S')}    {entry.name}")
 
 
 @session.command(name="clear")
 @click.option("--keep", default=3, help="Keep this many entries, default 3")
 def session_clear(keep: int) -> None:
     """Delete old goose sessions, keeping the most recent sessions up to the specified number"""
-    for i, (_, session_file) in enumerate(get_session_files().items()):
-        if i >= keep:
-            session_file.unlink()
+    index = get_session_index()
+    index.remove([entry.name for entry in index.entries()[keep:]])
 
 
 @click.group(
@@ -1,11 +1,14 @@
-import logging
+import time
 import traceback
 from pathlib import Path
 from typing import Optional
 
-from langfuse.decorators import langfuse_context
 from exchange import Message, Text, ToolResult, ToolUse
-from exchange.langfuse_wrapper import observe_wrapper, auth_check
+from exchange.langfuse_wrapper import enable_tracing, observe_wrapper
+from exchange.moderators.summarizer import ContextSummarizer
+from exchange.moderators.truncate import ContextTruncate
+from exchange.providers.streaming import StreamDelta, TextDelta
+from exchange.token_counter import get_tokenizer_service
 from rich import print
 from rich.markdown import Markdown
 from rich.panel import Panel
@@ -13,38 +16,42 @@ from rich.prompt import Prompt
 from rich.status import Status
 
 from goose._logger import get_logger, setup_logging
-from goose.cli.config import LOG_PATH, ensure_config, session_path
+from goose.cli.config import LOG_PATH, detect_provider, ensure_config, session_path
 from goose.cli.prompt.goose_prompt_session import GoosePromptSession
 from goose.cli.prompt.overwrite_session_prompt import OverwriteSessionPrompt
 from goose.cli.session_notifier import SessionNotifier
 from goose.profile import Profile
-from goose.utils import droid, load_plugins
+from goose.utils import droid
 from goose.utils._cost_calculator import get_total_cost_message
 from goose.utils._create_exchange import create_exchange
-from goose.utils.session_file import is_empty_session, is_existing_session, read_or_create_file, log_messages
+from goose.utils.session_file import (
+    is_empty_session,
+    is_existing_session,
+    log_messages,
+    read_or_create_file,
+    read_tail,
+)
 
 RESUME_MESSAGE = "I see we were interrupted. How can I help you?"
 
+# re-rendering the markdown gets slower as a streamed reply grows, so we limit how often it happens
+STREAM_RENDER_INTERVAL = 0.1
+
 
 def load_provider() -> str:
     # We try to infer a provider, by going in order of what will auth
-    providers = load_plugins(group="exchange.provider")
-    for provider, cls in providers.items():
-        try:
-            cls.from_env()
-            print(Panel(f"[green]Detected an available provider: [/]{provider}"))
-            return provider
-        except Exception:
-            pass
-    else:
-        # TODO link to auth docs
-        print(
-            Panel(
-                "[red]Could not authenticate any providers[/]\n"
-                + "Returning a default pointing to openai, but you will need to set an API token env variable."
-            )
+    provider = detect_provider()
+    if provider is not None:
+        print(Panel(f"[green]Detected an available provider: [/]{provider}"))
+        return provider
+    # TODO link to auth docs
+    print(
+        Panel(
+            "[red]Could not authenticate any providers[/]\n"
+            + "Returning a default pointing to openai, but you will need to set an API token env variable."
         )
-        return "openai"
+    )
+    return "openai"
 
 
 def load_profile(name: Optional[str]) -> Profile:
@@ -76,19 +83,17 @@ class Session:
         self.prompt_session = GoosePromptSession()
         self.status_indicator = Status("", spinner="dots")
         self.notifier = SessionNotifier(self.status_indicator)
-        if not tracing:
-            logging.getLogger("langfuse").setLevel(logging.ERROR)
-        else:
-            langfuse_auth = auth_check()
-            if langfuse_auth:
+        if tracing:
+            if enable_tracing():
                 print("Local Langfuse initialized. View your traces at http://localhost:3000")
             else:
                 raise RuntimeError(
                     "You passed --tracing, but a Langfuse object was not found in the current context. "
                     "Please initialize the local Langfuse server and restart Goose."
                 )
-        langfuse_context.configure(enabled=tracing)
 
+        # load the tokenizer while the exchange is built, it is needed once tools start to run
+        get_tokenizer_service().warm_up()
         self.exchange = create_exchange(profile=load_profile(profile), notifier=self.notifier)
         setup_logging(log_file_directory=LOG_PATH, log_level=log_level)
 
@@ -204,29 +209,19 @@ class Session:
         """Reply to the last user message, calling tools as needed"""
         # These are the *raw* messages, before the moderator rewrites things
         committed = [self.exchange.messages[-1]]
+        tokens_before = self._tokens_used()
 
         try:
-            self.status_indicator.update("responding")
-            response = self.exchange.generate()
+            response = self.generate()
             committed.append(response)
 
-            if response.text:
-                print(Markdown(response.text))
-
             while response.tool_use:
-                content = []
-                for tool_use in response.tool_use:
-                    tool_result = self.exchange.call_function(tool_use)
-                    content.append(tool_result)
+                content = self.exchange.call_functions(response.tool_use)
                 message = Message(role="user", content=content)
                 committed.append(message)
                 self.exchange.add(message)
-                self.status_indicator.update("responding")
-                response = self.exchange.generate()
+                response = self.generate()
                 committed.append(response)
-
-                if response.text:
-                    print(Markdown(response.text))
         except KeyboardInterrupt:
             # The interrupt reply modifies the message history,
             # and we sync those changes to committed
@@ -234,7 +229,33 @@ class Session:
 
         # we log the committed messages only once the reply completes
         # this prevents messages related to uncaught errors from being recorded
-        log_messages(self.session_file_path, committed)
+        input_tokens, output_tokens = (after - before for after, before in zip(self._tokens_used(), tokens_before))
+        log_messages(self.session_file_path, committed, input_tokens, output_tokens, self.exchange.model)
+
+    def generate(self) -> Message:
+        """Generate the next message, previewing its text as it is streamed"""
+        self.status_indicator.update("responding")
+        text = []
+        last_render = 0.0
+
+        def on_delta(delta: StreamDelta) -> None:
+            nonlocal last_render
+            if not isinstance(delta, TextDelta):
+                return
+            text.append(delta.text)
+            now = time.monotonic()
+            if now - last_render >= STREAM_RENDER_INTERVAL:
+                self.notifier.preview(Markdown("".join(text)))
+                last_render = now
+
+        try:
+            response = self.exchange.generate(on_delta=on_delta)
+        finally:
+            self.notifier.preview(None)
+
+        if response.text:
+            print(Markdown(response.text))
+        return response
 
     def interrupt_reply(self, committed: list[Message]) -> None:
         """Recover from an interruption at an arbitrary state"""
@@ -276,8 +297,20 @@ class Session:
         return session_path(self.name)
 
     def load_session(self) -> list[Message]:
+        # a truncating moderator drops whatever does not fit in its budget, so only the tail which fits
+        # is loaded and the earlier history stays on disk. a summarizer needs the earlier history to summarize
+        moderator = self.exchange.moderator
+        truncates = isinstance(moderator, ContextTruncate) and not isinstance(moderator, ContextSummarizer)
+        if truncates and self.session_file_path.exists():
+            messages = read_tail(self.session_file_path, moderator.max_tokens)
+            return messages
         return read_or_create_file(self.session_file_path)
 
+    def _tokens_used(self) -> tuple[int, int]:
+        """The input and output tokens used by the model of the exchange so far"""
+        usage = self.exchange.get_token_usage().get(self.exchange.model)
+        return (usage.input_tokens, usage.output_tokens) if usage else (0, 0)
+
     def _log_cost(self) -> None:
         get_logger().info(get_total_cost_message(self.exchange.get_token_usage()))
         print(f"[dim]you can view the cost and token usage in the log directory {LOG_PATH}[/]")
@@ -1,6 +1,8 @@
+from typing import Optional
+
 from rich.status import Status
 from rich.live import Live
-from rich.console import RenderableType
+from rich.console import Group, RenderableType
 from rich import print
 
 from goose.notifier import Notifier
@@ -22,3 +24,13 @@ class SessionNotifier(Notifier):
 
     def stop(self) -> None:
         self.live.stop()
+
+    def preview(self, content: Optional[RenderableType]) -> None:
+        """Show content above the status while it is still being generated, or clear it with None
+
+        The live display is transient, so the final content should be logged once complete.
+        """
+        if content is None:
+            self.live.update(self.status_indicator)
+        else:
+            self.live.update(Group(content, self.status_indicator))
@@ -1,14 +1,16 @@
 from functools import cache
+from typing import Mapping
+
+from exchange.plugins import plugin_registry
 
 from goose.command.base import Command
-from goose.utils import load_plugins
 
 
 @cache
 def get_command(name: str) -> type[Command]:
-    return load_plugins(group="goose.command")[name]
+    return plugin_registry("goose.command")[name]
 
 
 @cache
-def get_commands() -> dict[str, type[Command]]:
-    return load_plugins(group="goose.command")
+def get_commands() -> Mapping[str, type[Command]]:
+    return plugin_registry("goose.command")
@@ -1,6 +1,8 @@
-from typing import Mapping
+from typing import Mapping, Optional
 
 from attrs import asdict, define, field
+from exchange.providers.caching import CACHE_MODES
+from exchange.providers.rate_limit import DEFAULT_MAX_CONCURRENCY
 
 from goose.utils import ensure_list
 
@@ -13,6 +15,52 @@ class ToolkitSpec:
     requires: Mapping[str, str] = field(factory=dict)
 
 
+@define
+class CacheSpec:
+    """Configuration for caching the provider's responses on disk
+
+    The ttl is in seconds and the maximum size in megabytes, the path defaults to
+    a directory under the goose config.
+    """
+
+    mode: str = field(default="read_write")
+    path: Optional[str] = field(default=None)
+    ttl: Optional[float] = field(default=7 * 24 * 60 * 60)
+    max_size_mb: int = field(default=512)
+
+    @mode.validator
+    def check_mode(self, _: type["CacheSpec"], mode: str) -> None:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode {mode}, expected one of {', '.join(CACHE_MODES)}")
+
+
+@define
+class RateLimitSpec:
+    """Configuration for pacing the requests to the provider
+
+    The limits apply to each model, and can be set for a model under models, for example
+    models: {gpt-4o: {requests_per_minute: 500, tokens_per_minute: 30000}}. Whatever is not set is
+    left to the rate limit headers of the provider.
+    """
+
+    requests_per_minute: Optional[float] = field(default=None)
+    tokens_per_minute: Optional[float] = field(default=None)
+    max_concurrency: int = field(default=DEFAULT_MAX_CONCURRENCY)
+    models: Mapping[str, Mapping[str, float]] = field(factory=dict)
+
+
+def _rate_limit_spec(value: Optional[Mapping[str, any]]) -> Optional[RateLimitSpec]:
+    if value is None or isinstance(value, RateLimitSpec):
+        return value
+    return RateLimitSpec(**value)
+
+
+def _cache_spec(value: Optional[Mapping[str, any]]) -> Optional[CacheSpec]:
+    if value is None or isinstance(value, CacheSpec):
+        return value
+    return CacheSpec(**value)
+
+
 @define
 class Profile:
     """The configuration for a run of goose"""
@@ -22,6 +70,8 @@ class Profile:
     accelerator: str
     moderator: str
     toolkits: list[ToolkitSpec] = field(factory=list, converter=ensure_list(ToolkitSpec))
+    cache: Optional[CacheSpec] = field(default=None, converter=_cache_spec)
+    rate_limit: Optional[RateLimitSpec] = field(default=None, converter=_rate_limit_spec)
 
     @toolkits.validator
     def check_toolkit_requirements(self, _: type["ToolkitSpec"], toolkits: list[ToolkitSpec]) -> None:
@@ -37,7 +87,11 @@ class Profile:
                     raise ValueError(msg)
 
     def to_dict(self) -> dict[str, any]:
-        return asdict(self)
+        # leave out the cache and rate limit unless they are configured, to keep the written profiles minimal
+        return asdict(
+            self,
+            filter=lambda attribute, value: not (attribute.name in ("cache", "rate_limit") and value is None),
+        )
 
     def profile_info(self) -> str:
         tookit_names = [toolkit.name for toolkit in self.toolkits]
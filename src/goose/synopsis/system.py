@@ -1,16 +1,19 @@
 import json
-from tiktoken import get_encoding
 from exchange import Message
 import subprocess
 import os
 import atexit
 import platform
+import threading
 from pathlib import Path
-from typing import Dict, Iterable, List, Set
+from typing import Dict, Iterable, List, Optional, Set
 
 from attrs import define, field
 from exchange.content import ToolUse
+from exchange.token_counter import get_tokenizer_service
 from goose.toolkit.utils import get_language
+from goose.utils.output_capture import READ_BYTES, OutputRingBuffer
+from goose.utils.stuck_detector import PROC_PATH, process_tree, read_process_sample
 
 
 @define
@@ -28,6 +31,83 @@ class File:
 ```"""
 
 
+def _cut_at_boundary(data: bytes) -> bytes:
+    """Cut output back to its last whole line, or else to its last whole utf-8 character"""
+    if (newline := data.rfind(b"\n")) >= 0:
+        return data[: newline + 1]
+    for cut in range(len(data), max(len(data) - 4, 0), -1):
+        try:
+            data[:cut].decode("utf-8")
+            return data[:cut]
+        except UnicodeDecodeError:
+            pass
+    return data
+
+
+@define
+class BackgroundProcess:
+    """A background process, with its output drained into a ring buffer by a reader thread
+
+    Draining the pipe as output arrives keeps a chatty process from filling the pipe and blocking.
+    """
+
+    process: subprocess.Popen
+    output: OutputRingBuffer = field(factory=OutputRingBuffer)
+    read_offset: int = 0
+    _reader: Optional[threading.Thread] = field(init=False, default=None)
+
+    def __attrs_post_init__(self) -> None:
+        self._reader = threading.Thread(target=self._drain, daemon=True)
+        self._reader.start()
+
+    def _drain(self) -> None:
+        try:
+            while data := os.read(self.process.stdout.fileno(), 65536):
+                self.output.write(data)
+        except (OSError, ValueError):
+            # the pipe was closed under us
+            pass
+
+    def read_new(self) -> str:
+        """The output since the last read, up to READ_BYTES of it with the rest left for the next read"""
+        data, end, lost = self.output.read(self.read_offset, READ_BYTES)
+        start = end - len(data)
+        if len(data) == READ_BYTES:
+            data = _cut_at_boundary(data)
+        self.read_offset = start + len(data)
+        text = data.decode("utf-8", errors="replace")
+        if lost:
+            text = f"[{lost} bytes of earlier output were dropped]\n{text}"
+        if (remaining := self.output.end - self.read_offset) > 0:
+            text += f"[{remaining} more bytes of output, view the output again to read on]\n"
+        return text
+
+    def tail(self, lines: int) -> str:
+        """The last lines of output, from at most the last READ_BYTES of it"""
+        self.read_offset = self.output.end
+        data = self.output.tail(READ_BYTES)
+        if self.output.end > len(data):
+            # the first line is likely cut, so it only stays when there is nothing after it
+            newline = data.find(b"\n")
+            if 0 <= newline < len(data) - 1:
+                data = data[newline + 1 :]
+        text = data.decode("utf-8", errors="replace")
+        return "".join(text.splitlines(keepends=True)[-lines:])
+
+    def usage(self) -> Optional[str]:
+        """Summarize the state, CPU time and memory of the process and its children, from /proc"""
+        if self.process.poll() is not None:
+            return f"exited with returncode {self.process.returncode}"
+        if not PROC_PATH.exists():
+            return None
+        samples = [sample for pid in process_tree(self.process.pid) if (sample := read_process_sample(pid))]
+        if not samples:
+            return None
+        cpu_seconds = sum(sample.cpu_ticks for sample in samples) / os.sysconf("SC_CLK_TCK")
+        rss_mib = sum(sample.rss_bytes for sample in samples) / 2**20
+        return f"running, cpu {cpu_seconds:.1f}s, rss {rss_mib:.1f} MiB"
+
+
 @define
 class OperatingSystem:
     """
@@ -38,7 +118,7 @@ class OperatingSystem:
     platform: str = platform.system()
     env: Dict[str, str] = os.environ.copy()
     _active_files: Set[str] = field(init=False, factory=set)
-    _processes: Dict[int, subprocess.Popen] = field(init=False, factory=dict)
+    _processes: Dict[int, BackgroundProcess] = field(init=False, factory=dict)
 
     def __attrs_post_init__(self) -> None:
         atexit.register(self._cleanup_processes)
@@ -51,30 +131,30 @@ class OperatingSystem:
     def add_process(self, process: subprocess.Popen) -> int:
         """Add a new background process and return its assigned ID."""
         process_id = process.pid
-        os.set_blocking(process.stdout.fileno(), False)
-        self._processes[process_id] = process
+        self._processes[process_id] = BackgroundProcess(process)
         return process_id
 
     def get_processes(self) -> Dict[int, str]:
-        """List all background processes with their IDs and commands."""
-        return {pid: str(proc.args) for pid, proc in self._processes.items()}
-
-    def view_process_output(self, process_id: int) -> str:
-        """View the output of a running background process."""
-        if not (process := self._processes.get(process_id)):
+        """List all background processes with their IDs and commands, with their CPU and memory where known."""
+        processes = {}
+        for pid, background in self._processes.items():
+            usage = background.usage()
+            processes[pid] = f"{background.process.args} ({usage})" if usage else str(background.process.args)
+        return processes
+
+    def view_process_output(self, process_id: int, tail: int = 0) -> str:
+        """View the output of a background process since the last view, or its last tail lines."""
+        if not (background := self._processes.get(process_id)):
             raise ValueError(f"No process found with ID: {process_id}")
-
-        output = []
-        while line := process.stdout.readline():
-            output.append(line)
-
-        return "".join(output)
+        if tail > 0:
+            return background.tail(tail)
+        return background.read_new()
 
     def cancel_process(self, process_id: int) -> bool:
         """Cancel the background process with the specified ID."""
-        process = self._processes.pop(process_id, None)
-        if process:
-            process.terminate()
+        background = self._processes.pop(process_id, None)
+        if background:
+            background.process.terminate()
             return True
         return False
 
@@ -103,9 +183,7 @@ class OperatingSystem:
 
         max_output_chars = 2**20
         max_output_tokens = 16000
-        encoder = get_encoding("cl100k_base")
-
-        if len(content) > max_output_chars or len(encoder.encode(content)) > max_output_tokens:
+        if len(content) > max_output_chars or get_tokenizer_service().exceeds(content, max_output_tokens):
             raise ValueError(f"The file at {path} is too large to read directly!")
 
         self._active_files.add(path)
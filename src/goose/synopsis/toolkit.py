@@ -8,7 +8,8 @@ from exchange import Message
 from goose.synopsis.system import system
 from goose.toolkit.base import Toolkit, tool
 from goose.toolkit.utils import RULEPREFIX, RULESTYLE, get_language
-from goose.utils.shell import is_dangerous_command, shell, keep_unsafe_command_prompt
+from goose.utils.shell import confirm_unsafe_command, is_dangerous_command, shell
+from goose.utils.shell_session import session_from_env
 from rich.markdown import Markdown
 from rich.rule import Rule
 
@@ -18,6 +19,7 @@ class SynopsisDeveloper(Toolkit):
 
     def __init__(self, *args: object, **kwargs: Dict[str, object]) -> None:
         super().__init__(*args, **kwargs)
+        self.shell_session = session_from_env()
 
     def system(self) -> str:
         """Retrieve system configuration details for developer"""
@@ -39,9 +41,17 @@ class SynopsisDeveloper(Toolkit):
         Args:
             path (str): The path to the file to source.
         """
+        # in a shell session the source itself persists, we still update the environment for background processes
         source_command = f"source {path} && env"
         self.logshell(f"source {path}")
-        result = shell(source_command, self.notifier, self.exchange_view, cwd=system.cwd, env=system.env)
+        result = shell(
+            source_command,
+            self.notifier,
+            self.exchange_view,
+            cwd=system.cwd,
+            env=system.env,
+            session=self.shell_session,
+        )
         env_vars = dict(line.split("=", 1) for line in result.splitlines() if "=" in line)
         system.env.update(env_vars)
         return f"Sourced {path}"
@@ -62,7 +72,14 @@ class SynopsisDeveloper(Toolkit):
             raise ValueError("You must source files through the source tool.")
 
         self.logshell(command)
-        return shell(command, self.notifier, self.exchange_view, cwd=system.cwd, env=system.env)
+        return shell(
+            command,
+            self.notifier,
+            self.exchange_view,
+            cwd=system.cwd,
+            env=system.env,
+            session=self.shell_session,
+        )
 
     @tool
     def read_file(self, path: str) -> str:
@@ -167,13 +184,7 @@ class SynopsisDeveloper(Toolkit):
         self.logshell(command, title="background")
 
         if is_dangerous_command(command):
-            self.notifier.stop()
-            if not keep_unsafe_command_prompt(command):
-                raise RuntimeError(
-                    f"The command {command} was rejected as dangerous by the user."
-                    " Do not proceed further, instead ask for instructions."
-                )
-            self.notifier.start()
+            confirm_unsafe_command(command, self.notifier)
 
         process = subprocess.Popen(
             command,
@@ -181,16 +192,15 @@ class SynopsisDeveloper(Toolkit):
             stdin=subprocess.DEVNULL,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
             cwd=system.cwd,
             env=system.env,
         )
         process_id = system.add_process(process)
         return process_id
 
-    @tool
+    @tool(parallel=True)
     def list_processes(self) -> Dict[int, str]:
-        """List all running background processes with their IDs and commands."""
+        """List all running background processes with their IDs and commands, and their CPU time and memory."""
         processes = system.get_processes()
         process_list = "```\n" + "\n".join(f"id: {pid}, command: {cmd}" for pid, cmd in processes.items()) + "\n```"
         self.notifier.log("")
@@ -200,17 +210,19 @@ class SynopsisDeveloper(Toolkit):
         return processes
 
     @tool
-    def view_process_output(self, process_id: int) -> str:
-        """View the output of a running background process
+    def view_process_output(self, process_id: int, tail: int = 0) -> str:
+        """View the output of a running background process since it was last viewed
 
         Args:
             process_id (int): The ID of the process to view output.
+            tail (int): If greater than 0, view the last tail lines of output instead,
+                even if they were viewed before.
         """
         self.notifier.log("")
         self.notifier.log(Rule(RULEPREFIX + "processes", style=RULESTYLE, align="left"))
         self.notifier.log(Markdown(f"```\nreading {process_id}\n```"))
         self.notifier.log("")
-        output = system.view_process_output(process_id)
+        output = system.view_process_output(process_id, tail=tail)
         return output
 
     @tool
@@ -11,9 +11,21 @@ from goose.notifier import Notifier
 F = TypeVar("F", bound=callable)
 
 
-def tool(func: F) -> F:
-    func._is_tool = True
-    return func
+def tool(func: Optional[F] = None, *, parallel: bool = False) -> F:
+    """Mark a toolkit method as a tool
+
+    Can be used bare as `@tool`, which runs the tool in order with the others, or as
+    `@tool(parallel=True)` for read-only tools that can run concurrently with other tools.
+    """
+
+    def decorator(func: F) -> F:
+        func._is_tool = True
+        func._is_parallel_safe = parallel
+        return func
+
+    if func is None:
+        return decorator
+    return decorator(func)
 
 
 @define
@@ -62,4 +74,8 @@ class Toolkit(ABC):
         with @tool.
         """
         candidates = inspect.getmembers(self, predicate=inspect.ismethod)
-        return (Tool.from_function(candidate) for _, candidate in candidates if getattr(candidate, "_is_tool", None))
+        return (
+            Tool.from_function(candidate, parallel_safe=getattr(candidate, "_is_parallel_safe", False))
+            for _, candidate in candidates
+            if getattr(candidate, "_is_tool", None)
+        )
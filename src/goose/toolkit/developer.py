@@ -9,6 +9,7 @@ from exchange import Message
 from goose.toolkit.base import Toolkit, tool
 from goose.toolkit.utils import get_language, render_template, RULEPREFIX, RULESTYLE
 from goose.utils.shell import shell
+from goose.utils.shell_session import session_from_env
 from rich.markdown import Markdown
 from rich.table import Table
 from rich.rule import Rule
@@ -25,6 +26,7 @@ class Developer(Toolkit):
         super().__init__(*args, **kwargs)
         self.timestamps: dict[str, float] = {}
         self.cwd = os.getcwd()
+        self.shell_session = session_from_env()
 
     def system(self) -> str:
         """Retrieve system configuration details for developer"""
@@ -78,7 +80,7 @@ class Developer(Toolkit):
         # Return the tasks unchanged as the function's primary purpose is to update and display the task status.
         return tasks
 
-    @tool
+    @tool(parallel=True)
     def fetch_web_content(self, url: str) -> str:
         """
         Fetch content from a URL using httpx.
@@ -150,7 +152,7 @@ class Developer(Toolkit):
         self.notifier.log(Markdown(output))
         return "Succesfully replaced before with after."
 
-    @tool
+    @tool(parallel=True)
     def read_file(self, path: str) -> str:
         """Read the content of the file at path
 
@@ -180,7 +182,7 @@ class Developer(Toolkit):
         # Log the command being executed in a visually structured format (Markdown).
         self.notifier.log(Rule(RULEPREFIX + "shell", style=RULESTYLE, align="left"))
         self.notifier.log(Markdown(f"```bash\n{command}\n```"))
-        return shell(command, self.notifier, self.exchange_view)
+        return shell(command, self.notifier, self.exchange_view, session=self.shell_session)
 
     @tool
     def write_file(self, path: str, content: str) -> str:
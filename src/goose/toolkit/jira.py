@@ -12,7 +12,7 @@ class Jira(Toolkit):
         template_content = Message.load("prompts/jira.jinja").text
         return template_content
 
-    @tool
+    @tool(parallel=True)
     def is_jira_issue(self, issue_key: str) -> str:
         """
         Checks if a given string is a valid JIRA issue key.
@@ -14,7 +14,7 @@ class Reasoner(Toolkit):
         else:
             return Text(str(content))
 
-    @tool
+    @tool(parallel=True)
     def deep_reason(self, problem: str) -> str:
         """
         Debug or reason about challenges or problems.
@@ -40,7 +40,7 @@ class Reasoner(Toolkit):
         response = ask_an_ai(input="please help reason about this: " + problem, exchange=exchange, no_history=False)
         return response.content[0].text
 
-    @tool
+    @tool(parallel=True)
     def generate_code(self, instructions: str) -> str:
         """
         reason about and write code based on instructions given.
@@ -8,7 +8,12 @@ from goose.notifier import Notifier
 from goose.toolkit import Toolkit
 from goose.toolkit.base import Requirements, tool
 from goose.toolkit.repo_context.utils import get_repo_size, goose_picks_files
-from goose.toolkit.summarization.utils import load_summary_file_if_exists, summarize_files_concurrent
+from goose.toolkit.summarization.utils import (
+    load_summary_file_if_exists,
+    refresh_file_list,
+    summarize_directory,
+    summarize_files_concurrent,
+)
 from goose.utils.ask import clear_exchange, replace_prompt
 
 
@@ -87,12 +92,20 @@ class RepoContext(Toolkit):
         else:
             project_directory = self.repo_project_root
 
-        # before selecting files and summarizing look for summarization file
+        # if we have summarized the project before, we refresh the summary with the files added and deleted since.
+        # only the files which are new or changed are summarized again
         project_name = project_directory.split("/")[-1]
         summary = load_summary_file_if_exists(project_name=project_name)
         if summary:
-            self.notifier.log("Summary file for project exists already -- loading into the context")
-            return summary
+            self.notifier.log("Summary file for project exists already -- refreshing changed files")
+            exchange = clear_exchange(self.exchange_view.accelerator, clear_tools=True)
+            if isinstance(summary.get("summaries"), dict):
+                return summarize_directory(project_directory, exchange, summary.get("extensions", []))
+            return summarize_files_concurrent(
+                exchange=exchange,
+                file_list=refresh_file_list(project_directory, summary),
+                project_name=project_name,
+            )
 
         # clear exchange and replace the system prompt with instructions on why and how to select files to summarize
         file_select_exchange = clear_exchange(self.exchange_view.accelerator, clear_tools=True)
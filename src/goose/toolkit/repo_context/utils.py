@@ -1,11 +1,21 @@
 import ast
 import concurrent.futures
 import os
-from collections import deque
 
 from exchange import Exchange
 
 from goose.utils.ask import ask_an_ai
+from goose.utils.file_utils import GitIgnore, scan_directory
+
+
+# cache and dependency directories, which never hold the project's own code. hidden directories,
+# such as .git and .venv, are already left out when the directory is scanned
+SKIPPED_DIRECTORIES = frozenset({"__pycache__", "venv", "site-packages", "node_modules", "bower_components"})
+
+
+def is_skipped_directory(name: str) -> bool:
+    """Whether a directory is never worth summarizing, going by its name"""
+    return name in SKIPPED_DIRECTORIES
 
 
 def get_directory_size(directory: str) -> int:
@@ -36,55 +46,61 @@ def get_files_and_directories(root_dir: str) -> dict[str, list]:
         dict: A list of files and directories in the form {'files': [], 'directories: []}. Paths
             are all relative (i.e. ['src'] not ['goose/src'])
     """
-    files = []
-    dirs = []
-
     # check dir exists
-    try:
-        os.listdir(root_dir)
-    except FileNotFoundError:
+    if not os.path.isdir(root_dir):
         # FIXME: fuzzy match might work here to recover directories 'lost' to goose mistyping
         # hallucination: Goose mistyped the path (e.g. `metrichandler` vs `metricshandler`)
-        return {"files": files, "directories": dirs}
+        return {"files": [], "directories": []}
 
-    for entry in os.listdir(root_dir):
-        if entry.startswith(".") or entry.startswith("~"):
-            continue  # Skip hidden files and directories
-
-        full_path = os.path.join(root_dir, entry)
-        if os.path.isdir(full_path):
-            dirs.append(entry)
-        elif os.path.isfile(full_path):
-            files.append(entry)
+    # hidden, gitignored and binary files are left out
+    absolute_dir = os.path.abspath(root_dir)
+    file_paths, subdirectories = scan_directory(absolute_dir, GitIgnore.above(absolute_dir))
+    files = sorted(name for path in file_paths if not (name := os.path.basename(path)).startswith("~"))
+    dirs = sorted(name for path, _ in subdirectories if not (name := os.path.basename(path)).startswith("~"))
 
     return {"files": files, "directories": dirs}
 
 
-def goose_picks_files(root: str, exchange: Exchange, max_workers: int = 4) -> list[str]:
-    """Lets goose pick files in a BFS manner"""
-    queue = deque([root])
+def goose_picks_files(root: str, exchange: Exchange, max_workers: int = 4, prefilter: bool = True) -> list[str]:
+    """Lets goose pick files, walking down the directories it picks
+
+    Each directory is submitted as soon as its parent has been processed, so a slow directory does not hold up the
+    others, while at most max_workers directories are asked about at once.
 
+    Args:
+        root (str): Directory to start from
+        exchange (Exchange): Exchange to ask which files and directories to keep
+        max_workers (int): The most directories to ask about at once
+        prefilter (bool): Skip version control, cache and dependency directories without asking
+    """
     all_files = []
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        while queue:
-            current_batch = [queue.popleft() for _ in range(min(max_workers, len(queue)))]
-            futures = {executor.submit(process_directory, dir, exchange): dir for dir in current_batch}
-
-            for future in concurrent.futures.as_completed(futures):
+        pending = {executor.submit(process_directory, root, exchange, prefilter)}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
                 files, next_dirs = future.result()
                 all_files.extend(files)
-                queue.extend(next_dirs)
+                pending.update(executor.submit(process_directory, dir, exchange, prefilter) for dir in next_dirs)
 
     return all_files
 
 
-def process_directory(current_dir: str, exchange: Exchange) -> tuple[list[str], list[str]]:
+def process_directory(current_dir: str, exchange: Exchange, prefilter: bool = False) -> tuple[list[str], list[str]]:
     """Allows goose to pick files and subdirectories contained in a given directory (current_dir). Get the list of file
     and directory names in the current folder, then ask Goose to pick which ones to keep.
 
+    With prefilter, version control, cache and dependency directories are left out, and there is nothing to ask
+    about a directory which is empty or only holds a single directory.
     """
     files_and_dirs = get_files_and_directories(current_dir)
+    if prefilter:
+        files_and_dirs["directories"] = [d for d in files_and_dirs["directories"] if not is_skipped_directory(d)]
+        if not files_and_dirs["files"] and len(files_and_dirs["directories"]) <= 1:
+            # e.g. the src/main/java/com/example chains of java projects
+            return [], [f"{current_dir}/{next_dir}" for next_dir in files_and_dirs["directories"]]
+
     ai_response = ask_an_ai(str(files_and_dirs), exchange)
 
     # FIXME: goose response validation
@@ -98,6 +114,10 @@ def process_directory(current_dir: str, exchange: Exchange) -> tuple[list[str],
         return [], []
 
     files = [f"{current_dir}/{file}" for file in as_dict.get("files", [])]
-    next_dirs = [f"{current_dir}/{next_dir}" for next_dir in as_dict.get("directories", [])]
+    next_dirs = [
+        f"{current_dir}/{next_dir}"
+        for next_dir in as_dict.get("directories", [])
+        if not (prefilter and is_skipped_directory(next_dir))
+    ]
 
     return files, next_dirs
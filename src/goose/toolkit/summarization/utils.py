@@ -1,17 +1,81 @@
+import hashlib
 import json
+import os
+import re
 import subprocess
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional
 
 from exchange import Exchange
 from exchange.providers.utils import InitialMessageTooLargeError
+from exchange.token_counter import get_tokenizer_service
 
 from goose.utils.ask import ask_an_ai
 from goose.utils.file_utils import create_file_list
 
 SUMMARIES_FOLDER = ".goose/summaries"
+FILE_SUMMARIES_FOLDER = f"{SUMMARIES_FOLDER}/files"
 CLONED_REPOS_FOLDER = ".goose/cloned_repos"
+DEFAULT_SUMMARY_PROMPT = "Please summarize this file."
+# cloned repositories can be large, so their directories are scanned on several threads
+WALK_WORKERS = 8
+
+# files longer than this are summarized in parts, well within the context window of the smaller models
+CHUNK_TOKENS = 8000
+# parts are not split any smaller than this, even if a provider rejects them
+MIN_CHUNK_TOKENS = 500
+CHUNK_WORKERS = 4
+CHUNK_PROMPT = (
+    "{prompt}\nThis is one part of the file {name}, which is too long to read at once. "
+    "Summarize this part, mentioning the names of what it defines."
+)
+REDUCE_PROMPT = (
+    "{prompt}\nThe file {name} was too long to read at once. These are the summaries of its consecutive parts, "
+    "combine them into a single summary of the whole file."
+)
+# a line which starts a new top level definition, rather than continuing or closing the one before it
+TOP_LEVEL_LINE = re.compile(r"^(?![\s)\]}]|end\b|else\b|elif\b|except\b|finally\b|catch\b)\S")
+
+
+class SummaryStore:
+    """Summaries of individual files, keyed by a hash of their content, the prompt and the model
+
+    A file only needs to be summarized again once it changes, or when it is summarized with
+    different instructions or by a different model. Each summary is a small json file, so that
+    concurrent summaries can be stored without coordinating.
+    """
+
+    def __init__(self, folder: str = FILE_SUMMARIES_FOLDER) -> None:
+        self.folder = Path(folder)
+
+    @staticmethod
+    def key(content: str, prompt: str, model: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, prompt, content):
+            digest.update(part.encode("utf-8", errors="surrogatepass"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.folder / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)["summary"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, summary: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename, so that an interrupted run never leaves a partial summary
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"summary": summary}, f)
+        os.replace(temp_path, path)
 
 
 # TODO: move git stuff
@@ -44,13 +108,43 @@ def load_summary_file_if_exists(project_name: str) -> Optional[dict]:
             return json.load(f)
 
 
-def summarize_file(filepath: str, exchange: Exchange, prompt: Optional[str] = None) -> tuple[str, str]:
+def refresh_file_list(directory: str, summary: dict) -> list[str]:
+    """The files to summarize again for a project which was summarized before
+
+    A summary written by summarize_directory covers every file with its extensions, so those are
+    listed again. For the files goose picked, new files are taken from the same directories when
+    they have one of the same extensions. Deleted files are left out either way.
+
+    Args:
+        directory (str): The root of the project
+        summary (dict): The contents of the project summary file
+    """
+    if isinstance(summary.get("summaries"), dict):
+        return create_file_list(directory, summary.get("extensions", []), max_workers=WALK_WORKERS)
+
+    folders = {os.path.dirname(os.path.abspath(file)) for file in summary}
+    suffixes = {os.path.splitext(file)[1] for file in summary}
+    return [
+        file
+        for file in create_file_list(directory, [], max_workers=WALK_WORKERS)
+        if os.path.dirname(os.path.abspath(file)) in folders and os.path.splitext(file)[1] in suffixes
+    ]
+
+
+def summarize_file(
+    filepath: str,
+    exchange: Exchange,
+    prompt: Optional[str] = None,
+    store: Optional[SummaryStore] = None,
+) -> tuple[str, str]:
     """Summarizes a single file
 
     Args:
         filepath (str): Path to the file to summarize.
         exchange (Exchange): Exchange object to use for summarization.
         prompt (Optional[str]): Defaults to "Please summarize this file."
+        store (Optional[SummaryStore]): Where to look up and keep the summary, so that an unchanged
+            file is not summarized again.
     """
     try:
         with open(filepath, "r") as f:
@@ -61,14 +155,106 @@ def summarize_file(filepath: str, exchange: Exchange, prompt: Optional[str] = No
     if not file_text:
         return filepath, "Empty file"
 
+    prompt = prompt if prompt else DEFAULT_SUMMARY_PROMPT
+    return filepath, summarize_text(file_text, exchange, prompt, name=filepath, store=store)
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """Split text into consecutive chunks of at most max_tokens, which join back into the text
+
+    Chunks end before top level definitions where possible, then at line ends, and only split a
+    single line which is too long on its own.
+    """
+    counter = get_tokenizer_service()
+    blocks = []
+    for line in text.splitlines(keepends=True):
+        if not blocks or TOP_LEVEL_LINE.match(line):
+            blocks.append(line)
+        else:
+            blocks[-1] += line
+
+    pieces = []
+    for block in blocks:
+        if not counter.exceeds(block, max_tokens):
+            pieces.append(block)
+            continue
+        for line in block.splitlines(keepends=True):
+            if not counter.exceeds(line, max_tokens):
+                pieces.append(line)
+                continue
+            # a token is rarely shorter than a character, so this always fits
+            pieces.extend(line[i : i + max_tokens] for i in range(0, len(line), max_tokens))
+
+    chunks: list[str] = []
+    size = 0
+    for piece in pieces:
+        tokens = counter.count(piece)
+        if chunks and size + tokens <= max_tokens:
+            chunks[-1] += piece
+            size += tokens
+        else:
+            chunks.append(piece)
+            size = tokens
+    return chunks
+
+
+def _summarize_chunk(text: str, exchange: Exchange, prompt: str, store: Optional[SummaryStore]) -> str:
+    key = SummaryStore.key(text, prompt, exchange.model)
+    if store is not None and (summary := store.get(key)) is not None:
+        return summary
+    summary = ask_an_ai(input=text, exchange=exchange, prompt=prompt).text
+    if store is not None:
+        store.put(key, summary)
+    return summary
+
+
+def summarize_text(
+    text: str,
+    exchange: Exchange,
+    prompt: str,
+    name: str = "",
+    store: Optional[SummaryStore] = None,
+    max_tokens: int = CHUNK_TOKENS,
+) -> str:
+    """Summarize text, in parts if it is longer than max_tokens
+
+    The parts are summarized concurrently and their summaries combined, in rounds if they are too
+    long to combine at once. Each part is stored on its own, so after an edit only the parts which
+    changed and the combined summary are asked for again.
+    """
     try:
-        reply = ask_an_ai(
-            input=file_text, exchange=exchange, prompt=prompt if prompt else "Please summarize this file."
-        )
+        if not get_tokenizer_service().exceeds(text, max_tokens):
+            return _summarize_chunk(text, exchange, prompt, store)
+
+        chunk_prompt = CHUNK_PROMPT.format(prompt=prompt, name=name)
+        with ThreadPoolExecutor(max_workers=CHUNK_WORKERS) as executor:
+            summaries = list(
+                executor.map(
+                    lambda chunk: _summarize_chunk(chunk, exchange, chunk_prompt, store),
+                    split_into_chunks(text, max_tokens),
+                )
+            )
+
+        reduce_prompt = REDUCE_PROMPT.format(prompt=prompt, name=name)
+        while True:
+            parts = [f"Part {i + 1}:\n{summary}\n\n" for i, summary in enumerate(summaries)]
+            combined = "".join(parts)
+            if len(summaries) == 1 or not get_tokenizer_service().exceeds(combined, max_tokens):
+                return _summarize_chunk(combined, exchange, reduce_prompt, store)
+            # combine the summaries of neighbouring parts, and then combine those
+            groups = split_into_chunks(combined, max_tokens)
+            if len(groups) >= len(summaries):
+                # the summaries are too long to group, so the provider has to take them at once
+                return _summarize_chunk(combined, exchange, reduce_prompt, store)
+            with ThreadPoolExecutor(max_workers=CHUNK_WORKERS) as executor:
+                summaries = list(
+                    executor.map(lambda group: _summarize_chunk(group, exchange, reduce_prompt, store), groups)
+                )
     except InitialMessageTooLargeError:
-        return filepath, "File too large"
-
-    return filepath, reply.text
+        # the provider counts differently than we do, so try again with smaller parts
+        if max_tokens // 2 < MIN_CHUNK_TOKENS:
+            return "File too large"
+        return summarize_text(text, exchange, prompt, name, store, max_tokens // 2)
 
 
 def summarize_repo(
@@ -124,22 +310,19 @@ def summarize_directory(
     Returns:
         file_summaries (dict): Keys are file names and values are summaries.
 
+    Files are summarized again only if they changed since they were last summarized.
     """  # noqa: E501
 
     # TODO: make sure that '.goose/summaries' is
     # in the root of the current not relative to current dir or in cloned repo root
     project_name = directory.split("/")[-1]
-    summary_file = load_summary_file_if_exists(project_name)
-    if summary_file:
-        return summary_file
-
     summary_file_path = f"{SUMMARIES_FOLDER}/{project_name}-summary.json"
 
     # create the .goose/summaries folder if not already created
     Path(SUMMARIES_FOLDER).mkdir(exist_ok=True, parents=True)
 
     # select a subset of files to summarize based on file extension
-    files_to_summarize = create_file_list(directory, extensions=extensions)
+    files_to_summarize = create_file_list(directory, extensions=extensions, max_workers=WALK_WORKERS)
 
     file_summaries = summarize_files_concurrent(
         exchange=exchange,
@@ -171,17 +354,18 @@ def summarize_files_concurrent(
 
     Returns:
         file_summaries (dict[str, str]): Keys are file paths and values are the summaries returned by the Exchange
-    """
-    summary_file = load_summary_file_if_exists(project_name)
-    if summary_file:
-        return summary_file
 
+    Summaries are kept in a SummaryStore, so only files which changed since they were last summarized
+    are sent to the Exchange again.
+    """
+    store = SummaryStore()
     file_summaries = {}
     # compile the individual file summaries into a single summary dict
     # TODO: add progress bar as this step can take quite some time and it's nice to see something is happening
     with ThreadPoolExecutor() as executor:
         future_to_file = {
-            executor.submit(summarize_file, file, exchange, summary_instructions_prompt): file for file in file_list
+            executor.submit(summarize_file, file, exchange, summary_instructions_prompt, store): file
+            for file in file_list
         }
 
         for future in as_completed(future_to_file):
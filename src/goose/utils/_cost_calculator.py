@@ -18,11 +18,24 @@ PRICES = {
 }
 
 
+# prompt caching prices tokens written to the cache higher, and tokens read from it lower, than other input
+CACHE_WRITE_PRICE_MULTIPLIER = 1.25
+CACHE_READ_PRICE_MULTIPLIER = 0.1
+
+
 def _calculate_cost(model: str, token_usage: Usage) -> Optional[float]:
     model_name = model.lower()
     if model_name in PRICES:
         input_token_price, output_token_price = PRICES[model_name]
-        return (input_token_price * token_usage.input_tokens + output_token_price * token_usage.output_tokens) / 1000000
+        cache_read_tokens = token_usage.cache_read_tokens or 0
+        cache_write_tokens = token_usage.cache_write_tokens or 0
+        uncached_input_tokens = token_usage.input_tokens - cache_read_tokens - cache_write_tokens
+        input_cost = input_token_price * (
+            uncached_input_tokens
+            + CACHE_WRITE_PRICE_MULTIPLIER * cache_write_tokens
+            + CACHE_READ_PRICE_MULTIPLIER * cache_read_tokens
+        )
+        return (input_cost + output_token_price * token_usage.output_tokens) / 1000000
     return None
 
 
@@ -1,8 +1,221 @@
-import glob
 import os
+import re
 from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
+
+# git treats a file as binary if there is a NUL byte within its first 8000 bytes
+BINARY_SNIFF_BYTES = 8000
+
+
+class IgnoreRule:
+    """A single pattern from a .gitignore file, which applies to paths below the directory it is in"""
+
+    def __init__(self, base: str, pattern: str) -> None:
+        self.prefix = base.rstrip(os.sep) + os.sep
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\!") or pattern.startswith("\\#"):
+            pattern = pattern[1:]
+        self.directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # a pattern with a slash before its end is relative to the base, otherwise it matches at any depth
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        self.regex = re.compile(("^" if anchored else "^(?:.*/)?") + _translate_glob(pattern) + "$")
+
+    @classmethod
+    def parse(cls, base: str, line: str) -> Optional["IgnoreRule"]:
+        line = line.rstrip("\n").rstrip("\r")
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+        if not line or line.startswith("#") or line in ("!", "/"):
+            return None
+        return cls(base, line)
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        if self.directory_only and not is_dir:
+            return False
+        if not path.startswith(self.prefix):
+            return False
+        relative = path[len(self.prefix) :].replace(os.sep, "/")
+        return self.regex.match(relative) is not None
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression, where wildcards do not cross slashes"""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            content = pattern[i + 1 : end].replace("\\", "\\\\")
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            parts.append(f"[{content}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+class GitIgnore:
+    """The ignore rules which apply within a directory, the last matching rule wins"""
+
+    def __init__(self, rules: tuple[IgnoreRule, ...] = ()) -> None:
+        self.rules = rules
+
+    def with_file(self, path: str, base: Optional[str] = None) -> "GitIgnore":
+        """Add the rules in an ignore file, which apply below base, by default the directory the file is in"""
+        try:
+            with open(path, "r", errors="replace") as f:
+                lines = f.readlines()
+        except OSError:
+            return self
+        base = base or os.path.dirname(path)
+        rules = tuple(rule for line in lines if (rule := IgnoreRule.parse(base, line)) is not None)
+        return GitIgnore(self.rules + rules) if rules else self
+
+    def ignored(self, path: str, is_dir: bool) -> bool:
+        for rule in reversed(self.rules):
+            if rule.matches(path, is_dir):
+                return not rule.negate
+        return False
+
+    @classmethod
+    def above(cls, directory: str) -> "GitIgnore":
+        """The rules which apply to a directory from the repository it is in, leaving out its own .gitignore"""
+        directory = os.path.abspath(directory)
+        if os.path.exists(os.path.join(directory, ".git")):
+            return cls().with_file(os.path.join(directory, ".git", "info", "exclude"), base=directory)
+
+        ancestors = []
+        current = os.path.dirname(directory)
+        while True:
+            ancestors.append(current)
+            if os.path.exists(os.path.join(current, ".git")):
+                break
+            parent = os.path.dirname(current)
+            if parent == current:
+                # not in a repository, so only the .gitignore files in the tree itself apply
+                return cls()
+            current = parent
+
+        ignore = cls().with_file(os.path.join(ancestors[-1], ".git", "info", "exclude"), base=ancestors[-1])
+        for ancestor in reversed(ancestors):
+            ignore = ignore.with_file(os.path.join(ancestor, ".gitignore"))
+        return ignore
+
+
+def is_binary(path: str) -> bool:
+    """Whether a file looks binary, unreadable files count as binary"""
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(BINARY_SNIFF_BYTES)
+    except OSError:
+        return True
+
+
+def scan_directory(
+    directory: str,
+    ignore: Optional[GitIgnore],
+    extensions: Optional[tuple[str, ...]] = None,
+    skip_binary: bool = True,
+) -> tuple[list[str], list[tuple[str, GitIgnore]]]:
+    """List one directory, returning its files and its subdirectories along with the rules which apply in each
+
+    Hidden entries, the ones which are ignored and binary files are left out. Without ignore rules nothing is
+    ignored, not even what a .gitignore in the directory lists.
+    """
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return [], []
+
+    if ignore is not None and any(entry.name == ".gitignore" for entry in entries):
+        ignore = ignore.with_file(os.path.join(directory, ".gitignore"))
+
+    files = []
+    subdirectories = []
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        try:
+            # symlinked directories are not followed, which could otherwise loop
+            is_dir = entry.is_dir(follow_symlinks=False)
+            is_file = not is_dir and entry.is_file()
+        except OSError:
+            continue
+        if not (is_dir or is_file) or (ignore is not None and ignore.ignored(entry.path, is_dir)):
+            continue
+        if is_dir:
+            subdirectories.append((entry.path, ignore))
+        elif (extensions is None or entry.name.endswith(extensions)) and not (skip_binary and is_binary(entry.path)):
+            files.append(entry.path)
+    return files, subdirectories
+
+
+def walk_files(
+    root: str,
+    extensions: Optional[list[str]] = None,
+    respect_gitignore: bool = True,
+    skip_binary: bool = True,
+    max_workers: int = 1,
+) -> list[str]:
+    """Walk a directory tree once, listing the files in it
+
+    Args:
+        root (str): Directory to walk.
+        extensions (Optional[list[str]]): Only list files with one of these extensions, all files if empty.
+        respect_gitignore (bool): Leave out what .gitignore and .git/info/exclude ignore, and skip walking
+            ignored directories such as node_modules entirely.
+        skip_binary (bool): Leave out files which look binary.
+        max_workers (int): Scan directories on this many threads, which helps on large trees.
+
+    Returns:
+        files (list[str]): Sorted paths of the files, starting with root. Hidden files and directories are left out.
+    """
+    suffixes = tuple(ext if ext.startswith(".") else f".{ext}" for ext in extensions if ext) if extensions else None
+    absolute_root = os.path.abspath(root)
+    ignore = GitIgnore.above(absolute_root) if respect_gitignore else None
+
+    files = []
+    if max_workers <= 1:
+        pending = [(absolute_root, ignore)]
+        while pending:
+            found, subdirectories = scan_directory(*pending.pop(), suffixes, skip_binary)
+            files.extend(found)
+            pending.extend(subdirectories)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(scan_directory, absolute_root, ignore, suffixes, skip_binary)}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    found, subdirectories = future.result()
+                    files.extend(found)
+                    for directory, rules in subdirectories:
+                        futures.add(executor.submit(scan_directory, directory, rules, suffixes, skip_binary))
+
+    return sorted(os.path.join(root, file[len(absolute_root) + 1 :]) for file in files)
 
 
 def create_extensions_list(project_root: str, max_n: int) -> list:
@@ -31,16 +244,20 @@ def create_extensions_list(project_root: str, max_n: int) -> list:
     return extensions
 
 
-def create_language_weighting(files_in_directory: list[str]) -> dict[str, float]:
+def create_language_weighting(files_in_directory: Union[list[str], str]) -> dict[str, float]:
     """Calculate language weighting by file size to match GitHub's methodology.
 
     Args:
-        files_in_directory (list[str]): Paths to files in the project directory
+        files_in_directory (Union[list[str], str]): Paths to files in the project directory, or the project directory
+            to walk for them
 
     Returns:
         dict[str, float]: A dictionary with languages as keys and their percentage of the total codebase as values
     """
 
+    if isinstance(files_in_directory, str):
+        files_in_directory = walk_files(files_in_directory)
+
     # Initialize counters for sizes
     size_by_language = Counter()
 
@@ -69,35 +286,19 @@ def list_files_with_extension(dir_path: str, extension: Optional[str] = "") -> l
     Returns:
         files (list[str]): list of file paths
     """
-    # add a leading '.' to extension if needed
-    if extension and not extension.startswith("."):
-        extension = f".{extension}"
+    return walk_files(dir_path, [extension] if extension else None)
 
-    files = glob.glob(f"{dir_path}/**/*{extension}", recursive=True)
-    return files
 
-
-def create_file_list(dir_path: str, extensions: list[str]) -> list[str]:
+def create_file_list(dir_path: str, extensions: list[str], max_workers: int = 1) -> list[str]:
     """Creates a list of files with certain extensions
 
     Args:
-        dir_path (str): Directory to list files of. Will include files recursively in sub-directories.
+        dir_path (str): Directory to list files of. Will include files recursively in sub-directories, leaving out
+            hidden, gitignored and binary files.
         extensions (list[str]): list of file extensions to select for. If empty list, return all files
+        max_workers (int): Number of threads to walk the directory with.
 
     Returns:
         final_file_list (list[str]): list of file paths with specified extensions.
     """
-    # if extensions is empty list, return all files
-    if not extensions:
-        return glob.glob(f"{dir_path}/**/*", recursive=True)
-
-    # prune out files that do not end with any of the extensions in extensions
-    final_file_list = []
-    for ext in extensions:
-        if ext and not ext.startswith("."):
-            ext = f".{ext}"
-
-        files = glob.glob(f"{dir_path}/**/*{ext}", recursive=True)
-        final_file_list += files
-
-    return final_file_list
+    return walk_files(dir_path, extensions, max_workers=max_workers)
@@ -0,0 +1,153 @@
+import tempfile
+import threading
+from collections import deque
+from typing import IO, Optional
+
+# together these stay well within the limit on the size of a tool output
+HEAD_CHARS = 8000
+TAIL_CHARS = 24000
+
+# how much of the output of a background process is kept
+RING_BUFFER_BYTES = 1024 * 1024
+
+# how much output of a background process is returned by one read, an encoding never makes more
+# tokens than bytes so this stays within the limit on the size of a tool output
+READ_BYTES = 12000
+
+
+class OutputCapture:
+    """Captures the output of a command, keeping a bounded head and tail in memory
+
+    Output which fits within the head and tail is kept whole. Once there is more, all of it is
+    written to a temporary file instead, which is left in place so that it can be searched or paged
+    through rather than running the command again.
+    """
+
+    def __init__(self, head_chars: int = HEAD_CHARS, tail_chars: int = TAIL_CHARS) -> None:
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.head: list[str] = []
+        self.tail: deque[str] = deque()
+        self.path: Optional[str] = None
+        self.line_count = 0
+        self._head_size = 0
+        self._tail_size = 0
+        self._chunks: list[str] = []
+        self._size = 0
+        self._file: Optional[IO[str]] = None
+        self._ends_with_newline = True
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the output outgrew memory and was written to a file"""
+        return self.path is not None
+
+    def write(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self.line_count += chunk.count("\n")
+        self._ends_with_newline = chunk.endswith("\n")
+
+        if self._file is None:
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+            if self._size <= self.head_chars + self.tail_chars:
+                return
+            self._spill()
+        else:
+            self._file.write(chunk)
+            self._add_to_tail(chunk)
+
+    def _spill(self) -> None:
+        self._file = tempfile.NamedTemporaryFile(
+            "w", prefix="goose-shell-", suffix=".log", delete=False, encoding="utf-8"
+        )
+        self.path = self._file.name
+        for chunk in self._chunks:
+            self._file.write(chunk)
+            if self._head_size < self.head_chars:
+                head = chunk[: self.head_chars - self._head_size]
+                self.head.append(head)
+                self._head_size += len(head)
+                chunk = chunk[len(head) :]
+            self._add_to_tail(chunk)
+        self._chunks = []
+
+    def _add_to_tail(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self.tail.append(chunk)
+        self._tail_size += len(chunk)
+        while self._tail_size - len(self.tail[0]) >= self.tail_chars:
+            self._tail_size -= len(self.tail.popleft())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def text(self) -> str:
+        """The output, with the middle left out if it was too long to keep"""
+        if not self.spilled:
+            return "".join(self._chunks)
+
+        # cut the head and the tail at line boundaries where we can
+        head = "".join(self.head)
+        if "\n" in head:
+            head = head[: head.rindex("\n") + 1]
+        tail = "".join(self.tail)[-self.tail_chars :]
+        if "\n" in tail[:-1]:
+            tail = tail[tail.index("\n") + 1 :]
+
+        total_lines = self.line_count + (0 if self._ends_with_newline else 1)
+        omitted = total_lines - head.count("\n") - tail.count("\n") - (0 if tail.endswith("\n") else 1)
+        return (
+            f"{head}"
+            f"... [{max(omitted, 0)} of {total_lines} lines omitted, the full output is in {self.path}] ...\n"
+            f"{tail}"
+        )
+
+
+class OutputRingBuffer:
+    """Keeps the most recent output of a background process, addressed by byte offsets
+
+    Offsets count every byte ever written, so a reader can ask for the output since the offset it
+    last read up to. Once more than the capacity has been written the oldest output is dropped,
+    and a read from before the start reports how much of it was lost.
+    """
+
+    def __init__(self, capacity: int = RING_BUFFER_BYTES) -> None:
+        self.capacity = capacity
+        self._buffer = bytearray()
+        self._start = 0  # the offset of the first byte in the buffer
+        self._lock = threading.Lock()
+
+    @property
+    def start(self) -> int:
+        return self._start
+
+    @property
+    def end(self) -> int:
+        """The offset just past the last byte written"""
+        return self._start + len(self._buffer)
+
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            self._buffer += data
+            overflow = len(self._buffer) - self.capacity
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self._start += overflow
+
+    def read(self, offset: int, limit: Optional[int] = None) -> tuple[bytes, int, int]:
+        """Read from offset up to limit bytes, returning the data, the new offset and how many bytes were lost"""
+        with self._lock:
+            lost = max(self._start - offset, 0)
+            position = max(offset - self._start, 0)
+            data = bytes(self._buffer[position : None if limit is None else position + limit])
+            return data, self._start + position + len(data), lost
+
+    def tail(self, size: int) -> bytes:
+        """The last size bytes"""
+        with self._lock:
+            return bytes(self._buffer[-size:]) if size > 0 else b""
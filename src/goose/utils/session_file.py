@@ -1,10 +1,16 @@
 import json
+import os
+import sqlite3
 from pathlib import Path
-from typing import Iterator
+from typing import BinaryIO, Iterator, Optional
 
 from exchange import Message
 
 from goose.cli.config import SESSION_FILE_SUFFIX
+from goose.utils.session_index import SessionIndex
+
+# the tail of a session is measured without parsing it, at about four bytes of json for each token
+BYTES_PER_TOKEN = 4
 
 
 def is_existing_session(path: Path) -> bool:
@@ -24,18 +30,68 @@ def read_or_create_file(file_path: Path) -> list[Message]:
 
 
 def read_from_file(file_path: Path) -> list[Message]:
+    messages = []
+    with open(file_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                messages.append(_parse_message(line))
+    return messages
+
+
+def read_tail(file_path: Path, max_tokens: int) -> list[Message]:
+    """Read the most recent messages of a session which fit in about max_tokens
+
+    The file is read backwards, so the older history is neither read nor parsed. The tail starts
+    at a user message which is not a tool result, which is also where a truncated exchange starts,
+    and so it can go over the budget to get to one.
+    """
+    tail = []
+    tokens = 0
+    with open(file_path, "rb") as f:
+        for line in _lines_backwards(f):
+            if not line.strip():
+                continue
+            if tokens >= max_tokens and tail and _starts_turn(tail[-1]):
+                break
+            tail.append(_parse_json(line))
+            tokens += len(line) // BYTES_PER_TOKEN
+    return [Message(**message) for message in reversed(tail)]
+
+
+def _lines_backwards(f: BinaryIO, block_size: int = 1 << 16) -> Iterator[bytes]:
+    """The lines of a file from last to first"""
+    position = f.seek(0, os.SEEK_END)
+    remainder = b""
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        f.seek(position)
+        lines = (f.read(size) + remainder).split(b"\n")
+        # the first line may continue in the block before
+        remainder = lines.pop(0)
+        yield from reversed(lines)
+    yield remainder
+
+
+def _starts_turn(message: dict) -> bool:
+    return message.get("role") == "user" and not any(
+        content.get("type") == "ToolResult" for content in message.get("content", [])
+    )
+
+
+def _parse_json(line: bytes) -> dict:
     try:
-        with open(file_path, "r") as f:
-            messages = [json.loads(m) for m in list(f) if m.strip()]
+        return json.loads(line)
     except json.JSONDecodeError as e:
         raise RuntimeError(f"Failed to load session due to JSON decode Error: {e}")
 
-    return [Message(**m) for m in messages]
+
+def _parse_message(line: bytes) -> Message:
+    return Message(**_parse_json(line))
 
 
 def list_sorted_session_files(session_files_directory: Path) -> dict[str, Path]:
-    logs = list_session_files(session_files_directory)
-    return {log.stem: log for log in sorted(logs, key=lambda x: x.stat().st_mtime, reverse=True)}
+    return {entry.name: entry.path for entry in SessionIndex(session_files_directory).entries()}
 
 
 def list_session_files(session_files_directory: Path) -> Iterator[Path]:
@@ -48,8 +104,19 @@ def session_file_exists(session_files_directory: Path) -> bool:
     return any(list_session_files(session_files_directory))
 
 
-def log_messages(file_path: Path, messages: list[Message]) -> None:
+def log_messages(
+    file_path: Path,
+    messages: list[Message],
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    model: Optional[str] = None,
+) -> None:
     with open(file_path, "a") as f:
         for message in messages:
             json.dump(message.to_dict(), f)
             f.write("\n")
+    try:
+        SessionIndex(file_path.parent).record(file_path, len(messages), input_tokens, output_tokens, model)
+    except sqlite3.Error:
+        # the session file is what matters, the index is rebuilt when the directory changes
+        pass
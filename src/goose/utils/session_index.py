@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+from attrs import define
+
+from goose.cli.config import SESSION_FILE_SUFFIX
+
+INDEX_DIRECTORY = ".index"
+INDEX_FILE = "sessions.sqlite3"
+SCHEMA_VERSION = 1
+
+# a directory changed this recently may change again within the resolution of its mtime
+RACY_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    message_count INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    model TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_by_mtime ON sessions (mtime DESC);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+"""
+
+
+@define
+class SessionEntry:
+    name: str
+    path: Path
+    mtime: float
+    message_count: int
+    input_tokens: int
+    output_tokens: int
+    model: Optional[str]
+
+
+def count_lines(path: Path) -> int:
+    """The number of messages in a session file, without parsing them"""
+    count = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            count += chunk.count(b"\n")
+    return count
+
+
+class SessionIndex:
+    """A catalog of the session files in a directory, kept in sqlite beside them
+
+    log_messages keeps the entry of a session up to date as it is written. Files which are added,
+    removed or renamed by anything else change the mtime of the directory, which is noticed by
+    the next query and reconciled by a scan of the directory.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.path = directory / INDEX_DIRECTORY / INDEX_FILE
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                connection.executescript("DROP TABLE IF EXISTS sessions; DROP TABLE IF EXISTS meta;")
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.executescript(SCHEMA)
+        except sqlite3.DatabaseError:
+            # a damaged index is only a cache of the directory, so it is rebuilt from scratch
+            connection.close()
+            self.path.unlink(missing_ok=True)
+            return self._connect()
+        return connection
+
+    def _entry(self, row: tuple) -> SessionEntry:
+        name, *rest = row
+        return SessionEntry(name, self.directory / f"{name}{SESSION_FILE_SUFFIX}", *rest)
+
+    def sync(self, connection: sqlite3.Connection) -> None:
+        """Bring the index up to date with the directory, if anything was added or removed"""
+        directory_mtime = self.directory.stat().st_mtime_ns
+        row = connection.execute("SELECT value FROM meta WHERE key = 'directory_mtime'").fetchone()
+        if row is not None and row[0] == directory_mtime:
+            return
+
+        rows = connection.execute("SELECT name, mtime, size FROM sessions")
+        known = {name: (mtime, size) for name, mtime, size in rows}
+        found = set()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(SESSION_FILE_SUFFIX) or not entry.is_file():
+                continue
+            name = entry.name[: -len(SESSION_FILE_SUFFIX)]
+            found.add(name)
+            stat = entry.stat()
+            if known.get(name) == (stat.st_mtime, stat.st_size):
+                continue
+            # the token totals and model of a file changed by something else are unknown, they are
+            # not kept in the file, so they are reset rather than left describing the old content
+            connection.execute(
+                "INSERT INTO sessions (name, mtime, size, message_count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET mtime = excluded.mtime, size = excluded.size, "
+                "message_count = excluded.message_count, input_tokens = 0, output_tokens = 0, model = NULL",
+                (name, stat.st_mtime, stat.st_size, count_lines(Path(entry.path))),
+            )
+        connection.executemany("DELETE FROM sessions WHERE name = ?", [(name,) for name in known.keys() - found])
+
+        # a change within the resolution of the directory mtime would go unnoticed, so a recent
+        # mtime is not trusted and the next query scans again
+        if time.time() - directory_mtime / 1e9 > RACY_INTERVAL:
+            connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('directory_mtime', ?)", (directory_mtime,)
+            )
+
+    def entries(self, prefix: str = "", limit: Optional[int] = None) -> list[SessionEntry]:
+        """The sessions whose names start with the prefix, most recently changed first"""
+        if not self.directory.is_dir():
+            return []
+        with closing(self._connect()) as connection, connection:
+            self.sync(connection)
+            rows = connection.execute(
+                "SELECT name, mtime, message_count, input_tokens, output_tokens, model FROM sessions "
+                "WHERE substr(name, 1, ?) = ? ORDER BY mtime DESC, name LIMIT ?",
+                (len(prefix), prefix, -1 if limit is None else limit),
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def latest(self) -> Optional[SessionEntry]:
+        return next(iter(self.entries(limit=1)), None)
+
+    def record(
+        self,
+        path: Path,
+        message_count: int,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        model: Optional[str] = None,
+    ) -> None:
+        """Account for messages which were just appended to a session file"""
+        name = path.name[: -len(SESSION_FILE_SUFFIX)]
+        stat = path.stat()
+        with closing(self._connect()) as connection, connection:
+            updated = connection.execute(
+                "UPDATE sessions SET mtime = ?, size = ?, message_count = message_count + ?, "
+                "input_tokens = input_tokens + ?, output_tokens = output_tokens + ?, model = coalesce(?, model) "
+                "WHERE name = ?",
+                (stat.st_mtime, stat.st_size, message_count, input_tokens, output_tokens, model, name),
+            ).rowcount
+            if not updated:
+                connection.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (name, stat.st_mtime, stat.st_size, count_lines(path), input_tokens, output_tokens, model),
+                )
+
+    def remove(self, names: list[str]) -> None:
+        """Delete sessions, both their files and their entries"""
+        for name in names:
+            (self.directory / f"{name}{SESSION_FILE_SUFFIX}").unlink(missing_ok=True)
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("DELETE FROM sessions WHERE name = ?", [(name,) for name in names])
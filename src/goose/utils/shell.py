@@ -1,14 +1,23 @@
+import codecs
+import io
 import os
 import re
+import selectors
 import subprocess
+import threading
 import time
-from typing import Mapping, Optional
+from typing import IO, TYPE_CHECKING, Mapping, Optional
 
 from goose.notifier import Notifier
+from goose.utils.output_capture import OutputCapture
+from goose.utils.stuck_detector import StuckDetector
 from goose.utils.ask import ask_an_ai
 from goose.view import ExchangeView
 from rich.prompt import Confirm
 
+if TYPE_CHECKING:
+    from goose.utils.shell_session import ShellSession
+
 
 def is_dangerous_command(command: str) -> bool:
     """
@@ -43,31 +52,141 @@ def is_dangerous_command(command: str) -> bool:
     return False
 
 
+# tools can run concurrently, but only one of them may prompt the user at a time
+_prompt_lock = threading.Lock()
+
+
 def keep_unsafe_command_prompt(command: str) -> bool:
     message = f"\nWe flagged the command - [bold red]{command}[/] - as potentially unsafe, do you want to proceed?"
     return Confirm.ask(message, default=True)
 
 
+def confirm_unsafe_command(command: str, notifier: Notifier) -> None:
+    """Ask the user to confirm a command flagged as dangerous, raising if they reject it"""
+    with _prompt_lock:
+        # Stop the notifications so we can prompt
+        notifier.stop()
+        if not keep_unsafe_command_prompt(command):
+            raise RuntimeError(
+                f"The command {command} was rejected as dangerous by the user."
+                " Do not proceed further, instead ask for instructions."
+            )
+        notifier.start()
+
+
+# how long to wait for output before checking whether the command has exited, the pipe can stay open
+# after the command exits if it started a background process
+POLL_INTERVAL = 0.1
+
+
+class OutputReader:
+    """Reads the output of a process as it arrives
+
+    This waits on the pipe with a selector, so waiting for a quiet command doesn't use any CPU.
+    The output is decoded incrementally, so characters split between reads are kept intact.
+    """
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        self.stream = stream
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(stream, selectors.EVENT_READ)
+        self.decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="replace"), True)
+        self.closed = False
+
+    def read(self, timeout: float) -> str:
+        """Wait up to timeout seconds for output, returning what arrived or an empty string"""
+        if self.closed or not self.selector.select(timeout):
+            return ""
+        data = os.read(self.stream.fileno(), 65536)
+        if not data:
+            self.close()
+            return self.decoder.decode(b"", final=True)
+        return self.decoder.decode(data)
+
+    def drain(self) -> str:
+        """Read all of the output which is available without waiting"""
+        chunks = []
+        while chunk := self.read(timeout=0):
+            chunks.append(chunk)
+        if not self.closed:
+            chunks.append(self.decoder.decode(b"", final=True))
+        return "".join(chunks)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.selector.unregister(self.stream)
+            self.selector.close()
+            self.closed = True
+
+
+class ShellProcess:
+    """A command running in a fresh shell process"""
+
+    def __init__(self, command: str, cwd: Optional[str] = None, env: Optional[Mapping[str, str]] = None) -> None:
+        self.proc = subprocess.Popen(
+            command,
+            shell=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=cwd,
+            env=env,
+        )
+        self.reader = OutputReader(self.proc.stdout)
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.proc.returncode
+
+    def done(self) -> bool:
+        return self.proc.poll() is not None
+
+    def read(self, timeout: float) -> str:
+        """Wait up to timeout seconds for output or for the command to exit"""
+        if self.reader.closed:
+            # the command closed its output, so we only need to wait for it to exit
+            try:
+                self.proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                pass
+            return ""
+        return self.reader.read(min(timeout, POLL_INTERVAL))
+
+    def drain(self) -> str:
+        """Read any remaining output, without waiting on background processes which share the pipe"""
+        return self.reader.drain()
+
+    def stop(self) -> None:
+        self.proc.terminate()
+
+    def close(self) -> None:
+        self.reader.close()
+        self.proc.stdout.close()
+
+
 def shell(
     command: str,
     notifier: Notifier,
     exchange_view: ExchangeView,
     cwd: Optional[str] = None,
     env: Optional[Mapping[str, str]] = None,
+    session: Optional["ShellSession"] = None,
 ) -> str:
     """Execute a command on the shell
 
-    This handles
+    The command runs in a fresh shell, or in the session if one is passed so that changes to the
+    working directory and environment carry over between commands.
+
+    This handles confirming dangerous commands with the user, and stopping commands which
+    appear to be stuck, such as commands waiting for input or running a server.
+    Long output is cut down to its start and end, with the full output written to a file.
     """
     if is_dangerous_command(command):
-        # Stop the notifications so we can prompt
-        notifier.stop()
-        if not keep_unsafe_command_prompt(command):
-            raise RuntimeError(
-                f"The command {command} was rejected as dangerous by the user."
-                " Do not proceed further, instead ask for instructions."
-            )
-        notifier.start()
+        confirm_unsafe_command(command, notifier)
     notifier.status("running shell command")
 
     # Define patterns that might indicate the process is waiting for input
@@ -81,69 +200,72 @@ def shell(
     ]
     compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in interaction_patterns]
 
-    proc = subprocess.Popen(
-        command,
-        shell=True,
-        stdin=subprocess.DEVNULL,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        cwd=cwd,
-        env=env,
-    )
-    # this enables us to read lines without blocking
-    os.set_blocking(proc.stdout.fileno(), False)
+    running = session.start(command, cwd=cwd, env=env) if session is not None else ShellProcess(command, cwd, env)
+    detector = StuckDetector(command, running.pid)
 
     # Accumulate the output logs while checking if it might be blocked
-    output_lines = []
-    last_output_time = time.time()
+    capture = OutputCapture()
+    current_line = ""
+    last_output_time = time.monotonic()
     cutoff = 10
-    while proc.poll() is None:
-        notifier.status("running shell command")
-        line = proc.stdout.readline()
-        if line:
-            output_lines.append(line)
-            last_output_time = time.time()
-
-        # If we see a clear pattern match, we plan to abort
-        exit_criteria = any(pattern.search(line) for pattern in compiled_patterns)
-
-        # and if we haven't seen a new line in 10+s, check with AI to see if it may be stuck
-        if not exit_criteria and time.time() - last_output_time > cutoff:
-            notifier.status("checking on shell status")
-            response = ask_an_ai(
-                input="\n".join([command] + output_lines),
-                prompt=(
-                    "You will evaluate the output of shell commands to see if they may be stuck."
-                    " Look for commands that appear to be awaiting user input, or otherwise running indefinitely (such as a web service)."  # noqa
-                    " A command that will take a while, such as downloading resources is okay."  # noqa
-                    " return [Yes] if stuck, [No] otherwise."
-                ),
-                exchange=exchange_view.processor,
-                with_tools=False,
-            )
-            exit_criteria = "[yes]" in response.content[0].text.lower()
-            # We add exponential backoff for how often we check for the command being stuck
-            cutoff *= 10
-
-        if exit_criteria:
-            proc.terminate()
-            raise ValueError(
-                f"The command `{command}` looks like it will run indefinitely or is otherwise stuck."
-                f"You may be able to specify inputs if it applies to this command."
-                f"Otherwise to enable continued iteration, you'll need to ask the user to run this command in another terminal."  # noqa
-            )
+    try:
+        while not running.done():
+            # wait for output, waking up in time to check whether the command is stuck
+            chunk = running.read(max(0.0, last_output_time + cutoff - time.monotonic()))
+
+            exit_criteria = False
+            if chunk:
+                capture.write(chunk)
+                last_output_time = time.monotonic()
+                # If we see a clear pattern match, we plan to abort. prompts often don't end in a
+                # newline, so we also look at the unfinished line
+                recent = current_line + chunk
+                current_line = recent.rsplit("\n", 1)[-1]
+                exit_criteria = any(pattern.search(recent) for pattern in compiled_patterns)
+
+            # and if we haven't seen a new line in 10+s, check if it may be stuck. we can usually tell from
+            # the command and its processes, and only ask the fast model when we can't
+            if not exit_criteria and not running.done() and time.monotonic() - last_output_time > cutoff:
+                notifier.status("checking on shell status")
+                verdict = detector.check(capture.text)
+                if verdict == "unsure":
+                    response = ask_an_ai(
+                        input="\n".join([command, capture.text]),
+                        prompt=(
+                            "You will evaluate the output of shell commands to see if they may be stuck."
+                            " Look for commands that appear to be awaiting user input, or otherwise running indefinitely (such as a web service)."  # noqa
+                            " A command that will take a while, such as downloading resources is okay."  # noqa
+                            " return [Yes] if stuck, [No] otherwise."
+                        ),
+                        exchange=exchange_view.accelerator,
+                        with_tools=False,
+                    )
+                    exit_criteria = "[yes]" in response.content[0].text.lower()
+                else:
+                    exit_criteria = verdict == "stuck"
+                # We add exponential backoff for how often we check for the command being stuck
+                cutoff *= 10
+                notifier.status("running shell command")
+
+            if exit_criteria:
+                running.stop()
+                raise ValueError(
+                    f"The command `{command}` looks like it will run indefinitely or is otherwise stuck."
+                    f"You may be able to specify inputs if it applies to this command."
+                    f"Otherwise to enable continued iteration, you'll need to ask the user to run this command in another terminal."  # noqa
+                )
 
-    # read any remaining lines
-    while line := proc.stdout.readline():
-        output_lines.append(line)
-    output = "".join(output_lines)
+        capture.write(running.drain())
+    finally:
+        running.close()
+        capture.close()
+    output = capture.text
 
     # Determine the result based on the return code
-    if proc.returncode == 0:
+    if running.returncode == 0:
         result = "Command succeeded"
     else:
-        result = f"Command failed with returncode {proc.returncode}"
+        result = f"Command failed with returncode {running.returncode}"
 
     # Return the combined result and outputs if we made it this far
     return "\n".join([result, output])
@@ -0,0 +1,208 @@
+import atexit
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+from typing import Mapping, Optional
+
+from goose.utils.shell import OutputReader
+
+# set this to 1 to run shell commands in one persistent shell, or to the shell to use such as zsh
+SHELL_SESSION_ENV_VAR = "GOOSE_SHELL_SESSION"
+
+
+class ShellSession:
+    """A long lived shell which runs commands one after another
+
+    Changes a command makes to the shell, such as changing directory, activating a virtualenv or
+    sourcing a file, carry over to the commands after it, and no process is started per command.
+    Each command is followed by a line with a sentinel, its exit code and the working directory,
+    which marks the end of its output.
+
+    Commands run one at a time, a command waits for the one before it to finish. If a command has
+    to be stopped, or it exits the shell, the shell is replaced by a new one in the last known
+    working directory, losing any other state.
+    """
+
+    def __init__(self, executable: Optional[str] = None) -> None:
+        self.executable = executable or "bash"
+        self.cwd: Optional[str] = None
+        self.sentinel = f"__goose_done_{uuid.uuid4().hex}__"
+        self._proc: Optional[subprocess.Popen] = None
+        self._reader: Optional[OutputReader] = None
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _arguments(self) -> list[str]:
+        # skip the startup files, which may prompt or print, like a fresh /bin/sh would
+        name = Path(self.executable).name
+        if name == "bash":
+            return [self.executable, "--noprofile", "--norc"]
+        if name == "zsh":
+            return [self.executable, "-f"]
+        return [self.executable]
+
+    def _ensure_started(self, cwd: Optional[str], env: Optional[Mapping[str, str]]) -> None:
+        if self.alive:
+            return
+        self._discard()
+        self._proc = subprocess.Popen(
+            self._arguments(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=cwd or self.cwd,
+            env=env,
+            # a process group of its own, so that a stuck command can be stopped along with the shell
+            start_new_session=True,
+        )
+        self._reader = OutputReader(self._proc.stdout)
+
+    def start(
+        self,
+        command: str,
+        cwd: Optional[str] = None,
+        env: Optional[Mapping[str, str]] = None,
+    ) -> "SessionCommand":
+        """Start running the command, the environment is only used if a new shell has to be started"""
+        self._lock.acquire()
+        try:
+            self._ensure_started(cwd, env)
+            script = ""
+            if cwd is not None and cwd != self.cwd:
+                script += f"cd -- {shlex.quote(cwd)} && "
+            # eval keeps a syntax error in the command from ending the shell, and the command
+            # must not read from stdin since that is where the shell reads the next command
+            script += (
+                f"eval -- {shlex.quote(command)} < /dev/null 2>&1\n"
+                f'printf \'\\n%s %d %s\\n\' {self.sentinel} "$?" "$PWD"\n'
+            )
+            self._proc.stdin.write(script.encode("utf-8"))
+            self._proc.stdin.flush()
+        except BaseException:
+            self._discard()
+            self._lock.release()
+            raise
+        return SessionCommand(self, self._proc, self._reader)
+
+    def _finish(self, cwd: Optional[str]) -> None:
+        if cwd is not None:
+            self.cwd = cwd
+        self._lock.release()
+
+    def interrupt(self) -> None:
+        """Stop the running command, which also stops the shell"""
+        if self.alive:
+            try:
+                os.killpg(self._proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self._proc.wait()
+        self._discard()
+
+    def _discard(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._proc is not None:
+            for stream in (self._proc.stdin, self._proc.stdout):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            self._proc = None
+
+    def close(self) -> None:
+        """End the shell, stopping any command which is still running"""
+        if self.alive:
+            try:
+                self._proc.stdin.write(b"exit\n")
+                self._proc.stdin.flush()
+                self._proc.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                self.interrupt()
+        self._discard()
+
+
+class SessionCommand:
+    """A command running in a ShellSession, read like a ShellProcess"""
+
+    def __init__(self, session: ShellSession, proc: subprocess.Popen, reader: OutputReader) -> None:
+        self.session = session
+        self.proc = proc
+        self.reader = reader
+        self.returncode: Optional[int] = None
+        self._marker = f"\n{session.sentinel} "
+        self._buffer = ""
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    def done(self) -> bool:
+        return self.returncode is not None
+
+    def read(self, timeout: float) -> str:
+        """Wait up to timeout seconds for output, returning the output up to the sentinel"""
+        if self.done():
+            return ""
+        self._buffer += self.reader.read(timeout)
+
+        index = self._buffer.find(self._marker)
+        if index >= 0 and "\n" in self._buffer[index + len(self._marker) :]:
+            status_line = self._buffer[index + len(self._marker) :].split("\n", 1)[0]
+            returncode, cwd = status_line.split(" ", 1)
+            self.returncode = int(returncode)
+            output = self._buffer[:index]
+            self._buffer = ""
+            self.session._finish(cwd)
+            return output
+
+        if self.reader.closed:
+            # the command exited the shell, so there is no sentinel
+            self.returncode = self.proc.wait()
+            output, self._buffer = self._buffer, ""
+            self.session._discard()
+            self.session._finish(None)
+            return output
+
+        # hold back anything which could be the start of the sentinel
+        keep = len(self._marker) if index < 0 else len(self._buffer) - index
+        output, self._buffer = self._buffer[: max(len(self._buffer) - keep, 0)], self._buffer[-keep:]
+        return output
+
+    def drain(self) -> str:
+        return ""
+
+    def stop(self) -> None:
+        if not self.done():
+            self.returncode = -signal.SIGKILL
+            self.session.interrupt()
+            self.session._finish(None)
+
+    def close(self) -> None:
+        # release the session if the command was abandoned, for example by an error while reading
+        self.stop()
+
+
+def session_from_env() -> Optional[ShellSession]:
+    """Create a shell session if GOOSE_SHELL_SESSION enables one
+
+    The variable can be set to 1 or true for bash, or to the shell to use such as zsh.
+    """
+    value = os.environ.get(SHELL_SESSION_ENV_VAR, "").strip()
+    if value.lower() in ("", "0", "false", "no"):
+        return None
+    executable = "bash" if value.lower() in ("1", "true", "yes") else value
+    if shutil.which(executable) is None:
+        raise ValueError(f"{SHELL_SESSION_ENV_VAR} is set to {value}, but {executable} was not found")
+    session = ShellSession(executable)
+    atexit.register(session.close)
+    return session
@@ -0,0 +1,170 @@
+import os
+import re
+import time
+from pathlib import Path
+from typing import Literal, Optional
+
+from attrs import define
+
+Verdict = Literal["stuck", "running", "unsure"]
+
+# commands which keep running until they are stopped
+LONG_RUNNING_COMMANDS = [
+    r"\b(npm|pnpm|yarn|bun)\s+(run\s+)?(start|dev|serve|watch)\b",
+    r"\bpython[\d.]*\s+-m\s+http\.server\b",
+    r"\b(flask|rails|hugo)\s+(run|s|server)\b",
+    r"\b(uvicorn|gunicorn|hypercorn|nodemon|vite|http-server|live-server)\b",
+    r"\bmanage\.py\s+runserver\b",
+    r"\bjupyter\s+(notebook|lab)\b",
+    r"\bdocker(-compose|\s+compose)\s+up\b(?!.*(\s-d\b|--detach))",
+    r"\btail\s+(-\w*f|--follow)",
+    r"\bwatch\s",
+    r"--watch\b",
+    r"\b(top|htop|less|more|vim?|nano|emacs)\b\s*($|[|;&])",
+    r"\bping\b(?!.*\s-c\s*\d)",
+]
+
+# the last line of output looks like a prompt waiting for an answer
+PROMPT_PATTERNS = [
+    r"\[y/n\]\s*$",
+    r"\(y/n\)\s*$",
+    r"\(yes/no(/\[fingerprint\])?\)\??\s*$",
+    r"password( for \S+)?:\s*$",
+    r"passphrase.*:\s*$",
+    r"continue\?\s*$",
+    r"press (enter|return|any key)",
+]
+
+# kernel functions a process sleeps in while it reads from a terminal
+TTY_READ_WAIT_CHANNELS = ("n_tty_read", "tty_read", "wait_woken")
+
+PROC_PATH = Path("/proc")
+
+# how long to watch the processes for CPU or IO activity
+ACTIVITY_WINDOW = 1.0
+
+
+@define
+class ProcessSample:
+    """The state and activity of a process, read from /proc"""
+
+    pid: int
+    state: str
+    cpu_ticks: int
+    rss_bytes: int
+    io_bytes: Optional[int]
+    reading_tty: bool
+
+
+def read_process_sample(pid: int) -> Optional[ProcessSample]:
+    """Read the state of the process from /proc, returning None if it has exited"""
+    try:
+        stat = (PROC_PATH / str(pid) / "stat").read_text()
+    except OSError:
+        return None
+    # the command name can contain spaces and parentheses, so we split after the last one
+    fields = stat[stat.rindex(")") + 2 :].split()
+    state = fields[0]
+    cpu_ticks = int(fields[11]) + int(fields[12])
+    rss_bytes = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+
+    try:
+        io = dict(line.split(": ") for line in (PROC_PATH / str(pid) / "io").read_text().splitlines())
+        io_bytes = int(io["rchar"]) + int(io["wchar"])
+    except (OSError, KeyError, ValueError):
+        io_bytes = None
+
+    return ProcessSample(pid, state, cpu_ticks, rss_bytes, io_bytes, state == "S" and _is_reading_tty(pid))
+
+
+def _is_reading_tty(pid: int) -> bool:
+    try:
+        wait_channel = (PROC_PATH / str(pid) / "wchan").read_text().strip()
+    except OSError:
+        wait_channel = ""
+    if wait_channel and wait_channel != "0" and wait_channel not in TTY_READ_WAIT_CHANNELS:
+        return False
+
+    # without the wait channel, a sleeping process with a terminal open is likely prompting on it
+    try:
+        fds = list((PROC_PATH / str(pid) / "fd").iterdir())
+    except OSError:
+        return False
+    for fd in fds:
+        try:
+            target = os.readlink(fd)
+        except OSError:
+            continue
+        if target == "/dev/tty" or target.startswith("/dev/pts/"):
+            return True
+    return False
+
+
+def process_tree(pid: int) -> list[int]:
+    """The process and all of its descendants"""
+    children: dict[int, list[int]] = {}
+    for entry in PROC_PATH.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        parent = int(stat[stat.rindex(")") + 2 :].split()[1])
+        children.setdefault(parent, []).append(int(entry.name))
+
+    tree = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+class StuckDetector:
+    """Decides locally whether a quiet shell command is stuck, where it can
+
+    A command is stuck if it is known to run until stopped, if its output ends in a prompt, or if
+    one of its processes is waiting to read from a terminal. It is running if its processes use
+    any CPU or do any IO over a short window. Otherwise it is left to a model to decide.
+    Process state is read from /proc, so on other platforms only the command and output are used.
+    """
+
+    def __init__(self, command: str, pid: int) -> None:
+        self.command = command
+        self.pid = pid
+        self.has_proc = (PROC_PATH / str(pid)).exists()
+
+    def _sample_activity(self) -> tuple[int, int]:
+        samples = [sample for pid in process_tree(self.pid) if (sample := read_process_sample(pid))]
+        return (
+            sum(sample.cpu_ticks for sample in samples),
+            sum(sample.io_bytes or 0 for sample in samples),
+        )
+
+    def _reading_tty(self) -> bool:
+        return any(
+            sample.reading_tty for pid in process_tree(self.pid) if (sample := read_process_sample(pid)) is not None
+        )
+
+    def check(self, output: str) -> Verdict:
+        """Check on the command after it has been quiet for a while"""
+        if any(re.search(pattern, self.command) for pattern in LONG_RUNNING_COMMANDS):
+            return "stuck"
+
+        last_line = output.rstrip("\n").rsplit("\n", 1)[-1].lower()
+        if any(re.search(pattern, last_line) for pattern in PROMPT_PATTERNS):
+            return "stuck"
+
+        if not self.has_proc:
+            return "unsure"
+
+        if self._reading_tty():
+            return "stuck"
+
+        before = self._sample_activity()
+        time.sleep(ACTIVITY_WINDOW)
+        if self._sample_activity() != before:
+            return "running"
+        return "unsure"
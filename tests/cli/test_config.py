@@ -1,7 +1,16 @@
-from unittest.mock import patch
+import os
+import time
+from unittest.mock import MagicMock, patch
 
 import pytest
-from goose.cli.config import ensure_config, read_config, session_path, write_config
+from goose.cli.config import (
+    PROVIDER_CACHE_TTL,
+    detect_provider,
+    ensure_config,
+    read_config,
+    session_path,
+    write_config,
+)
 from goose.profile import default_profile
 
 
@@ -90,5 +99,87 @@ def test_ensure_config_get_existing_profile_not_exist(
     }
 
 
+def test_ensure_config_does_not_detect_a_provider_for_an_existing_profile(
+    mock_profile_config_path, profile_factory, mock_default_model_configuration
+):
+    write_config({"default": profile_factory({"provider": "providerA"})})
+
+    ensure_config(name=None)
+
+    mock_default_model_configuration.assert_not_called()
+
+
+@pytest.fixture
+def providers(tmp_path, monkeypatch):
+    for variable in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "OLLAMA_HOST"):
+        monkeypatch.delenv(variable, raising=False)
+    openai = MagicMock(REQUIRED_ENV_VARS=["OPENAI_API_KEY"])
+    openai.is_available.side_effect = lambda timeout: "OPENAI_API_KEY" in os.environ
+    ollama = MagicMock(REQUIRED_ENV_VARS=[])
+    ollama.is_available.return_value = False
+    anthropic = MagicMock(REQUIRED_ENV_VARS=["ANTHROPIC_API_KEY"])
+    anthropic.is_available.side_effect = lambda timeout: "ANTHROPIC_API_KEY" in os.environ
+    registry = {"openai": openai, "ollama": ollama, "anthropic": anthropic}
+    with (
+        patch("goose.cli.config.plugin_registry", return_value=registry),
+        patch("goose.cli.config.PROVIDER_CACHE_PATH", tmp_path / "cache" / "provider.json"),
+    ):
+        yield registry
+
+
+def test_detect_provider_takes_the_first_available(providers, monkeypatch):
+    assert detect_provider() is None
+
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key")
+    assert detect_provider() == "anthropic"
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    assert detect_provider() == "openai"
+
+
+def test_detect_provider_caches_the_result(providers, monkeypatch):
+    providers["ollama"].is_available.return_value = True
+    assert detect_provider() == "ollama"
+    assert providers["ollama"].is_available.call_count == 1
+
+    # the health check is not repeated while the cache is fresh
+    providers["ollama"].is_available.return_value = False
+    assert detect_provider() == "ollama"
+    assert providers["ollama"].is_available.call_count == 1
+
+    with patch("goose.cli.config.time.time", return_value=time.time() + PROVIDER_CACHE_TTL + 1):
+        assert detect_provider() is None
+    assert providers["ollama"].is_available.call_count == 2
+
+
+def test_detect_provider_imports_no_provider_on_a_cache_hit(providers, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    assert detect_provider() == "openai"
+
+    class Unloadable(dict):
+        def __getitem__(self, name):
+            raise AssertionError(f"{name} was loaded")
+
+    with patch("goose.cli.config.plugin_registry", return_value=Unloadable(providers)):
+        assert detect_provider() == "openai"
+
+
+def test_detect_provider_does_not_cache_a_failed_health_check(providers, monkeypatch):
+    assert detect_provider() is None
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key")
+    assert detect_provider() == "anthropic"
+    assert providers["ollama"].is_available.call_count == 2
+
+    # ollama comes before anthropic, so it is checked again once it is running
+    providers["ollama"].is_available.return_value = True
+    assert detect_provider() == "ollama"
+
+
+def test_detect_provider_detects_again_when_the_environment_changes(providers, monkeypatch):
+    assert detect_provider() is None
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    assert detect_provider() == "openai"
+
+
 def test_session_path(mock_sessions_path):
     assert session_path("session1") == mock_sessions_path / "session1.jsonl"
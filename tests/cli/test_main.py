@@ -24,7 +24,7 @@ def mock_session_files_path(tmp_path):
 
 @pytest.fixture
 def mock_session():
-    with patch("goose.cli.main.Session") as mock_session_class:
+    with patch("goose.cli.session.Session") as mock_session_class:
         mock_session_instance = MagicMock()
         mock_session_class.return_value = mock_session_instance
         yield mock_session_class, mock_session_instance
@@ -2,10 +2,14 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 from exchange import Message, ToolResult, ToolUse
+from exchange.moderators.summarizer import ContextSummarizer
+from exchange.moderators.truncate import ContextTruncate
+from exchange.providers.streaming import TextDelta, UsageDelta
 from goose.cli.prompt.goose_prompt_session import GoosePromptSession
 from goose.cli.prompt.user_input import PromptAction, UserInput
 from goose.cli.session import Session
 from prompt_toolkit import PromptSession
+from rich.markdown import Markdown
 
 SPECIFIED_SESSION_NAME = "mySession"
 SESSION_NAME = "test"
@@ -63,6 +67,38 @@ def test_session_adds_resume_message_if_last_message_is_tool_result(
     assert session.exchange.messages[-1].text == "I see we were interrupted. How can I help you?"
 
 
+def test_session_resumes_with_the_tail_that_fits_the_moderator(
+    create_session_with_mock_configs, mock_sessions_path, create_session_file, exchange_factory
+):
+    messages = []
+    for turn in range(10):
+        messages += [Message.user(f"question {turn} " + "x" * 400), Message.assistant(f"answer {turn}")]
+    create_session_file(messages, mock_sessions_path / f"{SESSION_NAME}.jsonl")
+
+    exchange = exchange_factory({"moderator": ContextTruncate(max_tokens=250)})
+    with patch("goose.cli.session.create_exchange", return_value=exchange):
+        session = create_session_with_mock_configs({"name": SESSION_NAME})
+
+    loaded = len(session.exchange.messages)
+    assert 0 < loaded < len(messages)
+    assert session.exchange.messages == messages[-loaded:]
+
+
+def test_session_resumes_with_everything_for_a_summarizer(
+    create_session_with_mock_configs, mock_sessions_path, create_session_file, exchange_factory
+):
+    messages = []
+    for turn in range(10):
+        messages += [Message.user(f"question {turn} " + "x" * 400), Message.assistant(f"answer {turn}")]
+    create_session_file(messages, mock_sessions_path / f"{SESSION_NAME}.jsonl")
+
+    exchange = exchange_factory({"moderator": ContextSummarizer(max_tokens=250)})
+    with patch("goose.cli.session.create_exchange", return_value=exchange):
+        session = create_session_with_mock_configs({"name": SESSION_NAME})
+
+    assert session.exchange.messages == messages
+
+
 def test_session_removes_tool_use_and_adds_resume_message_if_last_message_is_tool_use(
     create_session_with_mock_configs, mock_sessions_path, create_session_file
 ):
@@ -151,3 +187,20 @@ def test_existing_session_prompt(mock_prompt, mock_is_existing, create_session_w
     check_prompt_behavior(is_existing=False, new_session=None, should_prompt=False)
     check_prompt_behavior(is_existing=True, new_session=True, should_prompt=True)
     check_prompt_behavior(is_existing=False, new_session=False, should_prompt=False)
+
+
+def test_generate_previews_streamed_text(create_session_with_mock_configs):
+    provider = MagicMock()
+    provider.stream.return_value = iter([TextDelta("Hello"), TextDelta(" there"), UsageDelta(10, 5, 15)])
+    session = create_session_with_mock_configs({"name": SESSION_NAME})
+    session.exchange = session.exchange.replace(provider=provider)
+    session.exchange.add(Message.user("Hi"))
+
+    response = session.generate()
+
+    assert response.text == "Hello there"
+    assert session.exchange.messages[-1] is response
+    previews = [call.args[0] for call in session.notifier.preview.call_args_list]
+    assert isinstance(previews[0], Markdown)
+    # the preview is cleared once the message is complete
+    assert previews[-1] is None
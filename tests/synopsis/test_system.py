@@ -1,7 +1,11 @@
 import os
+import re
+import subprocess
+import time
 from unittest.mock import Mock
 import pytest
 from goose.synopsis.system import OperatingSystem
+from goose.utils.output_capture import READ_BYTES
 
 
 @pytest.fixture
@@ -67,6 +71,7 @@ def test_get_processes(os_instance):
     process1.args = "python -m http.server 8000"
     process1.stdout = Mock()
     process1.stdout.fileno.return_value = 1
+    process1.poll.return_value = None
     os_instance.add_process(process1)
 
     process2 = Mock()
@@ -74,6 +79,7 @@ def test_get_processes(os_instance):
     process2.args = "python script.py"
     process2.stdout = Mock()
     process2.stdout.fileno.return_value = 2
+    process2.poll.return_value = None
     os_instance.add_process(process2)
 
     processes = os_instance.get_processes()
@@ -91,3 +97,63 @@ def test_cancel_process(os_instance):
     assert result is True
     assert 1234 not in os_instance._processes
     process.terminate.assert_called_once()
+
+
+def start(os_instance, command):
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    return os_instance.add_process(process), process
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_chatty_process_does_not_block(os_instance):
+    # far more than a pipe holds, this would block if nothing read it
+    process_id, process = start(os_instance, "yes x | head -c 2000000; echo done")
+    assert process.wait(timeout=10) == 0
+    assert wait_for(lambda: os_instance._processes[process_id].output.end >= 2000005)
+    output = os_instance.view_process_output(process_id)
+    assert output.startswith("[")
+    assert "earlier output were dropped" in output
+    assert output.endswith("more bytes of output, view the output again to read on]\n")
+
+    # the rest is read in pieces which each fit in a tool output, without losing any of it
+    outputs = [output]
+    while "more bytes of output" in outputs[-1]:
+        outputs.append(os_instance.view_process_output(process_id))
+    assert all(len(output) < 13000 for output in outputs)
+    assert outputs[-1].endswith("x\ndone\n")
+    read = "".join(re.sub(r"^\[[^]]*\]\n|\[[^]]*\]\n$", "", output) for output in outputs)
+    assert len(read) == 1024 * 1024
+
+
+def test_view_process_output_since_last_view(os_instance):
+    process_id, _ = start(os_instance, "echo one; echo two; sleep 0.5; echo three; sleep 30")
+    assert wait_for(lambda: os_instance._processes[process_id].output.end >= 8)
+    assert os_instance.view_process_output(process_id) == "one\ntwo\n"
+    assert wait_for(lambda: os_instance._processes[process_id].output.end >= 14)
+    assert os_instance.view_process_output(process_id) == "three\n"
+    assert os_instance.view_process_output(process_id) == ""
+    assert os_instance.view_process_output(process_id, tail=2) == "two\nthree\n"
+    os_instance.cancel_process(process_id)
+
+
+def test_view_process_output_tail_is_capped(os_instance):
+    process_id, _ = start(os_instance, "for i in $(seq 1 5000); do echo line $i; done; sleep 30")
+    assert wait_for(lambda: os_instance._processes[process_id].output.end >= 48893)
+    output = os_instance.view_process_output(process_id, tail=5000)
+    assert len(output.encode()) <= READ_BYTES
+    assert output.startswith("line ")
+    assert output.endswith("line 4999\nline 5000\n")
+    os_instance.cancel_process(process_id)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc"), reason="reads process usage from /proc")
+def test_get_processes_includes_usage(os_instance):
+    process_id, _ = start(os_instance, "sleep 30")
+    assert re.match(r"sleep 30 \(running, cpu [\d.]+s, rss [\d.]+ MiB\)", os_instance.get_processes()[process_id])
+    os_instance.cancel_process(process_id)
@@ -1,4 +1,6 @@
-from goose.profile import ToolkitSpec
+import pytest
+
+from goose.profile import CacheSpec, RateLimitSpec, ToolkitSpec
 
 
 def test_profile_info(profile_factory):
@@ -10,3 +12,25 @@ def test_profile_info(profile_factory):
         }
     )
     assert profile.profile_info() == "provider:provider, processor:processor toolkits: developer, github"
+
+
+def test_profile_cache_from_dict(profile_factory):
+    profile = profile_factory({"cache": {"mode": "replay", "ttl": None}})
+    assert profile.cache == CacheSpec(mode="replay", ttl=None)
+    assert profile.to_dict()["cache"]["mode"] == "replay"
+
+
+def test_profile_without_cache_omits_it(profile_factory):
+    assert "cache" not in profile_factory().to_dict()
+
+
+def test_profile_cache_rejects_unknown_mode(profile_factory):
+    with pytest.raises(ValueError):
+        profile_factory({"cache": {"mode": "sometimes"}})
+
+
+def test_profile_rate_limit_from_dict(profile_factory):
+    profile = profile_factory({"rate_limit": {"tokens_per_minute": 30000, "models": {"small": {"max_concurrency": 2}}}})
+    assert profile.rate_limit == RateLimitSpec(tokens_per_minute=30000, models={"small": {"max_concurrency": 2}})
+    assert profile.to_dict()["rate_limit"]["tokens_per_minute"] == 30000
+    assert "rate_limit" not in profile_factory().to_dict()
@@ -177,3 +177,8 @@ def test_write_file_prevent_write_if_changed(temp_dir, developer_toolkit):
     with pytest.raises(RuntimeError, match="has been modified"):
         developer_toolkit.write_file(test_file.as_posix(), content)
     assert test_file.read_text() == updated_content
+
+
+def test_only_read_only_tools_run_in_parallel(developer_toolkit):
+    parallel = {tool.name for tool in developer_toolkit.tools() if tool.parallel_safe}
+    assert parallel == {"read_file", "fetch_web_content"}
@@ -0,0 +1,67 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from goose.toolkit.repo_context.utils import goose_picks_files, is_skipped_directory, process_directory
+
+
+def make_tree(root, paths):
+    for path in paths:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("content")
+
+
+def pick_everything(input, exchange):
+    return MagicMock(text=input)
+
+
+def test_is_skipped_directory():
+    assert is_skipped_directory("node_modules")
+    assert is_skipped_directory("__pycache__")
+    assert not is_skipped_directory("src")
+    # these often hold real source
+    assert not is_skipped_directory("bin")
+    assert not is_skipped_directory("build")
+    assert not is_skipped_directory("external")
+
+
+def test_process_directory_prefilter(tmp_path):
+    make_tree(tmp_path, ["main.py", "src/app.py", "node_modules/lib.js", "__pycache__/main.pyc"])
+    with patch("goose.toolkit.repo_context.utils.ask_an_ai", side_effect=pick_everything) as ask:
+        files, next_dirs = process_directory(str(tmp_path), MagicMock(), prefilter=True)
+    assert files == [f"{tmp_path}/main.py"]
+    assert next_dirs == [f"{tmp_path}/src"]
+    assert "node_modules" not in ask.call_args.args[0]
+
+
+def test_process_directory_follows_a_lone_directory_without_asking(tmp_path):
+    make_tree(tmp_path, ["src/main/java/App.java"])
+    with patch("goose.toolkit.repo_context.utils.ask_an_ai") as ask:
+        assert process_directory(str(tmp_path), MagicMock(), prefilter=True) == ([], [f"{tmp_path}/src"])
+    ask.assert_not_called()
+
+
+def test_goose_picks_files_walks_the_picked_directories(tmp_path):
+    make_tree(tmp_path, ["main.py", "src/app.py", "src/lib/util.py", "node_modules/dep.js", "docs/index.md"])
+    with patch("goose.toolkit.repo_context.utils.ask_an_ai", side_effect=pick_everything):
+        files = goose_picks_files(str(tmp_path), MagicMock())
+    assert sorted(files) == sorted(
+        [f"{tmp_path}/main.py", f"{tmp_path}/src/app.py", f"{tmp_path}/src/lib/util.py", f"{tmp_path}/docs/index.md"]
+    )
+
+
+def test_goose_picks_files_does_not_wait_on_a_slow_directory(tmp_path):
+    make_tree(tmp_path, ["main.py", "slow/a.py", "fast/b.py", "fast/deeper/c.py", "fast/deeper/deepest/d.py"])
+    order = []
+
+    def ask(input, exchange):
+        if "'a.py'" in input:
+            time.sleep(0.5)
+        order.append(input)
+        return MagicMock(text=input)
+
+    with patch("goose.toolkit.repo_context.utils.ask_an_ai", side_effect=ask):
+        files = goose_picks_files(str(tmp_path), MagicMock(), max_workers=2, prefilter=False)
+
+    assert len(files) == 5
+    # the fast branch finished all of its levels while the slow directory was still being asked about
+    assert "'a.py'" in order[-1]
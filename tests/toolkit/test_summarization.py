@@ -0,0 +1,154 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from exchange.providers.utils import InitialMessageTooLargeError
+from exchange.token_counter import get_tokenizer_service
+from goose.toolkit.summarization.utils import (
+    SummaryStore,
+    refresh_file_list,
+    split_into_chunks,
+    summarize_file,
+    summarize_files_concurrent,
+    summarize_text,
+)
+
+
+@pytest.fixture
+def exchange():
+    exchange = MagicMock()
+    exchange.model = "gpt-4o-mini"
+    return exchange
+
+
+@pytest.fixture
+def ask_an_ai():
+    with patch("goose.toolkit.summarization.utils.ask_an_ai") as mock:
+        mock.side_effect = lambda input, exchange, prompt: MagicMock(text=f"summary of {input}")
+        yield mock
+
+
+def test_summary_store_key_depends_on_content_prompt_and_model():
+    key = SummaryStore.key("content", "prompt", "model")
+    assert key == SummaryStore.key("content", "prompt", "model")
+    assert key != SummaryStore.key("changed", "prompt", "model")
+    assert key != SummaryStore.key("content", "other prompt", "model")
+    assert key != SummaryStore.key("content", "prompt", "other model")
+
+
+def test_summary_store_round_trip(tmp_path):
+    store = SummaryStore(tmp_path)
+    key = SummaryStore.key("content", "prompt", "model")
+    assert store.get(key) is None
+    store.put(key, "a summary")
+    assert SummaryStore(tmp_path).get(key) == "a summary"
+
+
+def test_summarize_file_only_asks_again_when_the_file_changes(tmp_path, exchange, ask_an_ai):
+    store = SummaryStore(tmp_path / "store")
+    path = tmp_path / "a.py"
+    path.write_text("one")
+
+    assert summarize_file(str(path), exchange, store=store) == (str(path), "summary of one")
+    assert summarize_file(str(path), exchange, store=store) == (str(path), "summary of one")
+    assert ask_an_ai.call_count == 1
+
+    path.write_text("two")
+    assert summarize_file(str(path), exchange, store=store) == (str(path), "summary of two")
+    assert ask_an_ai.call_count == 2
+
+
+def test_summarize_files_concurrent_refreshes_changed_files(tmp_path, monkeypatch, exchange, ask_an_ai):
+    monkeypatch.chdir(tmp_path)
+    for name in ("a.py", "b.py", "c.py"):
+        (tmp_path / name).write_text(name)
+
+    summaries = summarize_files_concurrent(exchange, ["a.py", "b.py", "c.py"], "project")
+    assert summaries == {"a.py": "summary of a.py", "b.py": "summary of b.py", "c.py": "summary of c.py"}
+    assert ask_an_ai.call_count == 3
+
+    (tmp_path / "b.py").write_text("changed")
+    (tmp_path / "d.py").write_text("d.py")
+    summaries = summarize_files_concurrent(exchange, ["a.py", "b.py", "d.py"], "project")
+    assert summaries == {"a.py": "summary of a.py", "b.py": "summary of changed", "d.py": "summary of d.py"}
+    assert ask_an_ai.call_count == 5
+
+
+def test_split_into_chunks_keeps_definitions_together():
+    text = "".join(f"def function_{i}():\n    return {i}\n\n" for i in range(50))
+    chunks = split_into_chunks(text, 100)
+    assert "".join(chunks) == text
+    assert len(chunks) > 1
+    assert all(chunk.startswith("def ") for chunk in chunks)
+
+
+def test_split_into_chunks_splits_long_lines():
+    text = "x" * 1000
+    chunks = split_into_chunks(text, 100)
+    assert "".join(chunks) == text
+    assert len(chunks) > 1
+    assert not any(get_tokenizer_service().exceeds(chunk, 100) for chunk in chunks)
+
+
+def test_summarize_text_reduces_the_summaries_of_chunks(tmp_path, exchange, ask_an_ai):
+    store = SummaryStore(tmp_path)
+    text = "".join(f"def function_{i}():\n    return {i}\n\n" for i in range(50))
+
+    summary = summarize_text(text, exchange, "Summarize.", name="big.py", store=store, max_tokens=200)
+    assert summary.startswith("summary of Part 1:")
+    chunk_calls = ask_an_ai.call_count - 1
+    assert chunk_calls > 1
+
+    # an edit to one chunk only asks about that chunk and the combined summary again
+    edited = text.replace("return 49", "return -49")
+    summarize_text(edited, exchange, "Summarize.", name="big.py", store=store, max_tokens=200)
+    assert ask_an_ai.call_count == chunk_calls + 1 + 2
+
+
+def test_summarize_text_retries_smaller_chunks_when_the_provider_rejects_them(exchange):
+    def ask(input, exchange, prompt):
+        if len(input) > 4000:
+            raise InitialMessageTooLargeError("too long")
+        return MagicMock(text="summary")
+
+    text = "".join(f"def function_{i}():\n    return {i}\n\n" for i in range(500))
+    with patch("goose.toolkit.summarization.utils.ask_an_ai", side_effect=ask):
+        assert summarize_text(text, exchange, "Summarize.", max_tokens=100_000) == "summary"
+
+
+def test_refresh_file_list_picks_up_added_and_deleted_files(tmp_path):
+    for name in ("src/a.py", "src/b.py", "src/notes.md", "docs/c.py", "main.py"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+    summary = {f"{tmp_path}/src/a.py": "a", f"{tmp_path}/src/gone.py": "gone"}
+
+    # new files in the picked directories with the same extensions, and not the deleted one
+    assert refresh_file_list(str(tmp_path), summary) == [f"{tmp_path}/src/a.py", f"{tmp_path}/src/b.py"]
+
+
+def test_refresh_file_list_of_a_directory_summary(tmp_path):
+    for name in ("src/a.py", "docs/c.py", "notes.md"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+    summary = {"extensions": [".py"], "summaries": {f"{tmp_path}/src/a.py": "a"}}
+
+    assert refresh_file_list(str(tmp_path), summary) == [f"{tmp_path}/docs/c.py", f"{tmp_path}/src/a.py"]
+
+
+def test_summarize_current_project_refreshes_a_directory_summary(tmp_path, monkeypatch, exchange, ask_an_ai):
+    from goose.toolkit.repo_context.repo_context import RepoContext
+
+    project = tmp_path / "project"
+    (project / ".goose" / "summaries").mkdir(parents=True)
+    (project / "a.py").write_text("a")
+    (project / "new.py").write_text("new")
+    summary = {"extensions": [".py"], "summaries": {f"{project}/a.py": "old", f"{project}/gone.py": "gone"}}
+    (project / ".goose" / "summaries" / "project-summary.json").write_text(json.dumps(summary))
+    monkeypatch.chdir(project)
+
+    with patch("goose.toolkit.repo_context.repo_context.clear_exchange", return_value=exchange):
+        toolkit = RepoContext(notifier=MagicMock(), requires=MagicMock())
+        toolkit.exchange_view = MagicMock()
+        summaries = toolkit.summarize_current_project()
+
+    assert summaries == {f"{project}/a.py": "summary of a", f"{project}/new.py": "summary of new"}
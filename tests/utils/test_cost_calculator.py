@@ -16,6 +16,19 @@ def test_calculate_cost(mock_prices):
     assert cost == 0.059
 
 
+def test_calculate_cost_with_prompt_caching(mock_prices):
+    usage = Usage(
+        input_tokens=10000,
+        output_tokens=600,
+        total_tokens=10600,
+        cache_read_tokens=8000,
+        cache_write_tokens=1000,
+    )
+    cost = _calculate_cost("gpt-4o", usage)
+    # 1000 uncached, 1000 written at 1.25x and 8000 read at 0.1x
+    assert cost == pytest.approx((5.00 * (1000 + 1250 + 800) + 15.00 * 600) / 1000000)
+
+
 def test_get_total_cost_message(mock_prices):
     message = get_total_cost_message(
         {
@@ -1,9 +1,13 @@
+import os
 from unittest.mock import patch
 
 import pytest
+from goose.toolkit.repo_context.utils import get_files_and_directories
 from goose.utils.file_utils import (
     create_extensions_list,
+    create_file_list,
     create_language_weighting,
+    walk_files,
 )  # Adjust the import path as necessary
 
 
@@ -190,3 +194,80 @@ def test_create_language_weighting_mixed_extensions():
     assert result[".txt"] == pytest.approx(expected_result.get(".txt"), 0.01)
     assert result[".md"] == pytest.approx(expected_result.get(".md"), 0.01)
     assert result[".py"] == pytest.approx(expected_result.get(".py"), 0.01)
+
+
+# tests for the file walker
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / ".git" / "info").mkdir(parents=True)
+    (tmp_path / ".git" / "info" / "exclude").write_text("secret.txt\n")
+    (tmp_path / ".gitignore").write_text("# build output\nbuild/\n*.log\n!keep.log\n/top.py\n")
+    for path in [
+        "main.py",
+        "top.py",
+        "debug.log",
+        "keep.log",
+        "secret.txt",
+        "build/out.py",
+        "node_modules/lib/index.js",
+        ".venv/lib.py",
+        "src/app.py",
+        "src/top.py",
+        "src/nested/build/gen.py",
+        "src/nested/util.js",
+    ]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("content")
+    (tmp_path / "src" / ".gitignore").write_text("*.js\n")
+    (tmp_path / "node_modules" / ".gitignore").write_text("*\n")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG\r\n\x00\x00")
+    return tmp_path
+
+
+def relative(files, root):
+    return [os.path.relpath(file, root) for file in files]
+
+
+def test_walk_files_respects_gitignore(project):
+    files = walk_files(str(project))
+    assert relative(files, project) == ["keep.log", "main.py", "src/app.py", "src/top.py"]
+
+
+def test_walk_files_filters_extensions(project):
+    assert relative(walk_files(str(project), ["py"]), project) == ["main.py", "src/app.py", "src/top.py"]
+    assert relative(walk_files(str(project), [".log", ".py"]), project) == [
+        "keep.log",
+        "main.py",
+        "src/app.py",
+        "src/top.py",
+    ]
+
+
+def test_walk_files_without_gitignore(project):
+    files = relative(walk_files(str(project), respect_gitignore=False, skip_binary=False), project)
+    assert "build/out.py" in files
+    assert "node_modules/lib/index.js" in files
+    assert "image.png" in files
+    assert ".venv/lib.py" not in files
+
+
+def test_walk_files_from_a_subdirectory_uses_the_rules_above_it(project):
+    files = walk_files(str(project / "src"))
+    assert relative(files, project / "src") == ["app.py", "top.py"]
+
+
+def test_walk_files_with_threads_matches_a_single_thread(project):
+    assert walk_files(str(project), max_workers=4) == walk_files(str(project))
+
+
+def test_create_file_list_keeps_the_directory_prefix(project, monkeypatch):
+    monkeypatch.chdir(project)
+    assert create_file_list("src", ["py"]) == ["src/app.py", "src/top.py"]
+
+
+def test_get_files_and_directories_leaves_out_ignored_entries(project):
+    assert get_files_and_directories(str(project)) == {
+        "files": ["keep.log", "main.py"],
+        "directories": ["node_modules", "src"],
+    }
+    assert get_files_and_directories(str(project / "missing")) == {"files": [], "directories": []}
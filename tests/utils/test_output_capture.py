@@ -0,0 +1,72 @@
+import os
+from unittest.mock import MagicMock
+
+from goose.utils.output_capture import OutputCapture, OutputRingBuffer
+from goose.utils.shell import shell
+
+
+def test_short_output_is_kept_whole():
+    capture = OutputCapture(head_chars=10, tail_chars=10)
+    capture.write("one\n")
+    capture.write("two\nthree")
+    capture.close()
+    assert not capture.spilled
+    assert capture.text == "one\ntwo\nthree"
+
+
+def test_long_output_keeps_head_and_tail():
+    capture = OutputCapture(head_chars=20, tail_chars=20)
+    lines = [f"line {i}\n" for i in range(100)]
+    for line in lines:
+        capture.write(line)
+    capture.close()
+
+    assert capture.spilled
+    with open(capture.path) as f:
+        assert f.read() == "".join(lines)
+    os.remove(capture.path)
+
+    assert capture.text == (
+        f"line 0\nline 1\n... [96 of 100 lines omitted, the full output is in {capture.path}] ...\nline 98\nline 99\n"
+    )
+
+
+def test_tail_memory_is_bounded():
+    capture = OutputCapture(head_chars=10, tail_chars=100)
+    for _ in range(10000):
+        capture.write("x" * 9 + "\n")
+    capture.close()
+    os.remove(capture.path)
+    assert sum(len(chunk) for chunk in capture.tail) < 200
+    assert capture.line_count == 10000
+
+
+def test_shell_cuts_long_output():
+    result = shell("seq 1 100000", MagicMock(), MagicMock())
+    assert len(result) < 40000
+    assert result.startswith("Command succeeded\n1\n2\n")
+    assert result.endswith("99999\n100000\n")
+    path = result.split("the full output is in ")[1].split("]")[0]
+    with open(path) as f:
+        assert f.read().count("\n") == 100000
+    os.remove(path)
+
+
+def test_ring_buffer_reads_by_offset():
+    buffer = OutputRingBuffer(capacity=8)
+    buffer.write(b"abcd")
+    assert buffer.read(0) == (b"abcd", 4, 0)
+    buffer.write(b"efghij")
+    assert (buffer.start, buffer.end) == (2, 10)
+    assert buffer.read(4) == (b"efghij", 10, 0)
+    assert buffer.read(0) == (b"cdefghij", 10, 2)
+    assert buffer.read(10) == (b"", 10, 0)
+    assert buffer.tail(3) == b"hij"
+
+
+def test_ring_buffer_reads_up_to_a_limit():
+    buffer = OutputRingBuffer(capacity=8)
+    buffer.write(b"abcdefghij")
+    assert buffer.read(0, limit=3) == (b"cde", 5, 2)
+    assert buffer.read(5, limit=3) == (b"fgh", 8, 0)
+    assert buffer.read(8, limit=3) == (b"ij", 10, 0)
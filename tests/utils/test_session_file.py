@@ -3,11 +3,15 @@ from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from exchange import Message, ToolResult, ToolUse
 from goose.utils.session_file import (
+    _lines_backwards,
     is_empty_session,
     list_sorted_session_files,
+    log_messages,
     read_from_file,
     read_or_create_file,
+    read_tail,
     session_file_exists,
 )
 
@@ -35,6 +39,58 @@ def test_read_or_create_file_when_file_not_exist(tmp_path):
     assert os.path.exists(file_path)
 
 
+def test_lines_backwards_across_blocks(file_path):
+    file_path.write_bytes(b"first line\nsecond\n\na much longer third line\n")
+    with open(file_path, "rb") as f:
+        lines = list(_lines_backwards(f, block_size=4))
+    assert lines == [b"", b"a much longer third line", b"", b"second", b"first line"]
+
+
+def conversation(turns: int) -> list[Message]:
+    messages = []
+    for turn in range(turns):
+        messages += [
+            Message.user(f"question {turn} " + "x" * 400),
+            Message(role="assistant", content=[ToolUse(id=str(turn), name="tool", parameters={})]),
+            Message(role="user", content=[ToolResult(tool_use_id=str(turn), output="y" * 400)]),
+            Message.assistant(f"answer {turn}"),
+        ]
+    return messages
+
+
+def test_read_tail_loads_the_most_recent_turns(file_path):
+    messages = conversation(20)
+    log_messages(file_path, messages)
+
+    tail = read_tail(file_path, max_tokens=300)
+
+    assert 0 < len(tail) < len(messages)
+    assert tail == messages[-len(tail) :]
+    assert tail[0].role == "user" and tail[0].text.startswith("question")
+
+
+def test_read_tail_goes_over_the_budget_to_start_a_turn(file_path):
+    messages = conversation(2)
+    log_messages(file_path, messages)
+
+    tail = read_tail(file_path, max_tokens=1)
+
+    assert tail == messages[-4:]
+
+
+def test_read_tail_loads_everything_that_fits(file_path):
+    messages = conversation(3)
+    log_messages(file_path, messages)
+
+    assert read_tail(file_path, max_tokens=100_000) == messages
+
+
+def test_read_tail_non_jsonl_file(file_path):
+    file_path.write_text("Hello World")
+    with pytest.raises(RuntimeError):
+        read_tail(file_path, max_tokens=100)
+
+
 def test_list_sorted_session_files(tmp_path):
     session_files_directory = tmp_path / "session_files_dir"
     session_files_directory.mkdir()
@@ -0,0 +1,95 @@
+import os
+import time
+
+from exchange import Message
+from goose.utils.session_file import log_messages
+from goose.utils.session_index import SessionIndex
+
+
+def write_session(directory, name, lines, mtime):
+    path = directory / f"{name}.jsonl"
+    path.write_text("".join(f"{line}\n" for line in lines))
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_entries_are_most_recent_first(tmp_path):
+    now = time.time()
+    write_session(tmp_path, "old", ["{}"], now - 100)
+    write_session(tmp_path, "new", ["{}", "{}"], now)
+
+    entries = SessionIndex(tmp_path).entries()
+    assert [(entry.name, entry.message_count) for entry in entries] == [("new", 2), ("old", 1)]
+    assert entries[0].path == tmp_path / "new.jsonl"
+    assert SessionIndex(tmp_path).latest().name == "new"
+
+
+def test_entries_filter_by_prefix(tmp_path):
+    for name in ("alpha", "alps", "Alpine", "beta", "al%"):
+        write_session(tmp_path, name, [], time.time())
+
+    assert sorted(entry.name for entry in SessionIndex(tmp_path).entries(prefix="al")) == ["al%", "alpha", "alps"]
+    assert [entry.name for entry in SessionIndex(tmp_path).entries(prefix="al%")] == ["al%"]
+
+
+def test_entries_notice_added_and_removed_files(tmp_path):
+    index = SessionIndex(tmp_path)
+    write_session(tmp_path, "first", [], time.time())
+    assert [entry.name for entry in index.entries()] == ["first"]
+
+    write_session(tmp_path, "second", [], time.time() + 1)
+    (tmp_path / "first.jsonl").unlink()
+    assert [entry.name for entry in index.entries()] == ["second"]
+
+
+def test_entries_without_a_directory(tmp_path):
+    assert SessionIndex(tmp_path / "missing").entries() == []
+    assert not (tmp_path / "missing").exists()
+
+
+def test_log_messages_updates_the_index(tmp_path):
+    path = tmp_path / "session.jsonl"
+    path.touch()
+    index = SessionIndex(tmp_path)
+    assert index.latest().message_count == 0
+
+    log_messages(path, [Message.user("hello"), Message.assistant("hi")], 10, 2, "gpt-4o")
+    log_messages(path, [Message.user("bye")], 5, 1)
+
+    entry = index.latest()
+    assert (entry.message_count, entry.input_tokens, entry.output_tokens, entry.model) == (3, 15, 3, "gpt-4o")
+    assert entry.mtime == path.stat().st_mtime
+
+
+def test_a_file_replaced_by_something_else_loses_its_token_totals(tmp_path):
+    path = tmp_path / "session.jsonl"
+    log_messages(path, [Message.user("hello")], 10, 2, "gpt-4o")
+    index = SessionIndex(tmp_path)
+    assert index.latest().input_tokens == 10
+
+    # rewritten outside of log_messages, and renamed into place so that the directory changes
+    replacement = write_session(tmp_path, "replacement", ["{}", "{}"], time.time() + 10)
+    replacement.rename(path)
+
+    entry = index.latest()
+    assert (entry.message_count, entry.input_tokens, entry.output_tokens, entry.model) == (2, 0, 0, None)
+
+
+def test_remove_deletes_files_and_entries(tmp_path):
+    write_session(tmp_path, "keep", [], time.time())
+    write_session(tmp_path, "drop", [], time.time() - 10)
+    index = SessionIndex(tmp_path)
+
+    index.remove([entry.name for entry in index.entries()[1:]])
+
+    assert [entry.name for entry in index.entries()] == ["keep"]
+    assert not (tmp_path / "drop.jsonl").exists()
+
+
+def test_a_damaged_index_is_rebuilt(tmp_path):
+    write_session(tmp_path, "session", ["{}"], time.time())
+    index = SessionIndex(tmp_path)
+    index.path.parent.mkdir()
+    index.path.write_text("not a database")
+
+    assert [entry.name for entry in index.entries()] == ["session"]
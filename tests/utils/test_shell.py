@@ -0,0 +1,67 @@
+import itertools
+import time
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+from goose.utils.shell import shell
+from goose.utils.stuck_detector import StuckDetector
+
+
+def run(command: str) -> str:
+    return shell(command, MagicMock(), MagicMock())
+
+
+def test_shell_returns_output_and_status():
+    assert run("echo hello; echo world >&2") == "Command succeeded\nhello\nworld\n"
+    assert run("printf partial; exit 3") == "Command failed with returncode 3\npartial"
+
+
+def test_shell_does_not_wait_for_background_processes():
+    start = time.monotonic()
+    assert run("echo started; (sleep 5 &)") == "Command succeeded\nstarted\n"
+    assert time.monotonic() - start < 3
+
+
+def test_shell_stops_commands_waiting_for_input():
+    with pytest.raises(ValueError, match="stuck"):
+        run("printf 'Are you sure? (y/N) '; sleep 5")
+
+
+@contextmanager
+def fast_clock():
+    # every reading of the clock moves it forward by a second, so commands are quiet for long
+    with patch("goose.utils.shell.time") as clock:
+        clock.monotonic.side_effect = itertools.count()
+        yield
+
+
+def test_shell_asks_whether_quiet_commands_are_stuck():
+    response = MagicMock()
+    response.content[0].text = "[Yes]"
+    exchange_view = MagicMock()
+    with (
+        fast_clock(),
+        patch("goose.utils.shell.ask_an_ai", return_value=response) as ask,
+        patch.object(StuckDetector, "check", return_value="unsure"),
+    ):
+        with pytest.raises(ValueError, match="stuck"):
+            shell("echo serving; sleep 5", MagicMock(), exchange_view)
+    assert "serving" in ask.call_args.kwargs["input"]
+    assert ask.call_args.kwargs["exchange"] is exchange_view.accelerator
+
+
+def test_shell_trusts_the_stuck_detector():
+    with fast_clock(), patch("goose.utils.shell.ask_an_ai") as ask:
+        with patch.object(StuckDetector, "check", return_value="stuck"), pytest.raises(ValueError, match="stuck"):
+            run("sleep 5")
+        with patch.object(StuckDetector, "check", return_value="running"):
+            assert run("sleep 0.5") == "Command succeeded\n"
+    ask.assert_not_called()
+
+
+def test_shell_does_not_busy_wait():
+    start = time.process_time()
+    run("sleep 1")
+    # waiting on the command should take a small fraction of a core
+    assert time.process_time() - start < 0.2
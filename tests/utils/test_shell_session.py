@@ -0,0 +1,78 @@
+import shutil
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from goose.utils.shell import shell
+from goose.utils.shell_session import ShellSession, session_from_env
+from goose.utils.stuck_detector import StuckDetector
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+
+
+@pytest.fixture
+def session():
+    session = ShellSession("bash")
+    yield session
+    session.close()
+
+
+def run(command: str, session: ShellSession, **kwargs: dict) -> str:
+    return shell(command, MagicMock(), MagicMock(), session=session, **kwargs)
+
+
+def test_state_carries_over(session, tmp_path):
+    assert run(f"cd {tmp_path} && export GREETING=hello", session) == "Command succeeded\n"
+    assert run("pwd; echo $GREETING", session) == f"Command succeeded\n{tmp_path}\nhello\n"
+    assert session.cwd == str(tmp_path)
+
+
+def test_output_and_exit_codes(session):
+    assert run("printf partial; false", session) == "Command failed with returncode 1\npartial"
+    assert run("echo out; echo err >&2", session) == "Command succeeded\nout\nerr\n"
+    assert run("if then", session).startswith("Command failed with returncode 2")
+    assert run("echo still here", session) == "Command succeeded\nstill here\n"
+
+
+def test_commands_do_not_read_the_session_input(session):
+    assert run("cat", session) == "Command succeeded\n"
+    assert run("echo next", session) == "Command succeeded\nnext\n"
+
+
+def test_exit_restarts_in_last_directory(session, tmp_path):
+    run(f"cd {tmp_path}", session)
+    assert run("exit 3", session) == "Command failed with returncode 3\n"
+    assert not session.alive
+    assert run("pwd", session) == f"Command succeeded\n{tmp_path}\n"
+
+
+def test_cwd_is_applied_when_it_changes(session, tmp_path):
+    (tmp_path / "sub").mkdir()
+    assert run("pwd", session, cwd=str(tmp_path)) == f"Command succeeded\n{tmp_path}\n"
+    assert run("pwd", session, cwd=str(tmp_path / "sub")) == f"Command succeeded\n{tmp_path / 'sub'}\n"
+
+
+def test_stuck_command_is_interrupted(session):
+    with patch.object(StuckDetector, "check", return_value="stuck"), patch("goose.utils.shell.time") as clock:
+        clock.monotonic.side_effect = iter(range(0, 100000, 100))
+        with pytest.raises(ValueError, match="stuck"):
+            run("export LOST=1; sleep 30", session)
+    assert not session.alive
+    assert run("echo ${LOST:-gone}", session) == "Command succeeded\ngone\n"
+
+
+def test_many_short_commands(session):
+    start = time.monotonic()
+    for i in range(50):
+        assert run(f"echo {i}", session) == f"Command succeeded\n{i}\n"
+    assert time.monotonic() - start < 10
+
+
+def test_session_from_env(monkeypatch):
+    monkeypatch.delenv("GOOSE_SHELL_SESSION", raising=False)
+    assert session_from_env() is None
+    monkeypatch.setenv("GOOSE_SHELL_SESSION", "1")
+    assert session_from_env().executable == "bash"
+    monkeypatch.setenv("GOOSE_SHELL_SESSION", "not-a-real-shell")
+    with pytest.raises(ValueError):
+        session_from_env()
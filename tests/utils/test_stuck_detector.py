@@ -0,0 +1,70 @@
+import subprocess
+import sys
+import time
+
+import pytest
+from goose.utils import stuck_detector
+from goose.utils.stuck_detector import StuckDetector, process_tree, read_process_sample
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads process state from /proc")
+
+
+@pytest.fixture(autouse=True)
+def short_activity_window(monkeypatch):
+    monkeypatch.setattr(stuck_detector, "ACTIVITY_WINDOW", 0.3)
+
+
+@pytest.fixture
+def spawn():
+    processes = []
+
+    def _spawn(command: str) -> subprocess.Popen:
+        proc = subprocess.Popen(command, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        processes.append(proc)
+        return proc
+
+    yield _spawn
+    for proc in processes:
+        for pid in process_tree(proc.pid) if sys.platform.startswith("linux") else [proc.pid]:
+            subprocess.run(["kill", str(pid)], stderr=subprocess.DEVNULL)
+        proc.wait()
+
+
+@pytest.mark.parametrize(
+    "command",
+    ["npm run dev", "python -m http.server 8000", "tail -f app.log", "uvicorn app:main", "docker compose up"],
+)
+def test_long_running_commands_are_stuck(command):
+    assert StuckDetector(command, pid=-1).check("") == "stuck"
+
+
+@pytest.mark.parametrize("output", ["Overwrite file? [y/N] ", "[sudo] password for goose: ", "Continue? "])
+def test_prompts_are_stuck(output):
+    assert StuckDetector("./install.sh", pid=-1).check("installing\n" + output) == "stuck"
+
+
+def test_unsure_without_proc():
+    assert StuckDetector("docker compose up -d", pid=-1).check("pulling images\n") == "unsure"
+
+
+@linux_only
+def test_busy_process_is_running(spawn):
+    proc = spawn("python -c 'while True: pass'")
+    assert StuckDetector("python busy.py", proc.pid).check("") == "running"
+
+
+@linux_only
+def test_idle_process_is_unsure(spawn):
+    proc = spawn("sleep 30")
+    assert StuckDetector("sleep 30", proc.pid).check("") == "unsure"
+
+
+@linux_only
+def test_process_tree_includes_descendants(spawn):
+    proc = spawn("sleep 30 & sleep 30; wait")
+    deadline = time.monotonic() + 5
+    while len(tree := process_tree(proc.pid)) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert tree[0] == proc.pid
+    assert len(tree) == 3
+    assert read_process_sample(proc.pid).state in "RS"